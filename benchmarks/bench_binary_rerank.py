@@ -0,0 +1,161 @@
+"""
+Mede o compromisso recall x latência da busca em duas fases (candidatos por Hamming na cópia
+binária + re-ranqueamento exato por cosseno) para diferentes fatores de oversample.
+
+O recall@k é calculado contra a busca exata por cosseno. Dois backends:
+
+    numpy     simulação em memória, sem banco (padrão)
+    postgres  insere vetores sintéticos no banco das variáveis DB_*, compara search_by_vector
+              com a busca exata (sem índice) e remove os dados ao final. Crie antes o índice
+              binário com: python -m src.infrastructure.vector_schema --binary-index
+
+Os vetores sintéticos vêm de um espaço latente de poucas dimensões projetado para o espaço
+do embedding, com ruído, o que dá vizinhanças graduais como as de embeddings de textos reais;
+vetores gaussianos puros subestimam bastante o recall da quantização binária.
+
+Uso:
+    python -m benchmarks.bench_binary_rerank --vectors 50000 --dimensions 1024 --oversample 1,2,4,8,16
+    python -m benchmarks.bench_binary_rerank --backend postgres --vectors 20000 --queries 50
+"""
+
+import argparse
+import time
+import numpy as np
+
+
+def build_projection(latent_dimensions: int, dimensions: int, rng) -> np.ndarray:
+    return rng.standard_normal((latent_dimensions, dimensions), dtype=np.float32) / float(np.sqrt(latent_dimensions))
+
+
+def build_vectors(count: int, projection: np.ndarray, noise: float, rng) -> np.ndarray:
+    latent = rng.standard_normal((count, projection.shape[0]), dtype=np.float32)
+    vectors = latent @ projection + noise * rng.standard_normal((count, projection.shape[1]), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    distances = 1.0 - vectors @ query
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top])]
+
+
+def binary_rerank_top_k(vectors: np.ndarray, packed: np.ndarray, query: np.ndarray, k: int,
+                        oversample: int) -> np.ndarray:
+    query_bits = np.packbits(query > 0)
+    hamming = np.bitwise_count(packed ^ query_bits).sum(axis=1, dtype=np.int32)
+    candidate_count = min(k * oversample, len(vectors))
+    candidates = np.argpartition(hamming, candidate_count - 1)[:candidate_count]
+    return candidates[exact_top_k(vectors[candidates], query, min(k, candidate_count))]
+
+
+def recall(found, expected) -> float:
+    return len(set(found) & set(expected)) / len(expected)
+
+
+def report(label: str, recalls: list, timings: list) -> None:
+    timings_ms = np.array(timings) * 1000
+    print(f"{label:>14}: recall@k {np.mean(recalls):6.3f}  "
+          f"latência média {timings_ms.mean():8.2f}ms  p95 {np.percentile(timings_ms, 95):8.2f}ms")
+
+
+def run_numpy(args, rng) -> None:
+    projection = build_projection(args.latent_dimensions, args.dimensions, rng)
+    vectors = build_vectors(args.vectors, projection, args.noise, rng)
+    queries = build_vectors(args.queries, projection, args.noise, rng)
+    packed = np.packbits(vectors > 0, axis=1)
+    print(f"{args.vectors} vetores de {args.dimensions} dimensões: float32 {vectors.nbytes / 2**20:.1f} MiB, "
+          f"binário {packed.nbytes / 2**20:.1f} MiB")
+
+    expected, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        expected.append(exact_top_k(vectors, query, args.top_k))
+        timings.append(time.perf_counter() - start)
+    report("exata", [1.0], timings)
+
+    for oversample in args.oversample:
+        recalls, timings = [], []
+        for query, truth in zip(queries, expected):
+            start = time.perf_counter()
+            found = binary_rerank_top_k(vectors, packed, query, args.top_k, oversample)
+            timings.append(time.perf_counter() - start)
+            recalls.append(recall(found, truth))
+        report(f"oversample {oversample}", recalls, timings)
+
+
+def run_postgres(args, rng) -> None:
+    from sqlalchemy import text
+    from src.infrastructure.connection_postgresql import get_db_session
+    from src.models.database_models import CorrelationType
+    from src.service.embedding_service import EMBEDDING_DIMENSIONS, bulk_save_embeddings, search_by_vector
+
+    projection = build_projection(args.latent_dimensions, EMBEDDING_DIMENSIONS, rng)
+    vectors = build_vectors(args.vectors, projection, args.noise, rng)
+    queries = build_vectors(args.queries, projection, args.noise, rng)
+    per_chunk = 12
+    chunk_texts = [f"benchmark chunk {i}" for i in range(0, args.vectors, per_chunk)]
+    chunk_embeddings = [
+        [
+            {
+                "correlation_type": CorrelationType.get_all_types()[row % 3],
+                "text_content": f"benchmark variant {row}",
+                "embedding": vectors[row]
+            }
+            for row in range(start, min(start + per_chunk, args.vectors))
+        ]
+        for start in range(0, args.vectors, per_chunk)
+    ]
+    ids = bulk_save_embeddings(chunk_texts, chunk_embeddings, "copy")
+    print(f"{args.vectors} vetores de {EMBEDDING_DIMENSIONS} dimensões inseridos")
+
+    try:
+        with get_db_session() as session:
+            session.execute(text("ANALYZE db_correlation_embedding"))
+            session.commit()
+
+            expected = []
+            for query in queries:
+                session.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+                expected.append([row["embedding_id"] for row in search_by_vector(session, query, args.top_k)])
+                session.rollback()
+
+            for label, oversample in [("hnsw", 0)] + [(f"oversample {o}", o) for o in args.oversample]:
+                recalls, timings = [], []
+                for query, truth in zip(queries, expected):
+                    start = time.perf_counter()
+                    found = search_by_vector(session, query, args.top_k, oversample)
+                    timings.append(time.perf_counter() - start)
+                    session.rollback()
+                    recalls.append(recall([row["embedding_id"] for row in found], truth))
+                report(label, recalls, timings)
+    finally:
+        with get_db_session() as session:
+            session.execute(text("DELETE FROM db_correlation_embedding WHERE id_text_origin = ANY(:ids)"), {"ids": ids})
+            session.execute(text("DELETE FROM db_origin_text WHERE id = ANY(:ids)"), {"ids": ids})
+            session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("numpy", "postgres"), default="numpy")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1024, help="Apenas no backend numpy")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--oversample", default="1,2,4,8,16")
+    parser.add_argument("--latent-dimensions", type=int, default=64)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.oversample = [int(value) for value in args.oversample.split(",")]
+
+    rng = np.random.default_rng(args.seed)
+    if args.backend == "numpy":
+        run_numpy(args, rng)
+    else:
+        run_postgres(args, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Micro-benchmarks das etapas de CPU da ingestão e da busca, com tempo e pico de alocação
+(tracemalloc) por etapa, e limites que falham quando uma mudança deixa uma etapa
+significativamente mais lenta ou mais gulosa em memória.
+
+Etapas (documentos sintéticos de 1 KB a 50 MB; vetores de EMBEDDING_DIMENSIONS):
+
+    split_text             RecursiveCharacterTextSplitter.split_text (chunks de 500, sem overlap)
+    overlap_chunks         create_overlapping_chunks sobre os chunks já divididos (overlap de 100)
+    embedding_json_encode  EmbeddingBatch.to_json (formato de depuração/legado) de N registros
+    embedding_json_decode  EmbeddingBatch.from_json de N registros
+    vector_literal         _vector_literal (vetor -> '[x,y,...]' enviado ao pgvector) de N vetores
+
+O tempo é a mediana de --repeat execuções, dividida pelo tempo de uma carga de referência
+em Python puro medida na mesma máquina (calibração), para que os limites valham entre
+máquinas diferentes. O pico de memória é medido em uma execução separada com tracemalloc
+(só as alocações da etapa, sem a entrada). Os limites ficam em benchmarks/cpu_thresholds.json.
+
+Uso:
+    python -m benchmarks.bench_cpu                                 # mede e confere os limites
+    python -m benchmarks.bench_cpu --sizes 1KB,1MB,50MB --output cpu.json
+    python -m benchmarks.bench_cpu --update-thresholds             # regrava os limites com folga
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Os clientes do Azure OpenAI são criados na importação do serviço, mas não fazem chamadas aqui
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.infrastructure.vector_schema import EMBEDDING_DIMENSIONS
+from src.models.embedding_batch import EmbeddingBatch, EmbeddingRecord
+from src.service.embedding_service import _vector_literal
+from src.usecase.embedding_usecase import create_overlapping_chunks
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cpu_thresholds.json")
+DEFAULT_SIZES = "1KB,100KB,1MB,10MB,50MB"
+DEFAULT_RECORDS = "64,256"
+# Folga aplicada por --update-thresholds sobre o valor medido
+TIME_HEADROOM = 1.5
+MEMORY_HEADROOM = 1.25
+# Pisos absolutos: etapas de microssegundos e picos pequenos variam com ruído e detalhes do interpretador
+MIN_TIME_HEADROOM = 0.01
+MIN_PEAK_MIB = 1.0
+CHUNK_SIZE = 500
+OVERLAP_SIZE = 100
+_UNITS = {"KB": 1024, "MB": 1024 ** 2}
+_VOCABULARY = (
+    "rede dados sistema usuário servidor aplicação processo empresa cliente produto serviço mercado "
+    "tecnologia internet computador dispositivo energia cidade governo saúde educação pesquisa ciência "
+    "modelo análise resultado projeto equipe contrato pagamento banco conta crédito risco segurança "
+    "acesso nuvem armazenamento memória texto documento busca vetor índice consulta transporte logística"
+).split()
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    for unit, factor in _UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def build_document(size_bytes: int, seed: int = 42) -> str:
+    """
+    Documento com parágrafos e frases de tamanhos variados (exercita todos os separadores
+    do splitter), montado a partir de um conjunto fixo de parágrafos para ser rápido em 50 MB
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(256):
+        sentences = [
+            " ".join(rng.choices(_VOCABULARY, k=rng.randint(4, 30))).capitalize() + "."
+            for _ in range(rng.randint(1, 8))
+        ]
+        separator = "\n" if rng.random() < 0.2 else " "
+        paragraphs.append(separator.join(sentences))
+    parts, total = [], 0
+    while total < size_bytes:
+        paragraph = paragraphs[rng.randrange(len(paragraphs))]
+        parts.append(paragraph)
+        total += len(paragraph.encode("utf-8")) + 2
+    return "\n\n".join(parts).encode("utf-8")[:size_bytes].decode("utf-8", "ignore")
+
+
+def build_batch(records: int, dimensions: int = EMBEDDING_DIMENSIONS, seed: int = 42) -> EmbeddingBatch:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((records, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    chunks = {index: f"chunk {index} " + "texto " * 80 for index in range(max(1, records // 12))}
+    batch_records = [
+        EmbeddingRecord("similaridade_semantica", f"variante {row} " + "texto " * 20, row % len(chunks), row)
+        for row in range(records)
+    ]
+    return EmbeddingBatch(batch_records, vectors, chunks, chunk_size=CHUNK_SIZE, chunk_overlap=OVERLAP_SIZE,
+                          total_chunks=len(chunks))
+
+
+def _splitter() -> RecursiveCharacterTextSplitter:
+    # Mesma configuração de split_into_chunks
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=0, length_function=len, separators=["\n\n", "\n", " ", ""]
+    )
+
+
+def build_cases(sizes: list, record_counts: list) -> list:
+    """
+    Casos (nome, preparação, etapa): a preparação monta a entrada fora da medição
+    """
+    cases = []
+    for size in sizes:
+        cases.append((f"split_text/{size}", lambda size=size: build_document(parse_size(size)),
+                      lambda document: _splitter().split_text(document)))
+        cases.append((f"overlap_chunks/{size}",
+                      lambda size=size: _splitter().split_text(build_document(parse_size(size))),
+                      lambda chunks: create_overlapping_chunks(chunks, OVERLAP_SIZE)))
+    for records in record_counts:
+        cases.append((f"embedding_json_encode/{records}", lambda records=records: build_batch(records),
+                      lambda batch: batch.to_json(indent=None)))
+        cases.append((f"embedding_json_decode/{records}",
+                      lambda records=records: build_batch(records).to_json(indent=None),
+                      EmbeddingBatch.from_json))
+        cases.append((f"vector_literal/{records}",
+                      lambda records=records: [vector.tolist() for vector in build_batch(records).vectors],
+                      lambda vectors: [_vector_literal(vector) for vector in vectors]))
+    return cases
+
+
+def calibrate(repeat: int = 5) -> float:
+    """
+    Mediana de uma carga fixa em Python puro (ordenação, formatação e JSON): a unidade de tempo
+    """
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(200_000)]
+    payload = [{"id": position, "text": f"item {position}", "value": value} for position, value in enumerate(values[:20_000])]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sorted(values)
+        ",".join(str(value) for value in values[:50_000])
+        json.loads(json.dumps(payload))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_time(setup, stage, repeat: int) -> float:
+    data = setup()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        stage(data)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_peak_memory(setup, stage) -> int:
+    """
+    Pico de memória alocada pela etapa (bytes), sem contar a entrada nem o que já existia
+    """
+    data = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = stage(data)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def run(sizes: list, record_counts: list, repeat: int, memory: bool = True) -> dict:
+    unit = calibrate()
+    stages = {}
+    for name, setup, stage in build_cases(sizes, record_counts):
+        seconds = measure_time(setup, stage, repeat)
+        stages[name] = {"seconds": round(seconds, 6), "relative_time": round(seconds / unit, 4)}
+        if memory:
+            stages[name]["peak_mib"] = round(measure_peak_memory(setup, stage) / 2 ** 20, 3)
+        print(f"{name:>30}: {seconds * 1000:10.2f} ms  ({stages[name]['relative_time']:8.3f} unidades)"
+              + (f"  pico {stages[name]['peak_mib']:9.2f} MiB" if memory else ""), flush=True)
+    return {"calibration_seconds": round(unit, 6), "stages": stages}
+
+
+def check_thresholds(results: dict, thresholds: dict) -> list:
+    """
+    Etapas que passaram do limite de tempo relativo ou de pico de memória
+    """
+    failures = []
+    for name, measured in results["stages"].items():
+        limits = thresholds.get(name)
+        if limits is None:
+            continue
+        for metric in ("relative_time", "peak_mib"):
+            if metric in limits and metric in measured and measured[metric] > limits[metric]:
+                failures.append(f"{name}: {metric} {measured[metric]} > limite {limits[metric]}")
+    return failures
+
+
+def thresholds_from(results: dict, previous: dict = None) -> dict:
+    thresholds = dict(previous or {})
+    for name, measured in results["stages"].items():
+        relative_time = measured["relative_time"]
+        limits = {"relative_time": round(max(relative_time * TIME_HEADROOM, relative_time + MIN_TIME_HEADROOM), 4)}
+        if "peak_mib" in measured:
+            limits["peak_mib"] = round(max(measured["peak_mib"] * MEMORY_HEADROOM, MIN_PEAK_MIB), 3)
+        thresholds[name] = limits
+    return dict(sorted(thresholds.items()))
+
+
+def load_thresholds(path: str = THRESHOLDS_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as thresholds_file:
+        return json.load(thresholds_file)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Tamanhos dos documentos (ex.: 1KB,10MB)")
+    parser.add_argument("--records", default=DEFAULT_RECORDS, help="Registros/vetores das etapas de vetores")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="Não mede o pico de memória")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--update-thresholds", action="store_true",
+                        help=f"Regrava os limites (tempo x{TIME_HEADROOM}, memória x{MEMORY_HEADROOM})")
+    parser.add_argument("--output", help="Grava as medições em JSON")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    record_counts = [int(records) for records in args.records.split(",") if records.strip()]
+    results = run(sizes, record_counts, args.repeat, memory=not args.no_memory)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.update_thresholds:
+        thresholds = thresholds_from(results, load_thresholds(args.thresholds))
+        with open(args.thresholds, "w", encoding="utf-8") as thresholds_file:
+            json.dump(thresholds, thresholds_file, indent=2)
+            thresholds_file.write("\n")
+        print(f"limites gravados em {args.thresholds}")
+        return 0
+
+    failures = check_thresholds(results, load_thresholds(args.thresholds))
+    for failure in failures:
+        print(f"REGRESSÃO {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
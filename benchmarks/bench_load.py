@@ -0,0 +1,469 @@
+"""
+Benchmark de carga da API sem endpoints pagos: sobe o fake do Azure OpenAI
+(benchmarks/fake_openai.py) e a aplicação (uvicorn) em subprocessos e mede, com concorrência
+fixa:
+
+    ingest        POST /new_rag/embedding + acompanhamento do job: docs/s, vetores/s e
+                  latência do job (enfileirar -> concluído)
+    search        GET /new_rag/search_vetorial: QPS e latência (p50/p90/p95/p99/máx)
+    search_batch  POST /new_rag/search_batch: requisições/s, perguntas/s e latência
+
+Backends (VECTOR_STORE_BACKEND da aplicação):
+
+    numpy     tudo em memória no processo da aplicação (1 worker), sem Postgres
+    pgvector  banco das variáveis DB_*; sem DB_HOST, o container de
+              python -m benchmarks.pgvector_fixture up
+
+O relatório é gravado em JSON (configuração, commit do git, métricas de cada cenário e
+contadores do fake) para comparar commits; --baseline compara com um relatório anterior e
+termina com código 1 se alguma métrica piorar mais que --tolerance.
+
+Uso:
+    python -m benchmarks.bench_load --backend numpy --docs 20 --concurrency 8
+    python -m benchmarks.bench_load --backend pgvector --openai-latency-ms 80 --openai-error-rate 0.02 \\
+        --baseline benchmarks/results/anterior.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import queue
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+import numpy as np
+
+SCENARIOS = ("ingest", "search", "search_batch")
+JOB_FINISHED = ("succeeded", "failed")
+# Métricas comparadas com o relatório anterior: True quando maior é melhor
+TRACKED_METRICS = {
+    "docs_per_second": True,
+    "vectors_per_second": True,
+    "requests_per_second": True,
+    "questions_per_second": True,
+    "latency_ms.p50": False,
+    "latency_ms.p99": False,
+}
+_VOCABULARY = (
+    "rede dados sistema usuário servidor aplicação processo empresa cliente produto serviço mercado "
+    "tecnologia internet computador dispositivo energia cidade governo saúde educação pesquisa ciência "
+    "modelo análise resultado projeto equipe contrato pagamento banco conta crédito risco segurança "
+    "acesso nuvem armazenamento memória rede neural texto documento busca vetor índice consulta "
+    "transporte logística estoque venda compra preço custo receita lucro investimento relatório"
+).split()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_documents(count: int, words_per_document: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    documents = []
+    for document in range(count):
+        sentences = []
+        for _ in range(max(1, words_per_document // 12)):
+            sentences.append(" ".join(rng.choices(_VOCABULARY, k=12)).capitalize() + ".")
+        documents.append(f"Documento {document}. " + " ".join(sentences))
+    return documents
+
+
+def build_questions(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(_VOCABULARY, k=rng.randint(3, 8))) + f" {position}" for position in range(count)]
+
+
+def latency_summary(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p90": round(float(np.percentile(values, 90)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+class ApiClient:
+    """
+    Conexão HTTP keep-alive de uma thread do gerador de carga
+    """
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        parts = urlsplit(base_url)
+        self._connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+
+    def request(self, method: str, path: str, payload: dict = None) -> tuple:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            self._connection.request(method, path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self._connection.close()
+            raise
+        return response.status, json.loads(data) if data else None
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def run_concurrently(base_url: str, tasks: list, concurrency: int, execute) -> dict:
+    """
+    Executa execute(client, task) para cada task com concurrency threads; cada chamada
+    devolve um dict com "ok" e métricas extras. Mede latência e tempo total.
+    """
+    pending = queue.Queue()
+    for task in tasks:
+        pending.put(task)
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker():
+        client = ApiClient(base_url)
+        try:
+            while True:
+                try:
+                    task = pending.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                try:
+                    outcome = execute(client, task)
+                except Exception as e:
+                    client = ApiClient(base_url)
+                    outcome = {"ok": False, "error": str(e)}
+                outcome["latency"] = time.perf_counter() - start
+                with lock:
+                    outcomes.append(outcome)
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f"load-{position}") for position in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    succeeded = [outcome for outcome in outcomes if outcome["ok"]]
+    errors = [outcome.get("error", "unknown") for outcome in outcomes if not outcome["ok"]]
+    return {
+        "wall_seconds": round(elapsed, 3),
+        "succeeded": succeeded,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "latency_ms": latency_summary([outcome["latency"] for outcome in succeeded]),
+    }
+
+
+def scenario_ingest(base_url: str, documents: list, concurrency: int, index: int, poll_interval: float,
+                    job_timeout: float) -> dict:
+    def execute(client: ApiClient, document: str) -> dict:
+        status, body = client.request("POST", "/new_rag/embedding", {"text": document, "index": index})
+        if status != 202:
+            return {"ok": False, "error": f"HTTP {status}"}
+        deadline = time.monotonic() + job_timeout
+        while time.monotonic() < deadline:
+            status, job = client.request("GET", f"/new_rag/jobs/{body['job_id']}")
+            if status == 200 and job["status"] in JOB_FINISHED:
+                if job["status"] == "failed":
+                    return {"ok": False, "error": f"job failed: {job.get('error')}"}
+                return {"ok": True, "vectors": job["vectors_saved"], "chunks": job["chunks_done"]}
+            time.sleep(poll_interval)
+        return {"ok": False, "error": "job timeout"}
+
+    run = run_concurrently(base_url, documents, concurrency, execute)
+    vectors = sum(outcome["vectors"] for outcome in run["succeeded"])
+    docs = len(run["succeeded"])
+    return {
+        "documents": docs,
+        "chunks": sum(outcome["chunks"] for outcome in run["succeeded"]),
+        "vectors": vectors,
+        "errors": run["errors"],
+        "error_samples": run["error_samples"],
+        "wall_seconds": run["wall_seconds"],
+        "docs_per_second": round(docs / run["wall_seconds"], 3),
+        "vectors_per_second": round(vectors / run["wall_seconds"], 3),
+        "latency_ms": run["latency_ms"],
+    }
+
+
+def scenario_search(base_url: str, questions: list, concurrency: int, requests: int, top_k: int,
+                    mode: str) -> dict:
+    tasks = [questions[position % len(questions)] for position in range(requests)]
+
+    def execute(client: ApiClient, question: str) -> dict:
+        path = f"/new_rag/search_vetorial?question={quote(question)}&top_k={top_k}&mode={mode}"
+        status, body = client.request("GET", path)
+        if status != 200 or body.get("results") is None:
+            return {"ok": False, "error": f"HTTP {status}"}
+        return {"ok": True}
+
+    run = run_concurrently(base_url, tasks, concurrency, execute)
+    completed = len(run["succeeded"])
+    return {
+        "requests": completed,
+        "errors": run["errors"],
+        "error_samples": run["error_samples"],
+        "wall_seconds": run["wall_seconds"],
+        "requests_per_second": round(completed / run["wall_seconds"], 3),
+        "latency_ms": run["latency_ms"],
+    }
+
+
+def scenario_search_batch(base_url: str, questions: list, concurrency: int, requests: int, top_k: int,
+                          batch_size: int) -> dict:
+    tasks = [
+        [questions[(position * batch_size + offset) % len(questions)] for offset in range(batch_size)]
+        for position in range(requests)
+    ]
+
+    def execute(client: ApiClient, batch: list) -> dict:
+        status, body = client.request("POST", "/new_rag/search_batch", {"questions": batch, "top_k": top_k})
+        if status != 200 or body.get("results") is None:
+            return {"ok": False, "error": f"HTTP {status}"}
+        return {"ok": True}
+
+    run = run_concurrently(base_url, tasks, concurrency, execute)
+    completed = len(run["succeeded"])
+    return {
+        "requests": completed,
+        "batch_size": batch_size,
+        "errors": run["errors"],
+        "error_samples": run["error_samples"],
+        "wall_seconds": run["wall_seconds"],
+        "requests_per_second": round(completed / run["wall_seconds"], 3),
+        "questions_per_second": round(completed * batch_size / run["wall_seconds"], 3),
+        "latency_ms": run["latency_ms"],
+    }
+
+
+def _wait_for_http(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} terminou com código {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            connection.request("GET", parts.path or "/")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} não respondeu em {timeout:.0f}s")
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def _metric(scenario: dict, name: str):
+    value = scenario
+    for key in name.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_reports(baseline: dict, current: dict, tolerance: float) -> list:
+    """
+    Métricas de TRACKED_METRICS que pioraram mais que tolerance (fração) em relação ao baseline
+    """
+    regressions = []
+    for scenario, results in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+        for name, higher_is_better in TRACKED_METRICS.items():
+            before, after = _metric(previous, name), _metric(results, name)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{scenario}.{name}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+def app_environment(args, openai_url: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "AZURE_OPENAI_ENDPOINT": openai_url,
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "VECTOR_STORE_BACKEND": args.backend,
+        "JOB_STORE_PATH": os.path.join(workdir, "jobs.db"),
+        "JOB_WORKERS": str(args.job_workers),
+        "JOB_POLL_INTERVAL": "0.05",
+        # Sem caches: cada requisição percorre o caminho completo até o fake e o banco
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "GENERATION_CACHE_ENABLED": "false",
+        "QUERY_CACHE_ENABLED": "true" if args.query_cache else "false",
+    })
+    if args.backend == "pgvector" and not os.getenv("DB_HOST"):
+        from benchmarks.pgvector_fixture import database_env
+        env.update(database_env())
+    return env
+
+
+def run(args) -> dict:
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Allowed: {', '.join(SCENARIOS)}")
+    if args.backend == "numpy" and args.workers != 1:
+        raise ValueError("The numpy backend keeps vectors in the worker process: use --workers 1")
+
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    openai_port, app_port = free_port(), free_port()
+    openai_url, app_url = f"http://127.0.0.1:{openai_port}", f"http://127.0.0.1:{app_port}"
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_openai", "--port", str(openai_port),
+        "--latency-ms", str(args.openai_latency_ms), "--jitter-ms", str(args.openai_jitter_ms),
+        "--error-rate", str(args.openai_error_rate), "--retry-after", str(args.openai_retry_after)
+    ], stdout=subprocess.DEVNULL)
+    app = None
+    try:
+        _wait_for_http(f"{openai_url}/stats", fake)
+        app_log = open(os.path.join(workdir, "app.log"), "wb")
+        app = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+            "--workers", str(args.workers), "--log-level", "warning"
+        ], env=app_environment(args, openai_url, workdir), stdout=app_log, stderr=subprocess.STDOUT)
+        print(f"log da aplicação: {app_log.name}", flush=True)
+        _wait_for_http(f"{app_url}/openapi.json", app)
+
+        questions = build_questions(args.questions)
+        results = {}
+        for scenario in scenarios:
+            print(f"cenário {scenario}...", flush=True)
+            if scenario == "ingest":
+                results[scenario] = scenario_ingest(
+                    app_url, build_documents(args.docs, args.words_per_doc), args.concurrency, args.index,
+                    args.poll_interval, args.job_timeout
+                )
+            elif scenario == "search":
+                results[scenario] = scenario_search(
+                    app_url, questions, args.concurrency, args.search_requests, args.top_k, args.mode
+                )
+            else:
+                results[scenario] = scenario_search_batch(
+                    app_url, questions, args.concurrency, args.search_requests, args.top_k, args.batch_size
+                )
+
+        client = ApiClient(openai_url)
+        _, fake_stats = client.request("GET", "/stats")
+        client.close()
+    finally:
+        if app is not None:
+            _stop(app)
+            app_log.close()
+        _stop(fake)
+
+    return {
+        "schema_version": 1,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "scenarios": results,
+        "fake_openai": fake_stats,
+    }
+
+
+def print_summary(report: dict) -> None:
+    for scenario, results in report["scenarios"].items():
+        latency = results.get("latency_ms", {})
+        throughput = ", ".join(
+            f"{name} {results[name]}" for name in
+            ("docs_per_second", "vectors_per_second", "requests_per_second", "questions_per_second")
+            if name in results
+        )
+        print(f"{scenario:>13}: {throughput}  p50 {latency.get('p50')}ms  p99 {latency.get('p99')}ms  "
+              f"erros {results['errors']}")
+    print(f"fake OpenAI: {report['fake_openai']}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("numpy", "pgvector"), default="numpy")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn")
+    parser.add_argument("--job-workers", type=int, default=4, help="JOB_WORKERS da aplicação")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--words-per-doc", type=int, default=400)
+    parser.add_argument("--index", type=int, default=2, help="Textos gerados por tipo de correlação")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--job-timeout", type=float, default=600.0)
+    parser.add_argument("--questions", type=int, default=200, help="Perguntas distintas da busca")
+    parser.add_argument("--search-requests", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--mode", choices=("vector", "hybrid"), default="vector")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--query-cache", action="store_true", help="Mantém o cache das perguntas ativo")
+    parser.add_argument("--openai-latency-ms", type=float, default=50.0)
+    parser.add_argument("--openai-jitter-ms", type=float, default=25.0)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-retry-after", type=float, default=0.5)
+    parser.add_argument("--output", help="Arquivo JSON do relatório (default: benchmarks/results/load-<data>-<commit>.json)")
+    parser.add_argument("--baseline", help="Relatório anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Piora máxima aceita em relação ao baseline")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_summary(report)
+
+    output = args.output
+    if output is None:
+        commit = (report["git"]["commit"] or "nogit")[:8]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmarks", "results", f"load-{stamp}-{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2, ensure_ascii=False)
+    print(f"relatório: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare_reports(json.load(baseline_file), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
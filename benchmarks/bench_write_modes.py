@@ -0,0 +1,90 @@
+"""
+Compara os modos de escrita de embeddings em um PostgreSQL com pgvector: legacy (um commit por
+chunk com save_original_text/save_embedding_to_postgresql) e orm, insert e copy (uma transação
+por requisição).
+
+Usa as mesmas variáveis DB_* da aplicação. Os dados sintéticos inseridos são removidos ao final
+de cada rodada.
+
+Uso:
+    python -m benchmarks.bench_write_modes --chunks 200 --per-chunk 12
+"""
+
+import argparse
+import time
+import numpy as np
+from sqlalchemy import text
+
+from src.infrastructure.connection_postgresql import get_db_session
+from src.models.database_models import CorrelationType
+from src.service.embedding_service import (
+    EMBEDDING_DIMENSIONS,
+    save_original_text,
+    save_embedding_to_postgresql,
+    bulk_save_embeddings
+)
+
+
+def build_payload(chunks: int, per_chunk: int, dimensions: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    chunk_texts = [f"benchmark chunk {i} " + "lorem ipsum " * 40 for i in range(chunks)]
+    chunk_embeddings = []
+    for i in range(chunks):
+        vectors = rng.standard_normal((per_chunk, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunk_embeddings.append([
+            {
+                "correlation_type": CorrelationType.get_all_types()[j % 3],
+                "text_content": f"benchmark variant {i}-{j}",
+                "embedding": vectors[j]
+            }
+            for j in range(per_chunk)
+        ])
+    return chunk_texts, chunk_embeddings
+
+
+def save_legacy(chunk_texts, chunk_embeddings):
+    ids = []
+    for chunk_text, embeddings in zip(chunk_texts, chunk_embeddings):
+        id_text_origin = save_original_text(chunk_text)
+        save_embedding_to_postgresql(id_text_origin, embeddings)
+        ids.append(id_text_origin)
+    return ids
+
+
+def cleanup(ids):
+    with get_db_session() as session:
+        session.execute(text("DELETE FROM db_correlation_embedding WHERE id_text_origin = ANY(:ids)"), {"ids": ids})
+        session.execute(text("DELETE FROM db_origin_text WHERE id = ANY(:ids)"), {"ids": ids})
+        session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--per-chunk", type=int, default=12)
+    parser.add_argument("--modes", default="legacy,orm,insert,copy")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunk_texts, chunk_embeddings = build_payload(args.chunks, args.per_chunk, EMBEDDING_DIMENSIONS)
+    total_vectors = args.chunks * args.per_chunk
+    print(f"{args.chunks} chunks, {total_vectors} vetores de {EMBEDDING_DIMENSIONS} dimensões")
+
+    for mode in args.modes.split(","):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            if mode == "legacy":
+                ids = save_legacy(chunk_texts, chunk_embeddings)
+            else:
+                ids = bulk_save_embeddings(chunk_texts, chunk_embeddings, mode)
+            timings.append(time.perf_counter() - start)
+            cleanup(ids)
+        best = min(timings)
+        print(f"{mode:>7}: melhor {best:8.3f}s  mediana {sorted(timings)[len(timings) // 2]:8.3f}s  "
+              f"{total_vectors / best:10.0f} vetores/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Servidor local que imita os endpoints do Azure OpenAI usados pela aplicação (embeddings e
+chat completions), para medir throughput e latência sem chamar os endpoints pagos.
+
+- embeddings determinísticos: feature hashing das palavras do texto, normalizado. Textos com
+  palavras em comum ficam próximos, então a busca retorna vizinhanças plausíveis
+- gerações determinísticas no formato JSON que os prompts pedem: {"result_1": ...} por tipo,
+  ou os três tipos em um único objeto quando a chamada pede response_format json_object
+- latência configurável (base + jitter uniforme) e 429 com Retry-After em uma fração das
+  requisições, para exercitar os retries do SDK
+- GET /stats devolve a contagem de requisições, 429s e tokens simulados
+
+Aponte a aplicação para ele com AZURE_OPENAI_ENDPOINT=http://127.0.0.1:<porta> e qualquer
+AZURE_OPENAI_API_KEY.
+
+Uso:
+    python -m benchmarks.fake_openai --port 8100 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+DEFAULT_DIMENSIONS = 3072
+CORRELATION_KEYS = ("similaridade_semantica", "relacionamento_semantico", "contexto_compartilhado")
+_WORD = re.compile(r"\w+", re.UNICODE)
+_DEPLOYMENT_PATH = re.compile(r"^/openai/deployments/(?P<deployment>[^/]+)/(?P<operation>embeddings|chat/completions)$")
+
+
+def _stable_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def fake_embedding(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> np.ndarray:
+    """
+    Vetor determinístico do texto: cada palavra soma +-1 em duas posições escolhidas por hash
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    words = _WORD.findall(text.lower()) or [text]
+    for word in words:
+        hashed = _stable_hash(word)
+        for shift in (0, 32):
+            position = (hashed >> shift) % dimensions
+            vector[position] += 1.0 if (hashed >> (shift + 31)) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[_stable_hash(text) % dimensions] = 1.0
+        return vector
+    return vector / norm
+
+
+def _variants(text: str, label: str, count: int) -> dict:
+    words = _WORD.findall(text)
+    results = {}
+    for position in range(count):
+        rng = random.Random(_stable_hash(f"{label}:{position}:{text}"))
+        sample = rng.sample(words, min(len(words), 12)) if words else [label]
+        results[f"result_{position + 1}"] = f"{label} {position + 1}: " + " ".join(sample)
+    return results
+
+
+def fake_generation(messages: list, json_object: bool, results_per_type: int) -> dict:
+    """
+    Geração no formato dos prompts de src/prompt: um tipo por chamada, ou os três tipos
+    (multi_relacionamento) quando a resposta estruturada é pedida
+    """
+    user_text = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    if json_object:
+        return {key: _variants(user_text, key, results_per_type) for key in CORRELATION_KEYS}
+    system_text = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    title = unicodedata.normalize("NFKD", system_text.split("\n", 1)[0].lower()).encode("ascii", "ignore").decode()
+    label = next((key for key in CORRELATION_KEYS if key.replace("_", " ") in title), "variante")
+    return _variants(user_text, label, results_per_type)
+
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIServer:
+    """
+    Servidor HTTP em uma thread; start() devolve a URL base para AZURE_OPENAI_ENDPOINT
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 1.0, results_per_type: int = 4, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.results_per_type = results_per_type
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"embeddings": 0, "chat_completions": 0, "inputs_embedded": 0, "rate_limited": 0,
+                       "prompt_tokens": 0, "completion_tokens": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def _delay_and_rate_limit(self) -> bool:
+        """
+        Espera a latência simulada; True quando a requisição deve receber um 429
+        """
+        with self._lock:
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            rate_limited = self._random.random() < self.error_rate
+        time.sleep(delay / 1000)
+        return rate_limited
+
+    def _embeddings(self, body: dict) -> dict:
+        inputs = body.get("input")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        dimensions = int(body.get("dimensions") or DEFAULT_DIMENSIONS)
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for position, text in enumerate(inputs):
+            vector = fake_embedding(text, dimensions)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": position, "embedding": embedding})
+        tokens = sum(_token_count(text) for text in inputs)
+        self._count(embeddings=1, inputs_embedded=len(inputs), prompt_tokens=tokens)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-large"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    def _chat_completion(self, body: dict) -> dict:
+        messages = body.get("messages") or []
+        json_object = (body.get("response_format") or {}).get("type") == "json_object"
+        content = json.dumps(fake_generation(messages, json_object, self.results_per_type), ensure_ascii=False)
+        prompt_tokens = sum(_token_count(m.get("content", "")) for m in messages)
+        completion_tokens = _token_count(content)
+        self._count(chat_completions=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return {
+            "id": f"chatcmpl-{_stable_hash(content):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4.1-nano"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                match = _DEPLOYMENT_PATH.match(self.path.split("?", 1)[0])
+                if match is None:
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                if server._delay_and_rate_limit():
+                    server._count(rate_limited=1)
+                    self._send_json(429, {"error": {"code": "429", "message": "Rate limit exceeded (simulated)"}},
+                                    {"Retry-After": str(server.retry_after)})
+                    return
+                if match.group("operation") == "embeddings":
+                    self._send_json(200, server._embeddings(body))
+                else:
+                    self._send_json(200, server._chat_completion(body))
+
+        return Handler
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência fixa de cada resposta")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Latência extra aleatória (uniforme)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração das requisições respondidas com 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Segundos no header Retry-After dos 429")
+    parser.add_argument("--results-per-type", type=int, default=4, help="Textos gerados por tipo de correlação")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.retry_after, args.results_per_type, args.seed)
+    print(f"Fake Azure OpenAI em {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
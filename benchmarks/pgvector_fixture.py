@@ -0,0 +1,134 @@
+"""
+Postgres + pgvector local em um container Docker, com o mesmo schema da aplicação, para os
+benchmarks de carga (benchmarks/bench_load.py) sem depender do banco no Azure.
+
+    up     sobe o container (imagem pgvector/pgvector), cria a extensão, as tabelas, o índice
+           HNSW e a coluna/índice de full-text da busca híbrida
+    reset  apaga os dados (TRUNCATE ... RESTART IDENTITY)
+    down   remove o container e os dados
+    env    imprime as variáveis DB_* para apontar a aplicação para o container
+
+Uso:
+    python -m benchmarks.pgvector_fixture up
+    eval "$(python -m benchmarks.pgvector_fixture env)"
+    python -m benchmarks.pgvector_fixture down
+"""
+
+import argparse
+import subprocess
+import time
+from sqlalchemy import create_engine, text
+
+CONTAINER_NAME = "rag-bench-pgvector"
+IMAGE = "pgvector/pgvector:pg16"
+HOST = "127.0.0.1"
+PORT = 55432
+DATABASE = "rag_bench"
+USER = "postgres"
+PASSWORD = "postgres"
+
+
+def database_env(port: int = PORT) -> dict:
+    """
+    Variáveis DB_* da aplicação para o container local (sem SSL)
+    """
+    return {
+        "DB_HOST": HOST,
+        "DB_PORT": str(port),
+        "DB_NAME": DATABASE,
+        "DB_USER": USER,
+        "DB_PASSWORD": PASSWORD,
+        "DB_SSLMODE": "disable",
+    }
+
+
+def _engine(port: int):
+    return create_engine(f"postgresql://{USER}:{PASSWORD}@{HOST}:{port}/{DATABASE}?sslmode=disable")
+
+
+def _docker(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(["docker", *args], check=check, capture_output=True, text=True)
+
+
+def wait_until_ready(port: int = PORT, timeout: float = 60.0) -> None:
+    engine = _engine(port)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                return
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Postgres em {HOST}:{port} não respondeu em {timeout:.0f}s")
+                time.sleep(0.5)
+    finally:
+        engine.dispose()
+
+
+def create_schema(port: int = PORT) -> list:
+    """
+    Cria a extensão e as tabelas dos modelos e aplica a migração dos vetores (HNSW + full-text)
+    """
+    from src.models.database_models import Base
+    from src.infrastructure.vector_schema import migrate_vector_column
+
+    engine = _engine(port)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        Base.metadata.create_all(engine)
+        return migrate_vector_column(engine, text_search=True)
+    finally:
+        engine.dispose()
+
+
+def reset(port: int = PORT) -> None:
+    engine = _engine(port)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("TRUNCATE db_correlation_embedding, db_origin_text RESTART IDENTITY"))
+    finally:
+        engine.dispose()
+
+
+def up(port: int = PORT, image: str = IMAGE) -> None:
+    running = _docker("ps", "-q", "--filter", f"name=^{CONTAINER_NAME}$").stdout.strip()
+    if not running:
+        _docker("rm", "-f", CONTAINER_NAME, check=False)
+        _docker(
+            "run", "-d", "--name", CONTAINER_NAME,
+            "-e", f"POSTGRES_USER={USER}", "-e", f"POSTGRES_PASSWORD={PASSWORD}", "-e", f"POSTGRES_DB={DATABASE}",
+            "-p", f"{HOST}:{port}:5432", image
+        )
+    wait_until_ready(port)
+    for statement in create_schema(port):
+        print(f"{statement};")
+    print(f"pgvector pronto em {HOST}:{port}/{DATABASE}")
+
+
+def down() -> None:
+    _docker("rm", "-f", CONTAINER_NAME, check=False)
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("up", "reset", "down", "env"))
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--image", default=IMAGE)
+    args = parser.parse_args(argv)
+
+    if args.command == "up":
+        up(args.port, args.image)
+    elif args.command == "reset":
+        reset(args.port)
+    elif args.command == "down":
+        down()
+    else:
+        for name, value in database_env(args.port).items():
+            print(f"export {name}={value}")
+
+
+if __name__ == "__main__":
+    main()
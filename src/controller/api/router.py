@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException
-from src.usecase.embedding_usecase import embedding_usecase, embedding_save_usecase, embedding_search_usecase
+from fastapi.concurrency import run_in_threadpool
+from src.usecase.embedding_usecase import embedding_search_usecase_async, embedding_search_batch_usecase_async
+from src.usecase.ingestion_jobs import submit_ingestion_job, get_ingestion_job
+from src.infrastructure.request_timing import TimedRoute, span
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class TextRequest(BaseModel):
     text: str
@@ -11,40 +14,76 @@ class TextRequestWithStrategy(BaseModel):
     text: str
     index: Optional[int] = 5
 
+class SearchBatchRequest(BaseModel):
+    questions: List[str]
+    top_k: Optional[int] = 5
+    fields: Optional[str] = None
+
 class ChunkPreviewRequest(BaseModel):
     text: str
     chunk_size: Optional[int] = 1000
     chunk_overlap: Optional[int] = 200
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.post("/embedding")
+@router.post("/embedding", status_code=202)
 async def create_embedding(text_request: TextRequest):
     """
-    Create embeddings with custom chunking parameters.
+    Queue an ingestion job; follow its progress at /jobs/{job_id}.
     """
     try:
         text = text_request.text
         index = text_request.index
-        
-        embedding = embedding_usecase(text, index)
-        embedding_save = embedding_save_usecase(embedding)
+
+        job_id = await run_in_threadpool(submit_ingestion_job, text, index)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid input: {e}")
     return {
-        "message": "Embedding created successfully",
-        "text_ids": embedding_save,  
-        "total_chunks": len(embedding_save) if isinstance(embedding_save, list) else 1,
+        "message": "Embedding job queued",
+        "job_id": job_id,
+        "status_url": f"/new_rag/jobs/{job_id}",
     }
 
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(get_ingestion_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
 @router.get("/search_vetorial")
-async def search_embedding(question: str, top_k: int = 5):
+async def search_embedding(question: str, top_k: int = 5, oversample: Optional[int] = None,
+                           hits_per_origin: Optional[int] = None, fields: Optional[str] = None,
+                           mode: Optional[str] = None, correlation_type: Optional[str] = None):
+    """
+    fields: comma-separated projection of the result fields; leave out "origin_texts"
+    to skip the origin text map. mode: "vector" or "hybrid" (vector + full-text).
+    correlation_type: comma-separated correlation types to restrict the search to.
+    """
+    try:
+        filters = {"correlation_type": correlation_type.split(',')} if correlation_type else None
+        with span("usecase"):
+            response = await embedding_search_usecase_async(
+                question, top_k, oversample, hits_per_origin, fields, mode, filters
+            )
+        if isinstance(response, str):
+            raise HTTPException(status_code=500, detail=response)
+        return response if response is not None else {"results": None}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in search: {e}")
+
+@router.post("/search_batch")
+async def search_embedding_batch(search_request: SearchBatchRequest):
+    """
+    Search many questions in one request; results come back per question, in input order.
+    """
     try:
-        results = embedding_search_usecase(question, top_k)
-        if isinstance(results, str):
-            raise HTTPException(status_code=500, detail=results)
-        return {
-            "results": results
-        }
+        with span("usecase"):
+            response = await embedding_search_batch_usecase_async(
+                search_request.questions, search_request.top_k, search_request.fields
+            )
+        if isinstance(response, str):
+            raise HTTPException(status_code=500, detail=response)
+        return response if response is not None else {"results": None}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in search: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error in search: {e}")
@@ -1,11 +1,16 @@
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from dotenv import load_dotenv
 import os
 
+from src.infrastructure.rate_limiter import RATE_LIMIT_ENABLED
+
 load_dotenv()
 
 endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
 api_key = os.getenv("AZURE_OPENAI_API_KEY")
+api_version = "2025-01-01-preview"
+# Com o limitador ligado os retries (429/Retry-After, 5xx) ficam com ele; o SDK não repete sozinho
+sdk_max_retries = int(os.getenv("OPENAI_SDK_MAX_RETRIES", "0" if RATE_LIMIT_ENABLED else "2"))
 
 class OpenAIConnection:
     def __init__(self):
@@ -14,7 +19,26 @@ class OpenAIConnection:
         self.client = AzureOpenAI(
             azure_endpoint=endpoint,
             api_key=api_key,
-            api_version="2025-01-01-preview"
+            api_version=api_version,
+            max_retries=sdk_max_retries
+        )
+
+    def get_client(self):
+        return self.client
+
+
+class AsyncOpenAIConnection:
+    """
+    Cliente assíncrono do Azure OpenAI, para uso dentro do event loop (rotas async)
+    """
+    def __init__(self):
+        if not endpoint or not api_key:
+            raise ValueError("Azure OpenAI endpoint and API key must be set in environment variables.")
+        self.client = AsyncAzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=api_key,
+            api_version=api_version,
+            max_retries=sdk_max_retries
         )
 
     def get_client(self):
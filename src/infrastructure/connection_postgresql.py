@@ -3,6 +3,7 @@ from typing import Optional
 from urllib.parse import quote_plus
 from sqlalchemy import create_engine, Engine, text
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from dotenv import load_dotenv
 import logging
 
@@ -42,7 +43,10 @@ class DatabaseConnection:
             db_user = os.getenv('DB_USER')
             db_password = quote_plus(os.getenv('DB_PASSWORD'))
 
-            database_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?sslmode=require"
+            # require no Azure; disable para um Postgres local (ex.: benchmarks/pgvector_fixture.py)
+            db_sslmode = os.getenv('DB_SSLMODE', 'require')
+
+            database_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?sslmode={db_sslmode}"
 
             self._engine = create_engine(
                 database_url,
@@ -129,6 +133,104 @@ class DatabaseSession:
             finally:
                 self.session.close()
 
+class UnitOfWork(DatabaseSession):
+    """
+    Unidade de trabalho sobre DatabaseSession: todas as escritas de uma requisição usam
+    a mesma conexão do pool e uma única transação, confirmada (commit) apenas na saída
+    do bloco; qualquer erro desfaz tudo (rollback).
+
+    Exemplo:
+        with UnitOfWork() as uow:
+            uow.session.execute(...)
+            cursor = uow.dbapi_connection().cursor()
+    """
+    def __enter__(self) -> 'UnitOfWork':
+        super().__enter__()
+        # Fixa a conexão do pool e abre a transação já na entrada do bloco
+        self.session.connection()
+        return self
+
+    def dbapi_connection(self):
+        """
+        Retorna a conexão DBAPI (psycopg2) da transação, para operações como COPY
+        """
+        return self.session.connection().connection
+
+    def flush(self) -> None:
+        """
+        Envia as alterações pendentes sem confirmar a transação
+        """
+        self.session.flush()
+
+
+class AsyncDatabaseConnection:
+    """
+    Classe singleton para a conexão assíncrona com PostgreSQL (SQLAlchemy + asyncpg),
+    usada pelas rotas async para não bloquear o event loop
+    """
+    _instance: Optional['AsyncDatabaseConnection'] = None
+    _engine: Optional[AsyncEngine] = None
+    _session_factory: Optional[async_sessionmaker] = None
+
+    def __new__(cls) -> 'AsyncDatabaseConnection':
+        if cls._instance is None:
+            cls._instance = super(AsyncDatabaseConnection, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._engine is None:
+            self._initialize_connection()
+
+    def _initialize_connection(self) -> None:
+        """
+        Inicializa a engine assíncrona com os mesmos parâmetros de pool da engine síncrona
+        """
+        try:
+            db_host = os.getenv('DB_HOST')
+            db_port = os.getenv('DB_PORT')
+            db_name = os.getenv('DB_NAME')
+            db_user = os.getenv('DB_USER')
+            db_password = quote_plus(os.getenv('DB_PASSWORD'))
+
+            database_url = f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+            self._engine = create_async_engine(
+                database_url,
+                echo=os.getenv('DB_ECHO', 'False').lower() == 'true',
+                pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+                max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20')),
+                pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
+                pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '3600')),
+                pool_pre_ping=True,
+                connect_args={"ssl": os.getenv('DB_SSLMODE', 'require')}
+            )
+
+            self._session_factory = async_sessionmaker(
+                bind=self._engine,
+                autoflush=False,
+                expire_on_commit=False
+            )
+
+        except Exception as e:
+            logger.error(f"Erro ao conectar com PostgreSQL (async): {e}")
+            raise
+
+    def get_engine(self) -> AsyncEngine:
+        if self._engine is None:
+            raise RuntimeError("Conexão com banco não foi inicializada")
+        return self._engine
+
+    def get_session(self) -> AsyncSession:
+        if self._session_factory is None:
+            raise RuntimeError("Session factory não foi inicializada")
+        return self._session_factory()
+
+    async def close_connection(self) -> None:
+        if self._engine:
+            await self._engine.dispose()
+            logger.info("Conexão assíncrona com banco fechada")
+
+
 def get_database_connection() -> DatabaseConnection:
     """
     Retorna uma instância da conexão com o banco
@@ -141,6 +243,19 @@ def get_db_session() -> Session:
     """
     return DatabaseConnection().get_session()
 
+def get_async_db_session() -> AsyncSession:
+    """
+    Retorna uma nova sessão assíncrona do banco
+    """
+    return AsyncDatabaseConnection().get_session()
+
+async def close_async_database_connection() -> None:
+    """
+    Libera o pool assíncrono, se ele tiver sido criado
+    """
+    if AsyncDatabaseConnection._instance is not None:
+        await AsyncDatabaseConnection._instance.close_connection()
+
 # test connection
 # if __name__ == "__main__":
 #     db_conn = get_database_connection()
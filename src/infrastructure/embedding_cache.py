@@ -0,0 +1,277 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+import logging
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Cache em memória limitado por número de entradas (LRU), com TTL opcional e thread-safe
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Retorna o valor da chave ou None se ausente/expirado
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, stored_at: float = None) -> None:
+        """
+        Armazena o valor, removendo as entradas menos usadas além do limite
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time() if stored_at is None else stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def pack_vector(vector) -> bytes:
+    """
+    Serializa o vetor como float32 contíguo
+    """
+    return array('f', vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> list:
+    """
+    Desserializa um blob float32 para lista de floats
+    """
+    vector = array('f')
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings endereçado por conteúdo: hash(modelo, dimensões, texto).
+
+    Uma camada LRU em memória fica na frente de um armazenamento SQLite local, onde os
+    vetores são gravados como blobs float32. Entradas expiram por TTL e o arquivo é
+    limitado a max_entries, removendo as entradas acessadas há mais tempo.
+    """
+    _EVICTION_INTERVAL = 1000
+
+    def __init__(self, path: str, memory_size: int = 2048, max_entries: int = 1000000, ttl_seconds: float = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(memory_size, ttl_seconds)
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_access ON embedding_cache(last_access)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(model: str, dimensions: int, text: str) -> str:
+        """
+        Gera a chave de conteúdo para (modelo, dimensões, texto)
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{model}\x00{dimensions}\x00".encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get_many(self, model: str, dimensions: int, texts: list) -> list:
+        """
+        Busca os vetores dos textos; retorna uma lista alinhada com None nas ausências
+        """
+        keys = [self.make_key(model, dimensions, text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+        memory_hits = 0
+        for position, key in enumerate(keys):
+            blob = self.memory.get(key)
+            if blob is not None:
+                results[position] = unpack_vector(blob)
+                memory_hits += 1
+            else:
+                missing.setdefault(key, []).append(position)
+
+        disk_hits = 0
+        if missing:
+            now = time.time()
+            found = self._read_disk(list(missing), now)
+            for key, (blob, created_at) in found.items():
+                self.memory.put(key, blob, created_at)
+                vector = unpack_vector(blob)
+                for position in missing[key]:
+                    results[position] = vector
+                    disk_hits += 1
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.hits += memory_hits + disk_hits
+            self.misses += len(texts) - memory_hits - disk_hits
+        return results
+
+    def get(self, model: str, dimensions: int, text: str) -> Optional[list]:
+        return self.get_many(model, dimensions, [text])[0]
+
+    def _read_disk(self, keys: list, now: float) -> dict:
+        found = {}
+        expired = []
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector, created_at FROM embedding_cache WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob, created_at in rows:
+                    if self._is_expired(created_at, now):
+                        expired.append(key)
+                    else:
+                        found[key] = (blob, created_at)
+            if found:
+                self._connection.executemany(
+                    "UPDATE embedding_cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            if expired:
+                self._connection.executemany("DELETE FROM embedding_cache WHERE key = ?", [(key,) for key in expired])
+            if found or expired:
+                self._connection.commit()
+        return found
+
+    def put_many(self, model: str, dimensions: int, texts: list, vectors: list) -> None:
+        """
+        Armazena os vetores dos textos nas duas camadas
+        """
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            key = self.make_key(model, dimensions, text)
+            blob = pack_vector(vector)
+            self.memory.put(key, blob, now)
+            rows.append((key, blob, now, now))
+        if not rows:
+            return
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, vector, created_at, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._connection.commit()
+            self._writes_since_eviction += len(rows)
+            if self._writes_since_eviction >= self._EVICTION_INTERVAL:
+                self._writes_since_eviction = 0
+                self._evict_locked(now)
+
+    def put(self, model: str, dimensions: int, text: str, vector) -> None:
+        self.put_many(model, dimensions, [text], [vector])
+
+    def evict(self) -> None:
+        """
+        Remove entradas expiradas e as menos acessadas além de max_entries
+        """
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def _evict_locked(self, now: float) -> None:
+        if self.ttl_seconds:
+            self._connection.execute("DELETE FROM embedding_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._connection.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        if count > self.max_entries:
+            self._connection.execute(
+                "DELETE FROM embedding_cache WHERE key IN "
+                "(SELECT key FROM embedding_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+        self._connection.commit()
+
+    def stats(self) -> dict:
+        """
+        Retorna contadores de acertos/faltas e tamanho das camadas
+        """
+        with self._lock:
+            disk_entries = self._connection.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.hits - self.memory_hits,
+                "misses": self.misses,
+                "memory_entries": len(self.memory),
+                "disk_entries": disk_entries
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Retorna o cache de embeddings do processo, ou None se EMBEDDING_CACHE_ENABLED não estiver ativo
+    """
+    global _embedding_cache
+    if os.getenv('EMBEDDING_CACHE_ENABLED', 'False').lower() != 'true':
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(
+                    path=os.getenv('EMBEDDING_CACHE_PATH', 'embedding_cache.db'),
+                    memory_size=int(os.getenv('EMBEDDING_CACHE_MEMORY_SIZE', '2048')),
+                    max_entries=int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '1000000')),
+                    ttl_seconds=float(os.getenv('EMBEDDING_CACHE_TTL_SECONDS', '2592000'))
+                )
+                logger.info(f"Cache de embeddings ativo em {_embedding_cache.path}")
+    return _embedding_cache
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+import logging
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def hash_text(text: str) -> str:
+    """
+    Hash sha256 de um texto (chunk ou prompt)
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """
+    Armazena os resultados da geração semântica por (hash do chunk, hash do prompt, modelo).
+
+    Como o hash do prompt faz parte da chave, alterar um arquivo em src/prompt/ faz com que
+    apenas as entradas daquele tipo deixem de ser encontradas; invalidate_prompt remove
+    essas entradas antigas do arquivo.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._checked_prompts = set()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS generation_cache (
+                chunk_hash TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_name TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (chunk_hash, prompt_hash, model)
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_generation_cache_prompt ON generation_cache(prompt_name, prompt_hash)"
+        )
+        self._connection.commit()
+
+    def get(self, model: str, prompt: str, input_text: str) -> Optional[dict]:
+        """
+        Retorna o resultado armazenado para o chunk/prompt/modelo, ou None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM generation_cache WHERE chunk_hash = ? AND prompt_hash = ? AND model = ?",
+                (hash_text(input_text), hash_text(prompt), model)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, model: str, prompt_name: str, prompt: str, input_text: str, result: dict) -> None:
+        """
+        Armazena o resultado da geração
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO generation_cache "
+                "(chunk_hash, prompt_hash, model, prompt_name, result, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (hash_text(input_text), hash_text(prompt), model, prompt_name,
+                 json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._connection.commit()
+
+    def invalidate_prompt(self, prompt_name: str, prompt: str) -> int:
+        """
+        Remove as entradas de prompt_name geradas com uma versão diferente do prompt.
+        Executa no máximo uma vez por versão de prompt no processo.
+        """
+        prompt_hash = hash_text(prompt)
+        with self._lock:
+            if (prompt_name, prompt_hash) in self._checked_prompts:
+                return 0
+            cursor = self._connection.execute(
+                "DELETE FROM generation_cache WHERE prompt_name = ? AND prompt_hash != ?",
+                (prompt_name, prompt_hash)
+            )
+            self._connection.commit()
+            self._checked_prompts.add((prompt_name, prompt_hash))
+        if cursor.rowcount:
+            logger.info(f"Prompt {prompt_name} alterado: {cursor.rowcount} gerações antigas removidas do cache")
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_generation_cache: Optional[GenerationCache] = None
+_generation_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> Optional[GenerationCache]:
+    """
+    Retorna o cache de gerações do processo, ou None se GENERATION_CACHE_ENABLED não estiver ativo
+    """
+    global _generation_cache
+    if os.getenv('GENERATION_CACHE_ENABLED', 'False').lower() != 'true':
+        return None
+    if _generation_cache is None:
+        with _generation_cache_lock:
+            if _generation_cache is None:
+                _generation_cache = GenerationCache(os.getenv('GENERATION_CACHE_PATH', 'generation_cache.db'))
+                logger.info(f"Cache de gerações ativo em {_generation_cache.path}")
+    return _generation_cache
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+import logging
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Um job em execução pertence ao processo que o pegou enquanto o lease for renovado (heartbeat);
+# só depois que o lease expira ele volta para a fila, ou falha ao atingir JOB_MAX_ATTEMPTS
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+_JOB_COLUMNS = (
+    "id", "kind", "status", "payload", "chunks_total", "chunks_done", "vectors_saved",
+    "result", "error", "attempts", "created_at", "started_at", "finished_at", "updated_at",
+    "owner", "lease_until"
+)
+# Colunas acrescentadas depois da primeira versão da tabela
+_MIGRATED_COLUMNS = {"owner": "TEXT", "lease_until": "REAL"}
+
+
+class JobStore:
+    """
+    Fila de jobs persistida em SQLite local.
+
+    Os jobs sobrevivem a um reinício do processo: requeue_expired devolve para a fila os jobs
+    cujo dono parou de renovar o lease. O arquivo pode ser compartilhado por vários processos
+    (workers do uvicorn): cada instância tem o próprio owner e só renova os próprios jobs.
+    """
+    def __init__(self, path: str, lease_seconds: float = None, max_attempts: int = None):
+        self.path = path
+        self.lease_seconds = JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.max_attempts = JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                chunks_total INTEGER,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                vectors_saved INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                lease_until REAL
+            )
+        """)
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in _MIGRATED_COLUMNS.items():
+            if column not in existing:
+                self._connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._connection.commit()
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._connection.execute(sql, parameters)
+            self._connection.commit()
+            return cursor
+
+    def create(self, kind: str, payload: dict) -> str:
+        """
+        Enfileira um novo job e retorna seu id
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, JOB_QUEUED, json.dumps(payload, ensure_ascii=False), now, now)
+        )
+        return job_id
+
+    def claim_next(self) -> Optional[dict]:
+        """
+        Marca o job mais antigo da fila como em execução por esta instância (com lease) e o retorna,
+        ou None se a fila estiver vazia
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                f"UPDATE jobs SET status = ?, started_at = ?, updated_at = ?, attempts = attempts + 1, "
+                f"owner = ?, lease_until = ? "
+                f"WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) "
+                f"RETURNING {', '.join(_JOB_COLUMNS)}",
+                (JOB_RUNNING, now, now, self.owner, now + self.lease_seconds, JOB_QUEUED)
+            ).fetchone()
+            self._connection.commit()
+        return self._to_dict(row) if row else None
+
+    def _update_owned(self, job_id: str, assignments: str, parameters: tuple) -> bool:
+        """
+        Atualiza um job em execução desta instância, renovando o lease. False quando o job não é
+        mais dela (o lease expirou e o job voltou para a fila ou foi pego por outro processo)
+        """
+        now = time.time()
+        cursor = self._execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ?, lease_until = ? "
+            f"WHERE id = ? AND owner = ? AND status = ?",
+            parameters + (now, now + self.lease_seconds, job_id, self.owner, JOB_RUNNING)
+        )
+        if not cursor.rowcount:
+            logger.warning(f"Job {job_id} não pertence mais a {self.owner}; atualização ignorada")
+        return cursor.rowcount > 0
+
+    def update_progress(self, job_id: str, chunks_done: int, chunks_total: int, vectors_saved: int) -> bool:
+        return self._update_owned(
+            job_id, "chunks_done = ?, chunks_total = ?, vectors_saved = ?", (chunks_done, chunks_total, vectors_saved)
+        )
+
+    def complete(self, job_id: str, result) -> bool:
+        return self._update_owned(
+            job_id, "status = ?, result = ?, error = NULL, finished_at = ?",
+            (JOB_SUCCEEDED, json.dumps(result, ensure_ascii=False), time.time())
+        )
+
+    def fail(self, job_id: str, error: str) -> bool:
+        return self._update_owned(job_id, "status = ?, error = ?, finished_at = ?", (JOB_FAILED, error, time.time()))
+
+    def renew_leases(self) -> int:
+        """
+        Heartbeat: estende o lease de todos os jobs em execução desta instância
+        """
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+            (now + self.lease_seconds, self.owner, JOB_RUNNING)
+        )
+        return cursor.rowcount
+
+    def requeue_expired(self) -> int:
+        """
+        Devolve para a fila os jobs em execução cujo lease expirou (o processo dono parou ou travou).
+        O progresso é zerado porque a gravação de um job é atômica. Jobs que já atingiram
+        max_attempts falham em vez de voltar, para que um job que derruba o processo não repita sempre.
+        """
+        now = time.time()
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        with self._lock:
+            failed = self._connection.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ?, lease_until = NULL "
+                f"WHERE {expired} AND attempts >= ?",
+                (JOB_FAILED, f"Interrompido em {self.max_attempts} tentativas", now, now,
+                 JOB_RUNNING, now, self.max_attempts)
+            ).rowcount
+            requeued = self._connection.execute(
+                f"UPDATE jobs SET status = ?, chunks_done = 0, vectors_saved = 0, started_at = NULL, "
+                f"updated_at = ?, owner = NULL, lease_until = NULL WHERE {expired}",
+                (JOB_QUEUED, now, JOB_RUNNING, now)
+            ).rowcount
+            self._connection.commit()
+        if failed:
+            logger.warning(f"{failed} jobs interrompidos atingiram {self.max_attempts} tentativas e falharam")
+        if requeued:
+            logger.info(f"{requeued} jobs interrompidos voltaram para a fila")
+        return requeued
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def count_by_status(self) -> dict:
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    @staticmethod
+    def _to_dict(row: tuple) -> dict:
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_job_store: Optional[JobStore] = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """
+    Retorna a fila de jobs do processo (arquivo em JOB_STORE_PATH)
+    """
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                _job_store = JobStore(os.getenv('JOB_STORE_PATH', 'jobs.db'))
+                logger.info(f"Fila de jobs em {_job_store.path}")
+    return _job_store
@@ -0,0 +1,145 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from src.infrastructure.request_timing import span
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registro próprio da aplicação (sem as métricas padrão de processo/GC do prometheus_client)
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# Etapas vão de milissegundos (busca no índice local) a minutos (geração de um documento grande)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+OPENAI_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+STAGE_DURATION = Histogram(
+    "rag_stage_duration_seconds",
+    "Duração de cada etapa dos casos de uso (embedding, save, search)",
+    ["pipeline", "stage"],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "rag_openai_request_duration_seconds",
+    "Duração de cada chamada ao Azure OpenAI, incluindo a espera e os retries do limitador (o SDK não faz retries)",
+    ["operation"],
+    buckets=OPENAI_BUCKETS,
+    registry=REGISTRY
+)
+OPENAI_REQUESTS = Counter(
+    "rag_openai_requests",
+    "Chamadas ao Azure OpenAI por operação e resultado",
+    ["operation", "outcome"],
+    registry=REGISTRY
+)
+OPENAI_TOKENS = Counter(
+    "rag_openai_tokens",
+    "Tokens consumidos no Azure OpenAI, conforme o usage das respostas",
+    ["operation", "kind"],
+    registry=REGISTRY
+)
+OPENAI_RETRIES = Counter(
+    "rag_openai_retries",
+    "Novas tentativas do limitador por deployment e motivo (rate_limited, transient)",
+    ["operation", "reason"],
+    registry=REGISTRY
+)
+OPENAI_CONCURRENCY_LIMIT = Gauge(
+    "rag_openai_concurrency_limit",
+    "Limite de chamadas simultâneas (AIMD) do limitador de cada deployment",
+    ["operation"],
+    registry=REGISTRY
+)
+RATE_LIMIT_WAIT = Histogram(
+    "rag_openai_rate_limit_wait_seconds",
+    "Espera no limitador (concorrência, RPM/TPM, Retry-After) antes de cada tentativa",
+    ["operation", "lane"],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY
+)
+GENERATION_JSON_PARSE_FAILURES = Counter(
+    "rag_generation_json_parse_failures",
+    "Respostas de geração que não puderam ser lidas como JSON",
+    registry=REGISTRY
+)
+
+
+@contextmanager
+def observe_stage(pipeline: str, stage: str):
+    """
+    Mede a duração do bloco em rag_stage_duration_seconds{pipeline, stage}, inclusive quando falha,
+    e a registra como span "pipeline.stage" no Server-Timing da requisição
+    """
+    start = time.perf_counter()
+    try:
+        with span(f"{pipeline}.{stage}"):
+            yield
+    finally:
+        STAGE_DURATION.labels(pipeline, stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def observe_openai_call(operation: str):
+    """
+    Mede uma chamada ao Azure OpenAI ("chat" ou "embeddings") e conta o resultado (success/error)
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with span(f"openai.{operation}"):
+            yield
+        outcome = "success"
+    finally:
+        OPENAI_REQUEST_DURATION.labels(operation).observe(time.perf_counter() - start)
+        OPENAI_REQUESTS.labels(operation, outcome).inc()
+
+
+def record_token_usage(operation: str, usage) -> None:
+    """
+    Soma prompt_tokens/completion_tokens do usage da resposta (ignora campos ausentes)
+    """
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int) and tokens > 0:
+            OPENAI_TOKENS.labels(operation, kind).inc(tokens)
+
+
+class ConnectionPoolCollector:
+    """
+    Gauges do pool de conexões das engines SQLAlchemy já criadas, lidos a cada coleta.
+    Não cria conexões: engines ainda não inicializadas não aparecem.
+    """
+    def collect(self):
+        from src.infrastructure.connection_postgresql import DatabaseConnection, AsyncDatabaseConnection
+
+        gauges = {
+            "size": GaugeMetricFamily("rag_db_pool_size", "Tamanho configurado do pool", labels=["engine"]),
+            "checkedout": GaugeMetricFamily("rag_db_pool_checked_out", "Conexões em uso", labels=["engine"]),
+            "checkedin": GaugeMetricFamily("rag_db_pool_checked_in", "Conexões livres no pool", labels=["engine"]),
+            "overflow": GaugeMetricFamily("rag_db_pool_overflow", "Conexões além de pool_size (negativo enquanto o pool não encheu)", labels=["engine"]),
+        }
+        engines = (
+            ("sync", DatabaseConnection._instance and DatabaseConnection._instance._engine),
+            ("async", AsyncDatabaseConnection._instance and AsyncDatabaseConnection._instance._engine),
+        )
+        for name, engine in engines:
+            if not engine:
+                continue
+            pool = engine.pool if name == "sync" else engine.sync_engine.pool
+            for attribute, gauge in gauges.items():
+                reader = getattr(pool, attribute, None)
+                if callable(reader):
+                    gauge.add_metric([name], reader())
+        yield from gauges.values()
+
+
+REGISTRY.register(ConnectionPoolCollector())
+
+
+def render_metrics() -> tuple:
+    """
+    Métricas no formato texto do Prometheus: (conteúdo, content type)
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
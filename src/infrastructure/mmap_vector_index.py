@@ -0,0 +1,585 @@
+"""
+Índice vetorial local em arquivos mapeados em memória, para servir a busca sem ida ao Postgres.
+
+Os vetores (normalizados, float32 ou float16) ficam em uma matriz contígua em disco aberta
+com np.memmap em modo somente leitura: os workers do uvicorn que abrem o mesmo diretório
+compartilham as mesmas páginas do cache do sistema operacional, sem uma cópia por processo.
+Ao lado da matriz ficam os IDs de db_correlation_embedding (int64, mesma ordem das linhas)
+e um SQLite com o texto das variantes e os textos de origem.
+
+Arquivos do diretório MMAP_INDEX_PATH:
+
+    meta.json              geração atual, número de linhas válidas, dimensões e tipo
+    vectors-<geração>.bin  matriz de vetores
+    ids-<geração>.bin      IDs das linhas
+    rows-<geração>.db      variantes e textos de origem (SQLite)
+
+Novas linhas são acrescentadas no fim dos arquivos e só passam a valer quando meta.json é
+regravado (os leitores nunca veem uma linha incompleta). A ressincronização completa grava
+uma nova geração e troca meta.json de forma atômica. Escritas entre processos são
+serializadas por um flock em index.lock.
+
+Uso:
+    python -m src.infrastructure.mmap_vector_index            # acrescenta as linhas novas do banco
+    python -m src.infrastructure.mmap_vector_index --rebuild  # recria o índice inteiro
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import numpy as np
+from sqlalchemy import select, func
+from dotenv import load_dotenv
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+from src.infrastructure.vector_schema import EMBEDDING_DIMENSIONS
+from src.models.database_models import DbOriginText, DbCorrelationEmbedding
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INDEX_DTYPES = ("float32", "float16")
+# Linhas lidas do banco por lote na sincronização
+SYNC_BATCH_ROWS = 5000
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _as_float32(vector) -> np.ndarray:
+    # HalfVector (halfvec) expõe to_list(); vector já chega como np.ndarray
+    if hasattr(vector, "to_list"):
+        vector = vector.to_list()
+    return np.asarray(vector, dtype=np.float32)
+
+
+class MmapVectorIndex:
+    """
+    Busca exata por cosseno sobre a matriz mapeada em memória: produto escalar por blocos
+    (convertidos para float32) e top-k com argpartition, sem ordenar a matriz inteira.
+    """
+    def __init__(self, path: str, dimensions: int, dtype: str = "float32", block_rows: int = 65536):
+        if dtype not in INDEX_DTYPES:
+            raise ValueError(f"dtype must be one of {INDEX_DTYPES}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimensions = dimensions
+        self.dtype = np.dtype(dtype)
+        self.block_rows = block_rows
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._lock_file = None
+        self._meta_stamp = None
+        self._meta = None
+        self._vectors = None
+        self._ids = None
+        self._rows_db = None
+        self._rows_generation = None
+
+    # Arquivos
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _file(self, name: str, generation: int, extension: str = "bin") -> str:
+        return os.path.join(self.path, f"{name}-{generation}.{extension}")
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self._meta_path(), encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+        except FileNotFoundError:
+            return None
+        if meta["dimensions"] != self.dimensions or meta["dtype"] != self.dtype.name:
+            logger.warning(
+                f"Índice em {self.path} tem {meta['dimensions']} dimensões ({meta['dtype']}); "
+                f"esperado {self.dimensions} ({self.dtype.name}). Execute a ressincronização completa."
+            )
+            return None
+        return meta
+
+    def _write_meta(self, meta: dict) -> None:
+        meta["updated_at"] = time.time()
+        temporary = self._meta_path() + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temporary, self._meta_path())
+
+    def _connect_rows(self, generation: int) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._file("rows", generation, "db"), check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                id INTEGER PRIMARY KEY,
+                origin_text_id INTEGER NOT NULL,
+                correlation_type TEXT NOT NULL,
+                text_content TEXT NOT NULL
+            )
+        """)
+        connection.execute("CREATE TABLE IF NOT EXISTS origin_texts (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        connection.commit()
+        return connection
+
+    @contextmanager
+    def _writer(self):
+        """
+        Serializa as escritas entre threads e, com flock, entre processos
+        """
+        with self._write_lock:
+            if self._write_depth == 0 and fcntl is not None:
+                if self._lock_file is None:
+                    self._lock_file = open(os.path.join(self.path, "index.lock"), "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._write_depth += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _new_generation(self, generation: int) -> dict:
+        for name in ("vectors", "ids"):
+            open(self._file(name, generation), "wb").close()
+        self._connect_rows(generation).close()
+        return {
+            "generation": generation,
+            "count": 0,
+            "max_embedding_id": 0,
+            "dimensions": self.dimensions,
+            "dtype": self.dtype.name,
+            "synced_at": None
+        }
+
+    def _writable_meta(self) -> dict:
+        meta = self._read_meta()
+        if meta is None:
+            previous = self._read_generation()
+            meta = self._new_generation(previous + 1)
+            self._write_meta(meta)
+        return meta
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self._meta_path(), encoding="utf-8") as meta_file:
+                return json.load(meta_file)["generation"]
+        except FileNotFoundError:
+            return 0
+
+    # Leitura
+
+    def _refresh(self) -> None:
+        """
+        Remapeia os arquivos se meta.json mudou (novas linhas ou nova geração)
+        """
+        try:
+            stat = os.stat(self._meta_path())
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._meta_stamp:
+            return
+        meta = self._read_meta() if stamp is not None else None
+        self._meta_stamp = stamp
+        self._meta = meta
+        self._vectors = None
+        self._ids = None
+        if meta is None:
+            return
+        if self._rows_generation != meta["generation"]:
+            if self._rows_db is not None:
+                self._rows_db.close()
+            self._rows_db = self._connect_rows(meta["generation"])
+            self._rows_generation = meta["generation"]
+        count = meta["count"]
+        if count:
+            self._vectors = np.memmap(
+                self._file("vectors", meta["generation"]), dtype=self.dtype, mode="r",
+                shape=(count, self.dimensions)
+            )
+            self._ids = np.memmap(self._file("ids", meta["generation"]), dtype=np.int64, mode="r", shape=(count,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._meta["count"] if self._meta else 0
+
+    def meta(self) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            return dict(self._meta) if self._meta else None
+
+    def search(self, query_vector, top_k: int) -> list:
+        """
+        Retorna [(embedding_id, distância de cosseno)] dos top_k vetores mais próximos,
+        em ordem crescente de distância
+        """
+        with self._lock:
+            self._refresh()
+            vectors, ids = self._vectors, self._ids
+        if vectors is None or top_k <= 0:
+            return []
+        query = _normalize(_as_float32(query_vector))
+        k = min(top_k, len(ids))
+
+        positions, scores = [], []
+        for start in range(0, len(vectors), self.block_rows):
+            block_scores = np.asarray(vectors[start:start + self.block_rows], dtype=np.float32) @ query
+            if len(block_scores) > k:
+                top = np.argpartition(block_scores, -k)[-k:]
+            else:
+                top = np.arange(len(block_scores))
+            positions.append(top + start)
+            scores.append(block_scores[top])
+        positions = np.concatenate(positions)
+        scores = np.concatenate(scores)
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+            positions, scores = positions[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(ids[position]), float(1.0 - score)) for position, score in zip(positions[order], scores[order])]
+
+    def _select_by_ids(self, sql: str, ids: list) -> list:
+        rows = []
+        with self._lock:
+            self._refresh()
+            if self._rows_db is None:
+                return rows
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(self._rows_db.execute(sql.format(placeholders=placeholders), batch).fetchall())
+        return rows
+
+    def rows(self, embedding_ids: list) -> dict:
+        """
+        {embedding_id: (text_content, correlation_type, origin_text_id)}
+        """
+        rows = self._select_by_ids(
+            "SELECT id, text_content, correlation_type, origin_text_id FROM embeddings WHERE id IN ({placeholders})",
+            embedding_ids
+        )
+        return {row[0]: row[1:] for row in rows}
+
+    def origin_texts(self, origin_text_ids: list) -> dict:
+        rows = self._select_by_ids("SELECT id, data FROM origin_texts WHERE id IN ({placeholders})", origin_text_ids)
+        return dict(rows)
+
+    # Escrita
+
+    def _write_rows(self, meta: dict, rows: list, origin_texts: dict) -> None:
+        generation, count = meta["generation"], meta["count"]
+        if rows:
+            matrix = np.stack([_as_float32(row["embedding"]) for row in rows])
+            if matrix.shape[1] != self.dimensions:
+                raise ValueError(f"Expected vectors with {self.dimensions} dimensions, got {matrix.shape[1]}")
+            matrix = _normalize(matrix).astype(self.dtype)
+            ids = np.asarray([row["embedding_id"] for row in rows], dtype=np.int64)
+            # Grava a partir da última linha válida: sobras de uma escrita interrompida são descartadas
+            for name, data, row_bytes in (("vectors", matrix, self.dimensions * self.dtype.itemsize), ("ids", ids, 8)):
+                with open(self._file(name, generation), "r+b") as data_file:
+                    data_file.seek(count * row_bytes)
+                    data_file.write(data.tobytes())
+                    data_file.truncate()
+
+        connection = self._connect_rows(generation)
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (id, origin_text_id, correlation_type, text_content) VALUES (?, ?, ?, ?)",
+                [(row["embedding_id"], row["origin_text_id"], row["correlation_type"], row["text_content"]) for row in rows]
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO origin_texts (id, data) VALUES (?, ?)", list((origin_texts or {}).items())
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+        if rows:
+            meta["count"] = count + len(rows)
+            meta["max_embedding_id"] = max(meta["max_embedding_id"], int(ids.max()))
+
+    def _existing_ids(self, meta: dict) -> np.ndarray:
+        if not meta["count"]:
+            return np.empty(0, dtype=np.int64)
+        return np.fromfile(self._file("ids", meta["generation"]), dtype=np.int64, count=meta["count"])
+
+    def append(self, rows: list, origin_texts: dict = None) -> int:
+        """
+        Acrescenta linhas já gravadas no banco. IDs que já estão no índice são ignorados.
+
+        Args:
+            rows (list): Dicts com embedding_id, origin_text_id, correlation_type, text_content e embedding
+            origin_texts (dict): {origin_text_id: texto} dos textos de origem das linhas
+
+        Returns:
+            int: Número de linhas acrescentadas
+        """
+        with self._writer():
+            meta = self._writable_meta()
+            known = set(self._existing_ids(meta).tolist())
+            new_rows = []
+            for row in rows:
+                if row["embedding_id"] not in known:
+                    known.add(row["embedding_id"])
+                    new_rows.append(row)
+            if not new_rows and not origin_texts:
+                return 0
+            self._write_rows(meta, new_rows, origin_texts)
+            self._write_meta(meta)
+        return len(new_rows)
+
+    def add_origin_texts(self, origin_texts: dict) -> None:
+        self.append([], origin_texts)
+
+    def rebuild(self, row_batches, origin_text_batches) -> int:
+        """
+        Recria o índice em uma nova geração e troca para ela de uma vez; os leitores
+        seguem na geração anterior até a troca.
+
+        Args:
+            row_batches: Iterável de listas de linhas (mesmo formato de append)
+            origin_text_batches: Iterável de dicts {origin_text_id: texto}
+
+        Returns:
+            int: Número de linhas do novo índice
+        """
+        with self._writer():
+            previous = self._read_generation()
+            meta = self._new_generation(previous + 1)
+            for origin_texts in origin_text_batches:
+                self._write_rows(meta, [], origin_texts)
+            for rows in row_batches:
+                self._write_rows(meta, rows, None)
+            meta["synced_at"] = time.time()
+            self._write_meta(meta)
+            self._remove_generations_before(meta["generation"])
+        return meta["count"]
+
+    def _remove_generations_before(self, generation: int) -> None:
+        # Processos que ainda mapeiam os arquivos antigos continuam lendo até remapear
+        for name in os.listdir(self.path):
+            stem, _, extension = name.partition(".")
+            prefix, _, number = stem.rpartition("-")
+            if prefix in ("vectors", "ids", "rows") and number.isdigit() and int(number) < generation:
+                os.remove(os.path.join(self.path, name))
+
+    def mark_synced(self) -> None:
+        with self._writer():
+            meta = self._writable_meta()
+            meta["synced_at"] = time.time()
+            self._write_meta(meta)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._rows_db is not None:
+                self._rows_db.close()
+                self._rows_db = None
+                self._rows_generation = None
+            self._meta_stamp = None
+            self._vectors = None
+            self._ids = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+# Sincronização com o banco
+
+def _embedding_batches(session, min_id: int = 0):
+    statement = (
+        select(
+            DbCorrelationEmbedding.id,
+            DbCorrelationEmbedding.id_text_origin,
+            DbCorrelationEmbedding.correlation_type,
+            DbCorrelationEmbedding.text_content,
+            DbCorrelationEmbedding.vector
+        )
+        .where(DbCorrelationEmbedding.vector.isnot(None), DbCorrelationEmbedding.id > min_id)
+        .order_by(DbCorrelationEmbedding.id)
+        .execution_options(yield_per=SYNC_BATCH_ROWS)
+    )
+    for partition in session.execute(statement).partitions():
+        yield [
+            {
+                "embedding_id": row[0],
+                "origin_text_id": row[1],
+                "correlation_type": row[2],
+                "text_content": row[3],
+                "embedding": row[4]
+            }
+            for row in partition
+        ]
+
+
+def _origin_text_batches(session):
+    statement = select(DbOriginText.id, DbOriginText.data).execution_options(yield_per=SYNC_BATCH_ROWS)
+    for partition in session.execute(statement).partitions():
+        yield {row[0]: row[1] for row in partition}
+
+
+def _fetch_origin_texts(session, origin_text_ids: set) -> dict:
+    rows = session.execute(select(DbOriginText.id, DbOriginText.data).where(DbOriginText.id.in_(origin_text_ids)))
+    return {row[0]: row[1] for row in rows}
+
+
+def rebuild_from_database(index: MmapVectorIndex, session) -> int:
+    return index.rebuild(_embedding_batches(session), _origin_text_batches(session))
+
+
+def sync_from_database(index: MmapVectorIndex, session) -> dict:
+    """
+    Acrescenta as linhas novas do banco (id maior que o último indexado). Se a contagem
+    ainda divergir (linhas removidas ou gravadas fora de ordem), recria o índice.
+
+    Returns:
+        dict: appended, rebuilt e count
+    """
+    with index._writer():
+        meta = index._writable_meta()
+        appended = 0
+        for rows in _embedding_batches(session, meta["max_embedding_id"]):
+            origin_texts = _fetch_origin_texts(session, {row["origin_text_id"] for row in rows})
+            appended += index.append(rows, origin_texts)
+
+        expected = session.execute(
+            select(func.count()).select_from(DbCorrelationEmbedding).where(DbCorrelationEmbedding.vector.isnot(None))
+        ).scalar()
+        rebuilt = expected != len(index)
+        if rebuilt:
+            logger.info(f"Índice vetorial com {len(index)} linhas, banco com {expected}: recriando")
+            rebuild_from_database(index, session)
+        else:
+            index.mark_synced()
+        return {"appended": appended, "rebuilt": rebuilt, "count": len(index)}
+
+
+class VectorIndexSyncer:
+    """
+    Thread que sincroniza o índice com o banco a cada interval segundos, ou antes quando
+    notify() é chamado (ex.: após uma ingestão em lote)
+    """
+    def __init__(self, index: MmapVectorIndex, session_factory, interval: float):
+        self.index = index
+        self.session_factory = session_factory
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vector-index-sync", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sync_once(self) -> Optional[dict]:
+        try:
+            with self.session_factory() as session:
+                return sync_from_database(self.index, session)
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar o índice vetorial: {e}")
+            return None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.sync_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+_vector_index: Optional[MmapVectorIndex] = None
+_vector_index_syncer: Optional[VectorIndexSyncer] = None
+_vector_index_lock = threading.Lock()
+
+
+def get_vector_index() -> Optional[MmapVectorIndex]:
+    """
+    Retorna o índice local do processo, ou None se MMAP_INDEX_ENABLED for false
+    """
+    global _vector_index
+    if os.getenv('MMAP_INDEX_ENABLED', 'False').lower() != 'true':
+        return None
+    if _vector_index is None:
+        with _vector_index_lock:
+            if _vector_index is None:
+                _vector_index = MmapVectorIndex(
+                    os.getenv('MMAP_INDEX_PATH', 'vector_index'),
+                    EMBEDDING_DIMENSIONS,
+                    os.getenv('MMAP_INDEX_DTYPE', 'float32').lower()
+                )
+    return _vector_index
+
+
+def start_vector_index_sync() -> None:
+    """
+    Inicia a sincronização periódica (MMAP_INDEX_RESYNC_SECONDS) quando o índice está ativo
+    """
+    global _vector_index_syncer
+    index = get_vector_index()
+    if index is None or _vector_index_syncer is not None:
+        return
+    from src.infrastructure.connection_postgresql import get_db_session
+
+    _vector_index_syncer = VectorIndexSyncer(
+        index, get_db_session, float(os.getenv('MMAP_INDEX_RESYNC_SECONDS', '300'))
+    )
+    _vector_index_syncer.start()
+
+
+def notify_vector_index_sync() -> None:
+    if _vector_index_syncer is not None:
+        _vector_index_syncer.notify()
+
+
+def stop_vector_index_sync() -> None:
+    global _vector_index_syncer
+    if _vector_index_syncer is not None:
+        _vector_index_syncer.stop()
+        _vector_index_syncer = None
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="Sincroniza o índice vetorial local com o banco")
+    parser.add_argument("--path", default=os.getenv('MMAP_INDEX_PATH', 'vector_index'))
+    parser.add_argument("--dtype", choices=INDEX_DTYPES, default=os.getenv('MMAP_INDEX_DTYPE', 'float32').lower())
+    parser.add_argument("--rebuild", action="store_true", help="Recria o índice inteiro em vez de só acrescentar")
+    args = parser.parse_args(argv)
+
+    from src.infrastructure.connection_postgresql import get_db_session
+
+    index = MmapVectorIndex(args.path, EMBEDDING_DIMENSIONS, args.dtype)
+    with get_db_session() as session:
+        if args.rebuild:
+            print(f"{rebuild_from_database(index, session)} vetores indexados em {args.path}")
+        else:
+            print(sync_from_database(index, session))
+
+
+if __name__ == "__main__":
+    main()
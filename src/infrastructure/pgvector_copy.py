@@ -0,0 +1,65 @@
+import io
+import struct
+import numpy as np
+
+# Cabeçalho do formato binário do COPY: assinatura, flags e tamanho da extensão
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_BINARY_TRAILER = struct.pack('>h', -1)
+
+_INT2 = struct.Struct('>h')
+_INT4 = struct.Struct('>i')
+_VECTOR_HEADER = struct.Struct('>hh')
+
+
+def encode_int4(value: int) -> bytes:
+    return _INT4.pack(value)
+
+
+def encode_text(value: str) -> bytes:
+    return value.encode('utf-8')
+
+
+def encode_vector(vector) -> bytes:
+    """
+    Representação binária do tipo vector do pgvector: dimensão (int16), campo
+    reservado (int16) e os valores float32 big-endian
+    """
+    values = np.asarray(vector, dtype='>f4')
+    return _VECTOR_HEADER.pack(values.shape[0], 0) + values.tobytes()
+
+
+def encode_halfvec(vector) -> bytes:
+    """
+    Representação binária do tipo halfvec do pgvector: dimensão (int16), campo
+    reservado (int16) e os valores float16 big-endian
+    """
+    values = np.asarray(vector, dtype='>f2')
+    return _VECTOR_HEADER.pack(values.shape[0], 0) + values.tobytes()
+
+
+def build_copy_binary(rows, encoders: list) -> io.BytesIO:
+    """
+    Monta um buffer no formato binário do COPY ... FROM STDIN.
+
+    Args:
+        rows: Iterável de tuplas com os valores de cada linha
+        encoders: Uma função de codificação por coluna (None grava NULL)
+
+    Returns:
+        Buffer posicionado no início, pronto para copy_expert
+    """
+    buffer = io.BytesIO()
+    buffer.write(COPY_BINARY_HEADER)
+    field_count = _INT2.pack(len(encoders))
+    for row in rows:
+        buffer.write(field_count)
+        for encoder, value in zip(encoders, row):
+            if value is None:
+                buffer.write(_INT4.pack(-1))
+                continue
+            data = encoder(value)
+            buffer.write(_INT4.pack(len(data)))
+            buffer.write(data)
+    buffer.write(COPY_BINARY_TRAILER)
+    buffer.seek(0)
+    return buffer
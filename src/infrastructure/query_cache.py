@@ -0,0 +1,162 @@
+import os
+import asyncio
+import threading
+import unicodedata
+from typing import Optional
+from dotenv import load_dotenv
+import logging
+
+from src.infrastructure.embedding_cache import LRUCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Forma canônica da pergunta: Unicode NFKC, sem diferença de caixa e com os espaços colapsados
+    """
+    return " ".join(unicodedata.normalize("NFKC", question).casefold().split())
+
+
+class _InFlightCall:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QueryEmbeddingCache:
+    """
+    Cache em memória dos embeddings de perguntas (pergunta normalizada -> vetor), com LRU e TTL.
+
+    Também agrupa chamadas simultâneas (single-flight): enquanto o embedding de uma pergunta
+    está sendo calculado, as requisições com a mesma pergunta normalizada aguardam essa
+    mesma chamada em vez de abrir outra.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_async = {}
+
+    def get(self, question: str) -> Optional[list]:
+        return self.memory.get(normalize_question(question))
+
+    def put(self, question: str, vector) -> None:
+        self.memory.put(normalize_question(question), vector)
+
+    def _lookup(self, key: str):
+        vector = self.memory.get(key)
+        with self._lock:
+            if vector is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return vector
+
+    def get_or_compute(self, question: str, compute) -> list:
+        """
+        Retorna o vetor da pergunta, chamando compute(pergunta_normalizada) no máximo uma vez
+        por pergunta entre as threads que pedirem o mesmo valor ao mesmo tempo
+        """
+        key = normalize_question(question)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlightCall()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = compute(key)
+            self.memory.put(key, call.result)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    async def get_or_compute_async(self, question: str, compute) -> list:
+        """
+        Variante assíncrona de get_or_compute: compute é uma corrotina e as requisições
+        simultâneas aguardam a mesma task. Se uma requisição for cancelada, a task segue
+        para as demais.
+        """
+        key = normalize_question(question)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight_async.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._compute_async(key, compute))
+            self._inflight_async[key] = task
+            task.add_done_callback(lambda done: self._forget_async(key, done))
+        else:
+            with self._lock:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _compute_async(self, key: str, compute) -> list:
+        vector = await compute(key)
+        self.memory.put(key, vector)
+        return vector
+
+    def _forget_async(self, key: str, task) -> None:
+        if self._inflight_async.get(key) is task:
+            del self._inflight_async[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self.memory)
+            }
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryEmbeddingCache]:
+    """
+    Retorna o cache de embeddings de perguntas do processo, ou None se QUERY_CACHE_ENABLED for false
+    """
+    global _query_cache
+    if os.getenv('QUERY_CACHE_ENABLED', 'True').lower() != 'true':
+        return None
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = QueryEmbeddingCache(
+                    max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1024')),
+                    ttl_seconds=float(os.getenv('QUERY_CACHE_TTL_SECONDS', '3600'))
+                )
+    return _query_cache
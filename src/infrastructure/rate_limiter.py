@@ -0,0 +1,372 @@
+import os
+import math
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from openai import RateLimitError, APIConnectionError, InternalServerError
+from dotenv import load_dotenv
+import logging
+
+from src.infrastructure.metrics import OPENAI_CONCURRENCY_LIMIT, OPENAI_RETRIES, RATE_LIMIT_WAIT
+from src.infrastructure.request_timing import span
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Limitador compartilhado das chamadas ao Azure OpenAI (um por deployment: chat e embeddings).
+# Com ele ligado os retries são feitos aqui, e não pelo SDK (ver connection_openai.py)
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '6'))
+RATE_LIMIT_BACKOFF_BASE = float(os.getenv('RATE_LIMIT_BACKOFF_BASE', '0.5'))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv('RATE_LIMIT_BACKOFF_MAX', '30'))
+# O Azure avalia a cota em janelas curtas: o orçamento acumula no máximo BURST_SECONDS da cota por minuto
+RATE_LIMIT_BURST_SECONDS = float(os.getenv('RATE_LIMIT_BURST_SECONDS', '10'))
+# Fração da concorrência e do orçamento que a ingestão (bulk) não pode usar, reservada à busca
+RATE_LIMIT_INTERACTIVE_SHARE = float(os.getenv('RATE_LIMIT_INTERACTIVE_SHARE', '0.1'))
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+# Prefixo das variáveis de cada deployment: CHAT_RPM_LIMIT, EMBEDDING_TPM_LIMIT, ...
+_ENV_PREFIXES = {"chat": "CHAT", "embeddings": "EMBEDDING"}
+_POLL_SECONDS = 0.05
+# 429 simultâneos de uma mesma rajada reduzem a concorrência uma vez só
+_DECREASE_INTERVAL = 1.0
+
+_current_lane: ContextVar[str] = ContextVar("rate_limit_lane", default=BULK)
+
+
+@contextmanager
+def rate_limit_lane(lane: str):
+    """
+    Faixa das chamadas feitas dentro do bloco (a busca usa INTERACTIVE; o padrão é BULK)
+    """
+    if lane not in LANES:
+        raise ValueError(f"lane must be one of {LANES}")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class _Budget:
+    """
+    Orçamento por minuto (requisições ou tokens) que reabastece continuamente até o limite
+    de rajada; limit <= 0 significa sem limite. O nível pode ficar negativo (dívida) quando o
+    uso real passa da estimativa
+    """
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.unlimited = per_minute <= 0
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserved_share: float, now: float) -> float:
+        """
+        Segundos até haver amount no orçamento, mantendo reserved_share da capacidade livre
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        needed = min(min(amount, self.capacity) + reserved_share * self.capacity, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= amount
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Lê retry-after-ms ou Retry-After (segundos ou data HTTP) da resposta de erro
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _classify_error(error: Exception) -> Optional[str]:
+    """
+    "rate_limited" para 429, "transient" para timeout/conexão/5xx, None para erros definitivos
+    """
+    if isinstance(error, RateLimitError):
+        return "rate_limited"
+    if isinstance(error, (APIConnectionError, InternalServerError)):
+        return "transient"
+    return None
+
+
+def _usage_tokens(response) -> Optional[int]:
+    tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return tokens if isinstance(tokens, int) else None
+
+
+class AdaptiveRateLimiter:
+    """
+    Limitador de um deployment do Azure OpenAI:
+
+    - orçamentos de requisições e de tokens estimados por minuto (RPM/TPM)
+    - concorrência adaptativa AIMD: +1/limite a cada sucesso, x decrease_factor a cada 429;
+      Retry-After pausa todas as chamadas do deployment até o prazo indicado
+    - retries com backoff exponencial e jitter para 429, timeouts, erros de conexão e 5xx
+    - faixas: INTERACTIVE passa na frente de BULK, que não usa a parcela reservada
+      (interactive_share) da concorrência e dos orçamentos
+
+    Thread-safe; as variantes async esperam sem bloquear o event loop.
+    """
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_concurrency: int = 16, min_concurrency: int = 1, interactive_share: float = None,
+                 decrease_factor: float = 0.5, max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None, burst_seconds: float = None):
+        burst_seconds = RATE_LIMIT_BURST_SECONDS if burst_seconds is None else burst_seconds
+        self.name = name
+        self.requests = _Budget(requests_per_minute, burst_seconds)
+        self.tokens = _Budget(tokens_per_minute, burst_seconds)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency_limit = float(self.max_concurrency)
+        self.interactive_share = RATE_LIMIT_INTERACTIVE_SHARE if interactive_share is None else interactive_share
+        self.decrease_factor = decrease_factor
+        self.max_retries = RATE_LIMIT_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = RATE_LIMIT_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = RATE_LIMIT_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.in_flight = 0
+        self.waiting_interactive = 0
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self._last_decrease = float("-inf")
+        self._random = random.Random()
+        self._condition = threading.Condition()
+        OPENAI_CONCURRENCY_LIMIT.labels(name).set(self.concurrency_limit)
+
+    def _try_acquire(self, tokens: float, lane: str) -> Optional[float]:
+        """
+        Com o lock: 0.0 quando a vaga foi tomada; senão os segundos a esperar, ou None para
+        esperar a liberação de uma vaga
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        slots = int(self.concurrency_limit)
+        reserved_share = 0.0
+        if lane == BULK:
+            if self.waiting_interactive:
+                return None
+            slots -= min(slots - 1, math.ceil(slots * self.interactive_share))
+            reserved_share = self.interactive_share
+        if self.in_flight >= slots:
+            return None
+        wait = max(self.requests.wait_time(1, reserved_share, now), self.tokens.wait_time(tokens, reserved_share, now))
+        if wait > 0:
+            return wait
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.in_flight += 1
+        return 0.0
+
+    def _enter_lane(self, lane: str, delta: int) -> None:
+        if lane == INTERACTIVE:
+            with self._condition:
+                self.waiting_interactive += delta
+                if delta < 0:
+                    self._condition.notify_all()
+
+    def acquire(self, tokens: float = 1, lane: str = BULK) -> float:
+        """
+        Espera uma vaga e o orçamento para a chamada; devolve os segundos esperados
+        """
+        start = time.monotonic()
+        self._enter_lane(lane, 1)
+        try:
+            with self._condition:
+                while True:
+                    wait = self._try_acquire(tokens, lane)
+                    if wait == 0:
+                        break
+                    self._condition.wait(min(wait or _POLL_SECONDS, 1.0))
+        finally:
+            self._enter_lane(lane, -1)
+        return time.monotonic() - start
+
+    async def acquire_async(self, tokens: float = 1, lane: str = BULK) -> float:
+        start = time.monotonic()
+        self._enter_lane(lane, 1)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_acquire(tokens, lane)
+                if wait == 0:
+                    break
+                await asyncio.sleep(min(wait or _POLL_SECONDS / 5, 1.0))
+        finally:
+            self._enter_lane(lane, -1)
+        return time.monotonic() - start
+
+    def release(self, tokens: float, outcome: str, retry_after: float = None, used_tokens: int = None) -> None:
+        """
+        Devolve a vaga e ajusta a concorrência: outcome "success", "rate_limited" ou "error"
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "success":
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+                if used_tokens is not None:
+                    # Acerta o orçamento com o uso real informado pela API
+                    self.tokens.take(used_tokens - tokens)
+            elif outcome == "rate_limited":
+                self.rate_limited += 1
+                if now - self._last_decrease >= _DECREASE_INTERVAL:
+                    self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * self.decrease_factor)
+                    self._last_decrease = now
+                pause = retry_after if retry_after is not None else self.backoff_base
+                self.paused_until = max(self.paused_until, now + pause)
+            OPENAI_CONCURRENCY_LIMIT.labels(self.name).set(self.concurrency_limit)
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """
+        Espera antes do próximo retry. Com Retry-After a pausa do deployment já segura todas
+        as chamadas; o jitter só dessincroniza as que voltam juntas
+        """
+        if retry_after is not None:
+            return self._random.uniform(0, self.backoff_base)
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _after_failure(self, error: Exception, tokens: float, attempt: int) -> Optional[float]:
+        """
+        Libera a vaga da tentativa que falhou; devolve a espera do retry ou None para propagar o erro
+        """
+        reason = _classify_error(error)
+        retry_after = _retry_after_seconds(error) if reason else None
+        self.release(tokens, "rate_limited" if reason == "rate_limited" else "error", retry_after)
+        if reason is None or attempt >= self.max_retries:
+            return None
+        OPENAI_RETRIES.labels(self.name, reason).inc()
+        delay = self._backoff(attempt, retry_after)
+        logger.warning(
+            f"{self.name}: {reason} (tentativa {attempt + 1}/{self.max_retries}), nova tentativa em {delay:.2f}s"
+        )
+        return delay
+
+    def call(self, function, tokens: float = 1, lane: str = None):
+        """
+        Executa function() dentro do limite, com retries; lane None usa a faixa do contexto
+        """
+        lane = lane or _current_lane.get()
+        attempt = 0
+        while True:
+            with span(f"rate_limit.{self.name}"):
+                RATE_LIMIT_WAIT.labels(self.name, lane).observe(self.acquire(tokens, lane))
+            try:
+                response = function()
+            except Exception as e:
+                delay = self._after_failure(e, tokens, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelamento (CancelledError, KeyboardInterrupt): a vaga volta antes de propagar
+                self.release(tokens, "error")
+                raise
+            self.release(tokens, "success", used_tokens=_usage_tokens(response))
+            return response
+
+    async def call_async(self, function, tokens: float = 1, lane: str = None):
+        """
+        Variante de call para function() que devolve um awaitable
+        """
+        lane = lane or _current_lane.get()
+        attempt = 0
+        while True:
+            with span(f"rate_limit.{self.name}"):
+                RATE_LIMIT_WAIT.labels(self.name, lane).observe(await self.acquire_async(tokens, lane))
+            try:
+                response = await function()
+            except Exception as e:
+                delay = self._after_failure(e, tokens, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelamento (CancelledError, KeyboardInterrupt): a vaga volta antes de propagar
+                self.release(tokens, "error")
+                raise
+            self.release(tokens, "success", used_tokens=_usage_tokens(response))
+            return response
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "concurrency_limit": round(self.concurrency_limit, 2),
+                "in_flight": self.in_flight,
+                "rate_limited": self.rate_limited,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3)
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(operation: str) -> Optional[AdaptiveRateLimiter]:
+    """
+    Limitador do deployment ("chat" ou "embeddings"), configurado pelas variáveis
+    <CHAT|EMBEDDING>_RPM_LIMIT, _TPM_LIMIT e _MAX_CONCURRENCY; None com RATE_LIMIT_ENABLED=false
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(operation)
+        if limiter is None:
+            prefix = _ENV_PREFIXES[operation]
+            limiter = AdaptiveRateLimiter(
+                operation,
+                requests_per_minute=float(os.getenv(f'{prefix}_RPM_LIMIT', '0')),
+                tokens_per_minute=float(os.getenv(f'{prefix}_TPM_LIMIT', '0')),
+                max_concurrency=int(os.getenv(f'{prefix}_MAX_CONCURRENCY', '16'))
+            )
+            _limiters[operation] = limiter
+        return limiter
+
+
+def rate_limited_call(operation: str, function, tokens: float = 1, lane: str = None):
+    limiter = get_rate_limiter(operation)
+    if limiter is None:
+        return function()
+    return limiter.call(function, tokens, lane)
+
+
+async def rate_limited_call_async(operation: str, function, tokens: float = 1, lane: str = None):
+    limiter = get_rate_limiter(operation)
+    if limiter is None:
+        return await function()
+    return await limiter.call_async(function, tokens, lane)
@@ -0,0 +1,227 @@
+import os
+import re
+import hmac
+import sys
+import time
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from dotenv import load_dotenv
+import logging
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Server-Timing com as etapas de cada requisição (router -> usecase -> service)
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+
+# Profiler por requisição: ativo só com PROFILING_TOKEN definido, disparado pelo header
+# X-Profile com o mesmo valor; grava as pilhas amostradas em formato "collapsed"
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', '5'))
+PROFILING_OUTPUT_DIR = os.getenv('PROFILING_OUTPUT_DIR', os.path.join(tempfile.gettempdir(), 'rag-profiles'))
+PROFILE_HEADER = "x-profile"
+
+_current_timings: ContextVar[Optional['RequestTimings']] = ContextVar("request_timings", default=None)
+# Um perfil por vez: as amostras de duas requisições perfiladas se misturariam
+_profiling_lock = threading.Lock()
+# Folhas de pilha de threads paradas esperando trabalho (pools ociosos, workers de jobs)
+_IDLE_LEAVES = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select")}
+
+
+class RequestTimings:
+    """
+    Spans de uma requisição (nome -> duração somada e número de ocorrências) e a thread do
+    event loop que a atende
+    """
+    def __init__(self):
+        self.spans = {}
+        self.thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + seconds, count + 1)
+
+    def server_timing(self, total_seconds: float) -> str:
+        """
+        Valor do header Server-Timing, em milissegundos; spans repetidos trazem a contagem em desc
+        """
+        with self._lock:
+            spans = list(self.spans.items())
+        entries = []
+        for name, (seconds, count) in spans + [("total", (total_seconds, 1))]:
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count}x"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Registra a duração do bloco no Server-Timing da requisição atual (sem requisição, não faz nada).
+    O contexto segue para asyncio.to_thread e run_in_threadpool, mas não para ThreadPoolExecutor
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class TimedRoute(APIRoute):
+    """
+    Rota que registra o span "route": validação dos parâmetros, o endpoint e a serialização
+    da resposta (route menos usecase é o custo do FastAPI/serialização)
+    """
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            with span("route"):
+                return await handler(request)
+
+        return timed_handler
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Amostra, a cada interval segundos, as pilhas de todas as threads do processo
+    (sys._current_frames) e acumula no formato "collapsed" (thread;frame;...;frame contagem),
+    aceito por flamegraph.pl, speedscope e inferno. O nome da thread é a raiz de cada pilha;
+    threads ociosas ficam de fora, exceto a do event loop da requisição (a espera por I/O conta).
+    Requisições simultâneas aparecem no mesmo perfil.
+    """
+    def __init__(self, timings: RequestTimings, interval: float):
+        self.timings = timings
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if thread_id != self.timings.thread_id and leaf in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def write(self, directory: str, label: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "root"
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{slug}.collapsed")
+        with open(path, "w", encoding="utf-8") as profile_file:
+            profile_file.write(self.collapsed())
+        return path
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI: abre os spans da requisição, devolve o header Server-Timing e, com o
+    header X-Profile igual a PROFILING_TOKEN, perfila a requisição e informa o arquivo gerado
+    em X-Profile-File
+    """
+    def __init__(self, app, enabled: bool = None, profiling_token: str = None,
+                 profiling_interval_ms: float = None, profiling_output_dir: str = None):
+        self.app = app
+        self.enabled = SERVER_TIMING_ENABLED if enabled is None else enabled
+        self.profiling_token = PROFILING_TOKEN if profiling_token is None else profiling_token
+        self.profiling_interval = (profiling_interval_ms or PROFILING_INTERVAL_MS) / 1000
+        self.profiling_output_dir = profiling_output_dir or PROFILING_OUTPUT_DIR
+
+    def _profile_requested(self, scope) -> bool:
+        if not self.profiling_token:
+            return False
+        for name, value in scope.get("headers", []):
+            if name.decode("latin-1").lower() == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.profiling_token.encode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        profiler = None
+        profile_status = None
+        if self._profile_requested(scope):
+            if _profiling_lock.acquire(blocking=False):
+                profiler = SamplingProfiler(timings, self.profiling_interval)
+                profiler.start()
+            else:
+                profile_status = "busy"
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal profiler
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+                if profiler is not None:
+                    profiler.stop()
+                    try:
+                        path = profiler.write(self.profiling_output_dir, f"{scope['method']} {scope['path']}")
+                        headers.append("X-Profile-File", path)
+                        headers.append("X-Profile-Samples", str(sum(profiler.samples.values())))
+                    except OSError as e:
+                        logger.error(f"Erro ao gravar o perfil da requisição: {e}")
+                    finally:
+                        profiler = None
+                        _profiling_lock.release()
+                elif profile_status:
+                    headers.append("X-Profile", profile_status)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                _profiling_lock.release()
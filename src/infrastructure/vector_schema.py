@@ -0,0 +1,266 @@
+"""
+Configuração do armazenamento dos vetores (tipo e dimensões) e ferramenta de migração.
+
+O pgvector só indexa (HNSW/ivfflat) colunas `vector` de até 2000 dimensões e colunas
+`halfvec` de até 4000. Com os 3072 dimensões do text-embedding-3-large é preciso
+guardar os vetores como halfvec ou pedir menos dimensões à API (parâmetro `dimensions`).
+
+Com --text-search, cria também a coluna tsvector gerada (e o índice GIN) dos textos de
+origem usada pela busca híbrida.
+
+Uso:
+    python -m src.infrastructure.vector_schema --storage halfvec --dimensions 1536 --dry-run
+    python -m src.infrastructure.vector_schema --text-search
+"""
+
+import os
+import re
+import argparse
+from typing import Optional
+from sqlalchemy import text
+from dotenv import load_dotenv
+import logging
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+NATIVE_EMBEDDING_DIMENSIONS = 3072
+VECTOR_STORAGES = ("vector", "halfvec")
+# Limite de dimensões indexáveis por tipo no pgvector
+INDEXABLE_DIMENSIONS = {"vector": 2000, "halfvec": 4000}
+OPERATOR_CLASSES = {"vector": "vector_cosine_ops", "halfvec": "halfvec_cosine_ops"}
+
+EMBEDDING_TABLE = "db_correlation_embedding"
+VECTOR_COLUMN = "vector"
+HNSW_INDEX_NAME = "idx_correlation_vector_hnsw"
+LEGACY_INDEX_NAME = "idx_correlation_vector"
+BINARY_INDEX_NAME = "idx_correlation_vector_bq"
+# Limite de dimensões indexáveis do tipo bit (HNSW)
+INDEXABLE_BIT_DIMENSIONS = 64000
+
+ORIGIN_TEXT_TABLE = "db_origin_text"
+TEXT_SEARCH_COLUMN = "data_tsv"
+TEXT_SEARCH_INDEX_NAME = "idx_origin_text_tsv"
+
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', str(NATIVE_EMBEDDING_DIMENSIONS)))
+VECTOR_STORAGE = os.getenv('VECTOR_STORAGE', 'vector').lower()
+HNSW_M = int(os.getenv('HNSW_M', '16'))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '64'))
+# Configuração do full-text search (dicionário/stopwords); a coluna gerada e as consultas
+# precisam usar a mesma
+TEXT_SEARCH_CONFIG = os.getenv('TEXT_SEARCH_CONFIG', 'portuguese').lower()
+
+
+def validate_vector_config(storage: str, dimensions: int) -> None:
+    if storage not in VECTOR_STORAGES:
+        raise ValueError(f"VECTOR_STORAGE must be one of {VECTOR_STORAGES}")
+    if not 0 < dimensions <= NATIVE_EMBEDDING_DIMENSIONS:
+        raise ValueError(f"EMBEDDING_DIMENSIONS must be between 1 and {NATIVE_EMBEDDING_DIMENSIONS}")
+
+
+def validate_text_search_config(config: str) -> None:
+    # O nome entra no DDL e nas consultas como literal, não como parâmetro
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", config or ""):
+        raise ValueError("TEXT_SEARCH_CONFIG must be a text search configuration name (e.g. portuguese, simple)")
+
+
+validate_vector_config(VECTOR_STORAGE, EMBEDDING_DIMENSIONS)
+validate_text_search_config(TEXT_SEARCH_CONFIG)
+
+
+def is_indexable(storage: str = None, dimensions: int = None) -> bool:
+    storage = storage or VECTOR_STORAGE
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    return dimensions <= INDEXABLE_DIMENSIONS[storage]
+
+
+def column_sql_type(storage: str = None, dimensions: int = None) -> str:
+    """
+    Tipo SQL da coluna de vetores, ex.: 'halfvec(1536)'
+    """
+    storage = storage or VECTOR_STORAGE
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    validate_vector_config(storage, dimensions)
+    return f"{storage}({dimensions})"
+
+
+def hnsw_index_sql(storage: str = None, dimensions: int = None, m: int = None, ef_construction: int = None) -> str:
+    """
+    DDL do índice HNSW por distância de cosseno (operador <=>) na coluna de vetores
+    """
+    storage = storage or VECTOR_STORAGE
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    if not is_indexable(storage, dimensions):
+        raise ValueError(
+            f"pgvector cannot index {storage} above {INDEXABLE_DIMENSIONS[storage]} dimensions "
+            f"(got {dimensions}); use halfvec or fewer dimensions"
+        )
+    return (
+        f"CREATE INDEX IF NOT EXISTS {HNSW_INDEX_NAME} ON {EMBEDDING_TABLE} "
+        f"USING hnsw ({VECTOR_COLUMN} {OPERATOR_CLASSES[storage]}) "
+        f"WITH (m = {m or HNSW_M}, ef_construction = {ef_construction or HNSW_EF_CONSTRUCTION})"
+    )
+
+
+def binary_quantize_sql(expression: str, dimensions: int = None) -> str:
+    """
+    Expressão da cópia binária (1 bit por dimensão) de um vetor. A busca precisa usar
+    exatamente a mesma expressão do índice para que ele seja aproveitado.
+    """
+    return f"binary_quantize({expression})::bit({dimensions or EMBEDDING_DIMENSIONS})"
+
+
+def binary_index_sql(dimensions: int = None, m: int = None, ef_construction: int = None) -> str:
+    """
+    DDL do índice HNSW por distância de Hamming sobre a cópia binária dos vetores.
+    O índice guarda apenas os bits (3072 dimensões = 384 bytes por vetor).
+    """
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    if dimensions > INDEXABLE_BIT_DIMENSIONS:
+        raise ValueError(f"pgvector cannot index bit above {INDEXABLE_BIT_DIMENSIONS} dimensions")
+    return (
+        f"CREATE INDEX IF NOT EXISTS {BINARY_INDEX_NAME} ON {EMBEDDING_TABLE} "
+        f"USING hnsw (({binary_quantize_sql(VECTOR_COLUMN, dimensions)}) bit_hamming_ops) "
+        f"WITH (m = {m or HNSW_M}, ef_construction = {ef_construction or HNSW_EF_CONSTRUCTION})"
+    )
+
+
+def text_search_vector_sql(expression: str, config: str = None) -> str:
+    config = config or TEXT_SEARCH_CONFIG
+    validate_text_search_config(config)
+    return f"to_tsvector('{config}'::regconfig, coalesce({expression}, ''))"
+
+
+def text_search_column_sql(config: str = None) -> str:
+    """
+    DDL da coluna tsvector gerada a partir do texto de origem (mantida pelo próprio banco)
+    """
+    return (
+        f"ALTER TABLE {ORIGIN_TEXT_TABLE} ADD COLUMN IF NOT EXISTS {TEXT_SEARCH_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS ({text_search_vector_sql('data', config)}) STORED"
+    )
+
+
+def text_search_index_sql() -> str:
+    return (
+        f"CREATE INDEX IF NOT EXISTS {TEXT_SEARCH_INDEX_NAME} ON {ORIGIN_TEXT_TABLE} "
+        f"USING gin ({TEXT_SEARCH_COLUMN})"
+    )
+
+
+def parse_column_type(sql_type: str) -> Optional[tuple]:
+    """
+    Converte 'halfvec(1536)' em ('halfvec', 1536); None para tipos não suportados
+    """
+    match = re.fullmatch(r"(vector|halfvec)\((\d+)\)", sql_type or "")
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def current_column_type(connection) -> Optional[tuple]:
+    """
+    Lê o tipo atual da coluna de vetores no banco
+    """
+    row = connection.execute(text(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = CAST(:table_name AS regclass) AND attname = :column_name AND NOT attisdropped"
+    ), {"table_name": EMBEDDING_TABLE, "column_name": VECTOR_COLUMN}).fetchone()
+    return parse_column_type(row[0]) if row else None
+
+
+def build_migration(current_storage: str, current_dimensions: int, storage: str, dimensions: int,
+                    m: int = None, ef_construction: int = None, binary_index: bool = False,
+                    text_search: bool = False) -> list:
+    """
+    Monta os comandos para converter a coluna de vetores e recriar o índice ANN.
+
+    Reduzir as dimensões trunca cada vetor e o renormaliza (l2_normalize), o que equivale
+    a pedir `dimensions` menores ao text-embedding-3-large, sem precisar gerar os
+    embeddings de novo. Aumentar as dimensões exige reprocessar os textos.
+    Com binary_index, cria também o índice de Hamming usado pela busca em duas fases;
+    com text_search, a coluna tsvector e o índice GIN da busca híbrida.
+    """
+    validate_vector_config(storage, dimensions)
+    if dimensions > current_dimensions:
+        raise ValueError(
+            f"Cannot grow vectors from {current_dimensions} to {dimensions} dimensions; re-ingest the texts instead"
+        )
+
+    statements = [f"DROP INDEX IF EXISTS {LEGACY_INDEX_NAME}"]
+    if (current_storage, current_dimensions) != (storage, dimensions):
+        expression = VECTOR_COLUMN
+        if dimensions < current_dimensions:
+            expression = f"l2_normalize(subvector({VECTOR_COLUMN}, 1, {dimensions}))"
+        target_type = column_sql_type(storage, dimensions)
+        statements += [
+            f"DROP INDEX IF EXISTS {HNSW_INDEX_NAME}",
+            f"DROP INDEX IF EXISTS {BINARY_INDEX_NAME}",
+            f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN {VECTOR_COLUMN} "
+            f"TYPE {target_type} USING ({expression})::{target_type}",
+        ]
+    statements.append(hnsw_index_sql(storage, dimensions, m, ef_construction))
+    if binary_index:
+        statements.append(binary_index_sql(dimensions, m, ef_construction))
+    if text_search:
+        statements += [text_search_column_sql(), text_search_index_sql()]
+    return statements
+
+
+def migrate_vector_column(engine, storage: str = None, dimensions: int = None, m: int = None,
+                          ef_construction: int = None, binary_index: bool = False, text_search: bool = False,
+                          dry_run: bool = False) -> list:
+    """
+    Converte a coluna de vetores para a configuração desejada e cria o índice HNSW,
+    em uma única transação. A conversão reescreve a tabela e a bloqueia durante a execução.
+
+    Returns:
+        list: Comandos SQL executados (ou que seriam executados, com dry_run)
+    """
+    storage = storage or VECTOR_STORAGE
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    with engine.begin() as connection:
+        current = current_column_type(connection)
+        if current is None:
+            raise RuntimeError(f"Column {EMBEDDING_TABLE}.{VECTOR_COLUMN} not found or has an unsupported type")
+        statements = build_migration(*current, storage, dimensions, m, ef_construction, binary_index, text_search)
+        if dry_run:
+            return statements
+        for statement in statements:
+            logger.info(f"Executando: {statement}")
+            connection.execute(text(statement))
+    return statements
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="Converte a coluna de vetores e cria o índice HNSW")
+    parser.add_argument("--storage", choices=VECTOR_STORAGES, default=VECTOR_STORAGE)
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS)
+    parser.add_argument("--m", type=int, default=HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--binary-index", action="store_true",
+                        help="Cria também o índice de Hamming da busca com re-ranqueamento")
+    parser.add_argument("--text-search", action="store_true",
+                        help="Cria também a coluna tsvector e o índice GIN da busca híbrida")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas mostra os comandos")
+    args = parser.parse_args(argv)
+
+    from src.infrastructure.connection_postgresql import get_database_connection
+
+    statements = migrate_vector_column(
+        get_database_connection().get_engine(),
+        storage=args.storage,
+        dimensions=args.dimensions,
+        m=args.m,
+        ef_construction=args.ef_construction,
+        binary_index=args.binary_index,
+        text_search=args.text_search,
+        dry_run=args.dry_run
+    )
+    for statement in statements:
+        print(f"{statement};")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Interface de armazenamento de vetores (VectorStore) e implementação em memória com NumPy.
+
+A implementação pgvector (PgVectorStore) fica em src/service/embedding_service.py, junto das
+consultas SQL; o backend é escolhido por VECTOR_STORE_BACKEND (ver get_vector_store).
+
+Cada linha de embedding é um dict com id_text_origin, correlation_type, text_content e
+embedding (o mesmo formato de save_embedding_to_postgresql), e opcionalmente embedding_id
+para substituir uma linha existente. Os resultados da busca têm o formato de search_vetorial:
+distance, text_content, correlation_type, embedding_id e origin_text_id.
+"""
+
+import threading
+from typing import Optional, Protocol, runtime_checkable
+import numpy as np
+
+VECTOR_STORE_BACKENDS = ("pgvector", "numpy")
+# Filtros aceitos pela busca: {"correlation_type": [...], "origin_text_id": [...]}
+FILTER_FIELDS = ("correlation_type", "origin_text_id")
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    def add_origin_texts(self, texts: list) -> list:
+        """Grava os textos de origem e retorna os IDs, na mesma ordem"""
+        ...
+
+    def upsert(self, rows: list) -> list:
+        """Insere as linhas (ou substitui as que trazem embedding_id) e retorna os IDs, na mesma ordem"""
+        ...
+
+    def search(self, query_vector, top_k: int, filters: Optional[dict] = None) -> list:
+        """Top-k por distância de cosseno, apenas entre as linhas que atendem aos filtros"""
+        ...
+
+    def get_origin_texts(self, origin_text_ids: list) -> dict:
+        """{origin_text_id: texto}"""
+        ...
+
+    def delete_by_origin(self, origin_text_ids: list) -> int:
+        """Remove os textos de origem e seus embeddings; retorna o número de embeddings removidos"""
+        ...
+
+
+def normalize_filters(filters: Optional[dict]) -> Optional[dict]:
+    """
+    Valida os filtros e converte cada valor em tupla; None ou {} significa sem filtros
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}. Allowed: {', '.join(FILTER_FIELDS)}")
+    normalized = {}
+    for field, values in filters.items():
+        if values is None:
+            continue
+        values = tuple(values) if isinstance(values, (list, tuple, set)) else (values,)
+        if not values:
+            raise ValueError(f"Filter {field} cannot be empty")
+        normalized[field] = values
+    return normalized or None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class NumpyVectorStore:
+    """
+    VectorStore em memória: vetores normalizados em uma matriz float32 que cresce por
+    duplicação, busca exata por produto escalar e top-k com argpartition. Útil para
+    testes e benchmarks sem Postgres; os dados não sobrevivem ao processo.
+    """
+    def __init__(self, dimensions: int, initial_capacity: int = 1024):
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._vectors = np.empty((initial_capacity, dimensions), dtype=np.float32)
+        self._ids = np.empty(initial_capacity, dtype=np.int64)
+        self._origins = np.empty(initial_capacity, dtype=np.int64)
+        self._type_codes = np.empty(initial_capacity, dtype=np.int32)
+        self._texts = []
+        self._count = 0
+        self._positions = {}
+        self._type_names = []
+        self._type_index = {}
+        self._origin_texts = {}
+        self._next_embedding_id = 1
+        self._next_origin_text_id = 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.empty((capacity, self.dimensions), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        self._vectors = vectors
+        for name in ("_ids", "_origins", "_type_codes"):
+            current = getattr(self, name)
+            grown = np.empty(capacity, dtype=current.dtype)
+            grown[:self._count] = current[:self._count]
+            setattr(self, name, grown)
+
+    def _type_code(self, correlation_type: str) -> int:
+        code = self._type_index.get(correlation_type)
+        if code is None:
+            code = self._type_index[correlation_type] = len(self._type_names)
+            self._type_names.append(correlation_type)
+        return code
+
+    def add_origin_texts(self, texts: list) -> list:
+        with self._lock:
+            ids = list(range(self._next_origin_text_id, self._next_origin_text_id + len(texts)))
+            self._next_origin_text_id += len(texts)
+            self._origin_texts.update(zip(ids, texts))
+        return ids
+
+    def upsert(self, rows: list) -> list:
+        if not rows:
+            return []
+        vectors = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected vectors with {self.dimensions} dimensions")
+        vectors = _normalize_rows(vectors)
+
+        ids = []
+        with self._lock:
+            self._grow(self._count + len(rows))
+            for row, vector in zip(rows, vectors):
+                embedding_id = row.get("embedding_id")
+                if embedding_id is None:
+                    embedding_id = self._next_embedding_id
+                position = self._positions.get(embedding_id)
+                if position is None:
+                    position = self._positions[embedding_id] = self._count
+                    self._count += 1
+                    self._texts.append(row["text_content"])
+                else:
+                    self._texts[position] = row["text_content"]
+                self._next_embedding_id = max(self._next_embedding_id, embedding_id + 1)
+                self._vectors[position] = vector
+                self._ids[position] = embedding_id
+                self._origins[position] = row["id_text_origin"]
+                self._type_codes[position] = self._type_code(row["correlation_type"])
+                ids.append(embedding_id)
+        return ids
+
+    def _filter_mask(self, filters: dict) -> Optional[np.ndarray]:
+        mask = None
+        if "correlation_type" in filters:
+            codes = [self._type_index[name] for name in filters["correlation_type"] if name in self._type_index]
+            mask = np.isin(self._type_codes[:self._count], codes)
+        if "origin_text_id" in filters:
+            origin_mask = np.isin(self._origins[:self._count], np.asarray(filters["origin_text_id"], dtype=np.int64))
+            mask = origin_mask if mask is None else mask & origin_mask
+        return mask
+
+    def search(self, query_vector, top_k: int, filters: Optional[dict] = None) -> list:
+        filters = normalize_filters(filters)
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            if filters:
+                positions = np.flatnonzero(self._filter_mask(filters))
+                scores = self._vectors[positions] @ query
+            else:
+                positions = np.arange(self._count)
+                scores = self._vectors[:self._count] @ query
+            k = min(top_k, len(positions))
+            if k <= 0:
+                return []
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                positions, scores = positions[top], scores[top]
+            order = np.argsort(-scores, kind="stable")
+            return [
+                {
+                    'distance': float(1.0 - scores[i]),
+                    'text_content': self._texts[positions[i]],
+                    'correlation_type': self._type_names[self._type_codes[positions[i]]],
+                    'embedding_id': int(self._ids[positions[i]]),
+                    'origin_text_id': int(self._origins[positions[i]])
+                }
+                for i in order
+            ]
+
+    def get_origin_texts(self, origin_text_ids: list) -> dict:
+        with self._lock:
+            return {
+                origin_text_id: self._origin_texts[origin_text_id]
+                for origin_text_id in origin_text_ids
+                if origin_text_id in self._origin_texts
+            }
+
+    def delete_by_origin(self, origin_text_ids: list) -> int:
+        with self._lock:
+            removed = np.isin(self._origins[:self._count], np.asarray(origin_text_ids, dtype=np.int64))
+            keep = np.flatnonzero(~removed)
+            deleted = self._count - len(keep)
+            if deleted:
+                count = len(keep)
+                self._vectors[:count] = self._vectors[keep]
+                for name in ("_ids", "_origins", "_type_codes"):
+                    array = getattr(self, name)
+                    array[:count] = array[keep]
+                self._texts = [self._texts[position] for position in keep]
+                self._count = count
+                self._positions = {int(embedding_id): position for position, embedding_id in enumerate(self._ids[:count])}
+            for origin_text_id in origin_text_ids:
+                self._origin_texts.pop(origin_text_id, None)
+            return deleted
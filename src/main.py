@@ -1,10 +1,44 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from src.controller.api.router import router
+from src.usecase.ingestion_jobs import start_ingestion_workers, stop_ingestion_workers
+from src.infrastructure.connection_postgresql import close_async_database_connection
+from src.infrastructure.mmap_vector_index import start_vector_index_sync, stop_vector_index_sync
+from src.infrastructure.metrics import render_metrics
+from src.infrastructure.request_timing import ServerTimingMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_ingestion_workers()
+    start_vector_index_sync()
+    yield
+    stop_vector_index_sync()
+    stop_ingestion_workers()
+    await close_async_database_connection()
+
+
+app = FastAPI(lifespan=lifespan)
+# Respostas de busca com muitos resultados comprimem bem; respostas pequenas seguem sem gzip
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv('GZIP_MINIMUM_SIZE', '1000')))
+# Mais externo: o total do Server-Timing inclui a compressão; X-Profile dispara o profiler
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(router, prefix="/new_rag")
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Métricas da aplicação no formato do Prometheus (por processo: com vários workers do
+    uvicorn, cada scrape vê só o worker que atendeu)
+    """
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
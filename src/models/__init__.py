@@ -8,10 +8,16 @@ from .database_models import (
     DbCorrelationEmbedding,
     CorrelationType
 )
+from .embedding_batch import (
+    EmbeddingRecord,
+    EmbeddingBatch
+)
 
 __all__ = [
     'Base',
     'DbOriginText',
     'DbCorrelationEmbedding',
-    'CorrelationType'
+    'CorrelationType',
+    'EmbeddingRecord',
+    'EmbeddingBatch'
 ]
@@ -7,6 +7,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import Float
+from src.infrastructure.vector_schema import VECTOR_STORAGE, EMBEDDING_DIMENSIONS
 
 Base = declarative_base()
 
@@ -24,6 +25,26 @@ def Vector(dimensions):
         return ARRAY(Float)
 
 
+def HalfVector(dimensions):
+    """
+    Tipo halfvec (float16) do pgvector, com o mesmo fallback de Vector
+    """
+    try:
+        from pgvector.sqlalchemy import HALFVEC
+        return HALFVEC(dimensions)
+    except ImportError:
+        return ARRAY(Float)
+
+
+def EmbeddingVector():
+    """
+    Tipo da coluna de embeddings conforme VECTOR_STORAGE e EMBEDDING_DIMENSIONS
+    """
+    if VECTOR_STORAGE == "halfvec":
+        return HalfVector(EMBEDDING_DIMENSIONS)
+    return Vector(EMBEDDING_DIMENSIONS)
+
+
 class DbOriginText(Base):
     """
     Modelo para a tabela db_origin_text
@@ -56,7 +77,7 @@ class DbCorrelationEmbedding(Base):
         # CheckConstraint para validar os valores permitidos
     )
     text_content = Column(Text, nullable=False)
-    vector = Column(Vector(3072), nullable=True)
+    vector = Column(EmbeddingVector(), nullable=True)
     
     # Constraint para validar correlation_type
     __table_args__ = (
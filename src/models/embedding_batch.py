@@ -0,0 +1,135 @@
+"""
+Estrutura em memória que leva os embeddings gerados até a persistência
+"""
+
+import json
+from typing import Optional
+import numpy as np
+
+
+class EmbeddingRecord:
+    """
+    Um texto gerado para um chunk; o vetor fica na linha `row` da matriz do lote
+    """
+    __slots__ = ("type", "text", "chunk_index", "row")
+
+    def __init__(self, type: str, text: str, chunk_index: int, row: int):
+        self.type = type
+        self.text = text
+        self.chunk_index = chunk_index
+        self.row = row
+
+    def __repr__(self):
+        return f"<EmbeddingRecord(type='{self.type}', chunk_index={self.chunk_index}, row={self.row})>"
+
+
+class EmbeddingBatch:
+    """
+    Lote de embeddings de uma requisição de ingestão.
+
+    Os textos dos chunks são guardados uma única vez em `chunks` (chunk_index -> texto) e os
+    vetores ficam em uma matriz float32 contígua (`vectors`, uma linha por registro).
+    """
+    __slots__ = ("records", "vectors", "chunks", "chunk_size", "chunk_overlap", "total_chunks")
+
+    def __init__(self, records: list, vectors: np.ndarray, chunks: dict,
+                 chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                 total_chunks: Optional[int] = None):
+        self.records = records
+        self.vectors = vectors
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.total_chunks = total_chunks
+
+    @classmethod
+    def build(cls, records: list, embeddings: list, chunks: dict, **metadata) -> 'EmbeddingBatch':
+        """
+        Cria o lote convertendo os embeddings para uma matriz float32
+        """
+        if embeddings:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+        else:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        return cls(records, vectors, chunks, **metadata)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def vector(self, record: EmbeddingRecord) -> np.ndarray:
+        return self.vectors[record.row]
+
+    def group_by_chunk(self) -> dict:
+        """
+        Agrupa os registros por chunk_index, preservando a ordem de chegada
+        """
+        groups = {}
+        for record in self.records:
+            groups.setdefault(record.chunk_index, []).append(record)
+        return groups
+
+    def to_dicts(self) -> list:
+        """
+        Representação no formato do antigo embedding_temp.json (uso em depuração)
+        """
+        return [
+            {
+                "id_text_origin": "",
+                "type": record.type,
+                "text": record.text,
+                "embedding": self.vectors[record.row].tolist(),
+                "chunk_index": record.chunk_index,
+                "original_chunk": self.chunks.get(record.chunk_index, ""),
+                "chunk_metadata": {
+                    "chunk_size": self.chunk_size,
+                    "chunk_overlap": self.chunk_overlap,
+                    "total_chunks": self.total_chunks
+                }
+            }
+            for record in self.records
+        ]
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dicts(), indent=indent, ensure_ascii=False)
+
+    def dump(self, path: str) -> None:
+        """
+        Grava o lote em JSON no disco (opção de depuração)
+        """
+        with open(path, 'w', encoding='utf-8') as temp_file:
+            json.dump(self.to_dicts(), temp_file, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def from_dicts(cls, embedding_data: list) -> 'EmbeddingBatch':
+        """
+        Reconstrói o lote a partir do formato JSON legado
+        """
+        records = []
+        embeddings = []
+        chunks = {}
+        metadata = {}
+        for row, data in enumerate(embedding_data):
+            chunk_index = data.get("chunk_index", 0)
+            chunks.setdefault(chunk_index, data.get("original_chunk", ""))
+            if not metadata and data.get("chunk_metadata"):
+                metadata = data["chunk_metadata"]
+            records.append(EmbeddingRecord(data["type"], data["text"], chunk_index, row))
+            embeddings.append(data["embedding"])
+        return cls.build(
+            records,
+            embeddings,
+            chunks,
+            chunk_size=metadata.get("chunk_size"),
+            chunk_overlap=metadata.get("chunk_overlap"),
+            total_chunks=metadata.get("total_chunks")
+        )
+
+    @classmethod
+    def from_json(cls, embedding_json: str) -> 'EmbeddingBatch':
+        return cls.from_dicts(json.loads(embedding_json))
+
+    def __repr__(self):
+        return f"<EmbeddingBatch(records={len(self.records)}, chunks={len(self.chunks)}, shape={self.vectors.shape})>"
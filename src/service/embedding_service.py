@@ -1,29 +1,108 @@
-from src.infrastructure.connection_openai import OpenAIConnection
-from src.infrastructure.connection_postgresql import get_db_session
+from src.infrastructure.connection_openai import OpenAIConnection, AsyncOpenAIConnection
+from src.infrastructure.connection_postgresql import get_db_session, get_async_db_session, UnitOfWork
+from src.infrastructure.embedding_cache import get_embedding_cache
+from src.infrastructure.query_cache import get_query_cache, normalize_question
+from src.infrastructure.mmap_vector_index import get_vector_index, notify_vector_index_sync, rebuild_from_database
+from src.infrastructure.vector_store import VECTOR_STORE_BACKENDS, NumpyVectorStore, normalize_filters
+from src.infrastructure.metrics import (
+    GENERATION_JSON_PARSE_FAILURES,
+    observe_openai_call,
+    observe_stage,
+    record_token_usage
+)
+from src.infrastructure.rate_limiter import INTERACTIVE, rate_limit_lane, rate_limited_call, rate_limited_call_async
+from src.infrastructure.pgvector_copy import build_copy_binary, encode_int4, encode_text, encode_vector, encode_halfvec
+from src.infrastructure.vector_schema import (
+    NATIVE_EMBEDDING_DIMENSIONS,
+    EMBEDDING_DIMENSIONS,
+    VECTOR_STORAGE,
+    TEXT_SEARCH_COLUMN,
+    TEXT_SEARCH_CONFIG,
+    column_sql_type,
+    binary_quantize_sql
+)
 from src.models.database_models import DbOriginText, DbCorrelationEmbedding
-from sqlalchemy import text   
+from sqlalchemy import text, insert, select, delete
+from openai import BadRequestError, NOT_GIVEN
 
+import asyncio
 import json
+import os
+import threading
+from typing import Optional
 
 client = OpenAIConnection().get_client()
+async_client = AsyncOpenAIConnection().get_client()
 
-def generate_text_semantic_service(input_text: str, prompt_assistant: str) -> dict:
+GENERATION_MODEL = "gpt-4.1-nano" # Replace with your model deployment name.
+# Tokens de resposta presumidos por geração no orçamento de TPM do limitador (acertado pelo usage)
+GENERATION_ESTIMATED_COMPLETION_TOKENS = int(os.getenv('GENERATION_ESTIMATED_COMPLETION_TOKENS', '1000'))
+EMBEDDING_MODEL = "text-embedding-3-large"
+# text-embedding-3 aceita menos dimensões que as 3072 nativas (EMBEDDING_DIMENSIONS)
+EMBEDDING_REQUEST_OPTIONS = {} if EMBEDDING_DIMENSIONS == NATIVE_EMBEDDING_DIMENSIONS else {"dimensions": EMBEDDING_DIMENSIONS}
+# Limites de cada chamada em lote ao endpoint de embeddings (a API aceita até 2048 inputs)
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv('EMBEDDING_BATCH_MAX_ITEMS', '256'))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', '250000'))
+# Linhas por comando COPY na carga em massa
+COPY_BATCH_ROWS = int(os.getenv('COPY_BATCH_ROWS', '5000'))
+# Busca em duas fases: candidatos por Hamming na cópia binária e re-ranqueamento exato
+# de top_k * BINARY_SEARCH_OVERSAMPLE candidatos (0 = busca direta pelo índice do vetor)
+BINARY_SEARCH_OVERSAMPLE = int(os.getenv('BINARY_SEARCH_OVERSAMPLE', '0'))
+# Limite do hnsw.ef_search no pgvector
+HNSW_MAX_EF_SEARCH = 1000
+# Busca agrupada por texto de origem: candidatos ANN lidos por origem pedida
+# (cada chunk gera até 3 * index variantes)
+GROUPED_SEARCH_CANDIDATE_FACTOR = int(os.getenv('GROUPED_SEARCH_CANDIDATE_FACTOR', '15'))
+# vector: só distância de cosseno; hybrid: cosseno + full-text dos textos de origem (RRF)
+SEARCH_MODES = ("vector", "hybrid")
+SEARCH_MODE = os.getenv('SEARCH_MODE', 'vector').lower()
+# Busca híbrida: candidatos de cada lista (vetorial e textual) por resultado pedido,
+# e a constante k do reciprocal rank fusion (score = soma de 1 / (k + posição))
+HYBRID_SEARCH_CANDIDATE_FACTOR = int(os.getenv('HYBRID_SEARCH_CANDIDATE_FACTOR', '4'))
+HYBRID_RRF_K = int(os.getenv('HYBRID_RRF_K', '60'))
+# Máximo de perguntas por chamada de /search_batch (um único embeddings.create)
+SEARCH_BATCH_MAX_QUESTIONS = int(os.getenv('SEARCH_BATCH_MAX_QUESTIONS', '256'))
+# Busca com filtros no pgvector: o HNSW filtra depois de ler os candidatos, então o
+# ef_search sobe para top_k * fator para ainda sobrarem top_k linhas após o filtro
+FILTERED_SEARCH_CANDIDATE_FACTOR = int(os.getenv('FILTERED_SEARCH_CANDIDATE_FACTOR', '10'))
+# orm: objetos ORM em lote (flush); insert: INSERT multi-linha; copy: COPY binário
+WRITE_MODES = ("orm", "insert", "copy")
+
+
+class IncompleteEmbeddingBatchError(Exception):
+    """
+    Raised when the embeddings API returns fewer vectors than inputs sent.
+    """
+
+def generate_text_semantic_service(input_text: str, prompt_assistant: str, response_format: dict = None) -> dict:
     """
     Generate a text using the OpenAI API with semantic understanding.
+    
+    Args:
+        input_text (str): Chunk text sent as the user message
+        prompt_assistant (str): Prompt sent as the system message
+        response_format (dict): Optional response format, e.g. {"type": "json_object"}
     """
-    completion = client.chat.completions.create(
-        model="gpt-4.1-nano", # Replace with your model deployment name.
-        messages=[
-            {"role": "user", "content": f"{input_text}"},
-            {"role": "system", "content": f"{prompt_assistant}"},
-        ],
-        #response_format={"type": "json_object"},
-    ) 
+    with observe_openai_call("chat"):
+        completion = rate_limited_call(
+            "chat",
+            lambda: client.chat.completions.create(
+                model=GENERATION_MODEL,
+                messages=[
+                    {"role": "user", "content": f"{input_text}"},
+                    {"role": "system", "content": f"{prompt_assistant}"},
+                ],
+                response_format=response_format or NOT_GIVEN,
+            ),
+            tokens=_estimate_tokens(input_text) + _estimate_tokens(prompt_assistant) + GENERATION_ESTIMATED_COMPLETION_TOKENS
+        )
+    record_token_usage("chat", getattr(completion, "usage", None))
     try:
         return_response = completion.choices[0].message.content
         json_response = json.loads(return_response)
         return json_response
     except (AttributeError, IndexError, json.JSONDecodeError) as e:
+        GENERATION_JSON_PARSE_FAILURES.inc()
         print(f"Json not formated correct: {e}")
         return None
     
@@ -34,112 +113,1199 @@ def embedding_service(input_text: str):
     if not input_text or not input_text.strip():
         raise ValueError("Input text cannot be empty")
     
-    embedding = client.embeddings.create(
-        model="text-embedding-3-large",
-        input=input_text,
-    )
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = cache.get(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, input_text)
+        if cached is not None:
+            return cached
+    
+    with observe_openai_call("embeddings"):
+        embedding = rate_limited_call(
+            "embeddings",
+            lambda: client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=input_text,
+                **EMBEDDING_REQUEST_OPTIONS,
+            ),
+            tokens=_estimate_tokens(input_text)
+        )
+    record_token_usage("embeddings", getattr(embedding, "usage", None))
     
-    return embedding.data[0].embedding
+    vector = embedding.data[0].embedding
+    if cache is not None:
+        cache.put(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, input_text, vector)
+    return vector
+
+async def embedding_service_async(input_text: str):
+    """
+    Async variant of embedding_service, for use inside the event loop.
+    """
+    if not input_text or not input_text.strip():
+        raise ValueError("Input text cannot be empty")
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = cache.get(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, input_text)
+        if cached is not None:
+            return cached
+
+    with observe_openai_call("embeddings"):
+        embedding = await rate_limited_call_async(
+            "embeddings",
+            lambda: async_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=input_text,
+                **EMBEDDING_REQUEST_OPTIONS,
+            ),
+            tokens=_estimate_tokens(input_text)
+        )
+    record_token_usage("embeddings", getattr(embedding, "usage", None))
+
+    vector = embedding.data[0].embedding
+    if cache is not None:
+        cache.put(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, input_text, vector)
+    return vector
+
+def query_embedding_service(question: str):
+    """
+    Embedding of a search question. Questions are normalized and kept in the in-memory
+    query cache; identical questions arriving at the same time share one API call.
+    The call goes through the interactive lane of the rate limiter, ahead of ingestion.
+    """
+    cache = get_query_cache()
+    with rate_limit_lane(INTERACTIVE):
+        if cache is None:
+            return embedding_service(question)
+        return cache.get_or_compute(question, embedding_service)
+
+async def query_embedding_service_async(question: str):
+    """
+    Async variant of query_embedding_service.
+    """
+    cache = get_query_cache()
+    with rate_limit_lane(INTERACTIVE):
+        if cache is None:
+            return await embedding_service_async(question)
+        return await cache.get_or_compute_async(question, embedding_service_async)
+
+def _cached_query_embeddings(questions: list) -> tuple:
+    """
+    Looks the questions up in the query cache. Returns the vectors found (None where missing)
+    and the distinct normalized questions that still need an embedding.
+    """
+    cache = get_query_cache()
+    keys = [normalize_question(question) for question in questions]
+    vectors = [cache.get(key) for key in keys] if cache is not None else [None] * len(keys)
+    missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+    return keys, vectors, missing
+
+def _merge_query_embeddings(keys: list, vectors: list, missing: list, missing_vectors: list) -> list:
+    cache = get_query_cache()
+    if cache is not None:
+        for key, vector in zip(missing, missing_vectors):
+            cache.put(key, vector)
+    embedded = dict(zip(missing, missing_vectors))
+    return [vector if vector is not None else embedded[key] for key, vector in zip(keys, vectors)]
+
+def query_embedding_batch_service(questions: list) -> list:
+    """
+    Embeddings of many search questions, in input order. Questions already in the query
+    cache are reused; the distinct remaining ones are embedded in one batched request.
+    """
+    keys, vectors, missing = _cached_query_embeddings(questions)
+    with rate_limit_lane(INTERACTIVE):
+        missing_vectors = _embed_batch_with_split(missing) if missing else []
+    return _merge_query_embeddings(keys, vectors, missing, missing_vectors)
+
+async def query_embedding_batch_service_async(questions: list) -> list:
+    """
+    Async variant of query_embedding_batch_service.
+    """
+    keys, vectors, missing = _cached_query_embeddings(questions)
+    missing_vectors = []
+    if missing:
+        with observe_openai_call("embeddings"):
+            embedding = await rate_limited_call_async(
+                "embeddings",
+                lambda: async_client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=missing,
+                    **EMBEDDING_REQUEST_OPTIONS,
+                ),
+                tokens=sum(_estimate_tokens(question) for question in missing),
+                lane=INTERACTIVE
+            )
+        record_token_usage("embeddings", getattr(embedding, "usage", None))
+        items = sorted(embedding.data, key=lambda item: item.index)
+        if len(items) != len(missing):
+            raise IncompleteEmbeddingBatchError(
+                f"Expected {len(missing)} embeddings, received {len(items)}"
+            )
+        missing_vectors = [item.embedding for item in items]
+    return _merge_query_embeddings(keys, vectors, missing, missing_vectors)
+
+def _estimate_tokens(input_text: str) -> int:
+    """
+    Rough token estimate (~4 characters per token) used only to bound batch sizes.
+    """
+    return len(input_text) // 4 + 1
+
+def _pack_embedding_batches(input_texts: list, max_items: int, max_tokens: int) -> list:
+    """
+    Group consecutive texts into batches bounded by item count and estimated tokens.
+    A single text larger than max_tokens still goes alone in its own batch.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for input_text in input_texts:
+        tokens = _estimate_tokens(input_text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(input_text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _embed_batch(input_texts: list) -> list:
+    """
+    Embed one batch in a single API call, returning vectors in input order.
+    """
+    with observe_openai_call("embeddings"):
+        embedding = rate_limited_call(
+            "embeddings",
+            lambda: client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=input_texts,
+                **EMBEDDING_REQUEST_OPTIONS,
+            ),
+            tokens=sum(_estimate_tokens(input_text) for input_text in input_texts)
+        )
+    record_token_usage("embeddings", getattr(embedding, "usage", None))
+    items = sorted(embedding.data, key=lambda item: item.index)
+    if len(items) != len(input_texts):
+        raise IncompleteEmbeddingBatchError(
+            f"Expected {len(input_texts)} embeddings, received {len(items)}"
+        )
+    return [item.embedding for item in items]
+
+def _embed_batch_with_split(input_texts: list) -> list:
+    """
+    Embed a batch; on a rejected or incomplete batch, split it in half and retry each half
+    so a single bad input does not discard the whole batch.
+    """
+    try:
+        return _embed_batch(input_texts)
+    except (BadRequestError, IncompleteEmbeddingBatchError) as e:
+        if len(input_texts) == 1:
+            raise
+        print(f"Embedding batch of {len(input_texts)} texts failed, splitting: {e}")
+        middle = len(input_texts) // 2
+        return _embed_batch_with_split(input_texts[:middle]) + _embed_batch_with_split(input_texts[middle:])
+
+def embedding_batch_service(input_texts: list, max_batch_size: int = None, max_batch_tokens: int = None) -> list:
+    """
+    Generate embeddings for many texts using as few API calls as possible.
+
+    Args:
+        input_texts (list): Texts to embed
+        max_batch_size (int): Maximum number of texts per API call (default: EMBEDDING_BATCH_MAX_ITEMS)
+        max_batch_tokens (int): Maximum estimated tokens per API call (default: EMBEDDING_BATCH_MAX_TOKENS)
+
+    Returns:
+        list: One embedding per input text, in the same order as input_texts
+    """
+    for position, input_text in enumerate(input_texts):
+        if not input_text or not input_text.strip():
+            raise ValueError(f"Input text cannot be empty (position {position})")
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        embeddings = cache.get_many(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, input_texts)
+    else:
+        embeddings = [None] * len(input_texts)
+
+    # Só os textos ausentes do cache vão para a API, cada texto distinto uma única vez
+    missing_texts = list(dict.fromkeys(
+        input_text for input_text, embedding in zip(input_texts, embeddings) if embedding is None
+    ))
+    if not missing_texts:
+        return embeddings
+
+    batches = _pack_embedding_batches(
+        missing_texts,
+        max_batch_size or EMBEDDING_BATCH_MAX_ITEMS,
+        max_batch_tokens or EMBEDDING_BATCH_MAX_TOKENS
+    )
+
+    missing_embeddings = []
+    for batch in batches:
+        missing_embeddings.extend(_embed_batch_with_split(batch))
+    if cache is not None:
+        cache.put_many(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, missing_texts, missing_embeddings)
+
+    embedded = dict(zip(missing_texts, missing_embeddings))
+    return [
+        embedding if embedding is not None else embedded[input_text]
+        for input_text, embedding in zip(input_texts, embeddings)
+    ]
 
 def save_original_text(text: str) -> int:
     """
-    Save the original text to PostgreSQL database and return the ID.
+    Save the original text through the configured vector store and return the ID.
     """
-    with get_db_session() as session:
-        origin_text = DbOriginText(data=text)
-        session.add(origin_text)
-        session.commit()
-        session.refresh(origin_text)
-        return origin_text.id
+    return get_vector_store().add_origin_texts([text])[0]
 
 def save_embedding_to_postgresql(id_text_origin: int, embedding_data: list):
     """
-    Save the embedding data to PostgreSQL database.
+    Save the embedding data through the configured vector store (PostgreSQL by default).
     """
-    with get_db_session() as session:
-        for data in embedding_data:
-            embedding = DbCorrelationEmbedding(
-                id_text_origin=id_text_origin,
-                correlation_type=data["correlation_type"],
-                text_content=data["text_content"],  # Novo campo
-                vector=data["embedding"]
+    get_vector_store().upsert([{"id_text_origin": id_text_origin, **data} for data in embedding_data])
+
+def insert_original_texts(session, texts: list) -> list:
+    """
+    Insert many original texts with a multi-row INSERT ... RETURNING.
+    
+    Returns:
+        list: The new IDs, in the same order as texts
+    """
+    if not texts:
+        return []
+    statement = insert(DbOriginText).returning(DbOriginText.id, sort_by_parameter_order=True)
+    result = session.execute(statement, [{"data": data} for data in texts])
+    return list(result.scalars().all())
+
+def insert_embeddings(session, embedding_rows: list) -> None:
+    """
+    Insert embeddings with batched multi-row INSERT statements.
+    
+    Args:
+        embedding_rows (list): Dicts with id_text_origin, correlation_type, text_content and embedding
+    """
+    if not embedding_rows:
+        return
+    session.execute(
+        insert(DbCorrelationEmbedding),
+        [
+            {
+                "id_text_origin": row["id_text_origin"],
+                "correlation_type": row["correlation_type"],
+                "text_content": row["text_content"],
+                "vector": row["embedding"]
+            }
+            for row in embedding_rows
+        ]
+    )
+
+def copy_embeddings(session, embedding_rows: list) -> None:
+    """
+    Load embeddings with COPY ... FROM STDIN in binary format, sending the vectors
+    in the pgvector wire representation (no text formatting of floats).
+    
+    Args:
+        embedding_rows (list): Dicts with id_text_origin, correlation_type, text_content and embedding
+    """
+    encoders = [encode_int4, encode_text, encode_text, encode_halfvec if VECTOR_STORAGE == "halfvec" else encode_vector]
+    # Usa a conexão DBAPI da própria sessão para ficar na mesma transação
+    cursor = session.connection().connection.cursor()
+    try:
+        for start in range(0, len(embedding_rows), COPY_BATCH_ROWS):
+            rows = (
+                (row["id_text_origin"], row["correlation_type"], row["text_content"], row["embedding"])
+                for row in embedding_rows[start:start + COPY_BATCH_ROWS]
+            )
+            cursor.copy_expert(
+                "COPY db_correlation_embedding (id_text_origin, correlation_type, text_content, vector) "
+                "FROM STDIN WITH (FORMAT binary)",
+                build_copy_binary(rows, encoders)
             )
-            session.add(embedding)
-        session.commit()
+    finally:
+        cursor.close()
 
-def search_vetorial(question: str, top_k: int):
+def add_embeddings_orm(session, embedding_rows: list) -> None:
     """
-    Search for similar embeddings in the PostgreSQL database using vector similarity.
+    Add embeddings as ORM objects; they are written in batches on the next flush.
     
     Args:
-        question (str): The question to search for
-        top_k (int): Number of top results to return (default: 30)
+        embedding_rows (list): Dicts with id_text_origin, correlation_type, text_content and embedding
+    """
+    session.add_all([
+        DbCorrelationEmbedding(
+            id_text_origin=row["id_text_origin"],
+            correlation_type=row["correlation_type"],
+            text_content=row["text_content"],
+            vector=row["embedding"]
+        )
+        for row in embedding_rows
+    ])
+    session.flush()
+
+def save_chunks_with_embeddings(session, chunk_texts: list, chunk_embeddings: list, write_mode: str = "copy") -> list:
+    """
+    Write chunks and their embeddings using an open session, without committing.
+    
+    Args:
+        session: Session of the current unit of work
+        chunk_texts (list): Original text of each chunk
+        chunk_embeddings (list): For each chunk, a list of dicts with correlation_type,
+            text_content and embedding (same shape used by save_embedding_to_postgresql)
+        write_mode (str): "orm", "insert" or "copy"
+    
+    Returns:
+        list: IDs of the saved original texts, in chunk order
+    """
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode must be one of {WRITE_MODES}")
+    
+    origin_ids = insert_original_texts(session, chunk_texts)
+    embedding_rows = [
+        {"id_text_origin": id_text_origin, **data}
+        for id_text_origin, embedding_data in zip(origin_ids, chunk_embeddings)
+        for data in embedding_data
+    ]
+    if write_mode == "copy":
+        copy_embeddings(session, embedding_rows)
+    elif write_mode == "insert":
+        insert_embeddings(session, embedding_rows)
+    else:
+        add_embeddings_orm(session, embedding_rows)
+    return origin_ids
+
+def bulk_save_embeddings(chunk_texts: list, chunk_embeddings: list, write_mode: str = "copy") -> list:
+    """
+    Save all chunks and embeddings of one request in a single unit of work
+    (one pooled connection, one transaction): either everything is saved or nothing is.
+    
+    Args:
+        chunk_texts (list): Original text of each chunk
+        chunk_embeddings (list): For each chunk, a list of dicts with correlation_type,
+            text_content and embedding
+        write_mode (str): "orm", "insert" or "copy" (PostgreSQL backend only; other
+            vector stores receive the rows through VectorStore.upsert)
     
     Returns:
-        list: List of tuples containing (distance, text_content, correlation_type, origin_text_data)
-              or None if error occurs
+        list: IDs of the saved original texts, in chunk order
+    """
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode must be one of {WRITE_MODES}")
+    
+    store = get_vector_store()
+    if not isinstance(store, PgVectorStore):
+        origin_ids = store.add_origin_texts(chunk_texts)
+        store.upsert([
+            {"id_text_origin": id_text_origin, **data}
+            for id_text_origin, embedding_data in zip(origin_ids, chunk_embeddings)
+            for data in embedding_data
+        ])
+        return origin_ids
+    
+    with UnitOfWork() as uow:
+        origin_ids = save_chunks_with_embeddings(uow.session, chunk_texts, chunk_embeddings, write_mode)
+    # COPY não devolve os IDs gravados: o índice local os busca na sincronização
+    notify_vector_index_sync()
+    return origin_ids
+
+# O vetor da pergunta é convertido para o tipo da coluna para que o índice HNSW seja usado
+SEARCH_VETORIAL_QUERY = text(f"""
+    SELECT 
+        ce.vector <=> CAST(:question_vector AS {column_sql_type()}) AS distance,
+        ce.text_content,
+        ce.correlation_type,
+        ce.id as embedding_id,
+        ce.id_text_origin as origin_text_id
+    FROM db_correlation_embedding ce
+    WHERE ce.vector IS NOT NULL
+    ORDER BY distance ASC
+    LIMIT :limit_count
+""")
+
+# Fase 1 ordena pela mesma expressão do índice de Hamming (vector_schema.binary_index_sql);
+# fase 2 calcula o cosseno exato apenas para os candidatos
+SEARCH_BINARY_RERANK_QUERY = text(f"""
+    WITH candidates AS (
+        SELECT ce.id
+        FROM db_correlation_embedding ce
+        ORDER BY {binary_quantize_sql('ce.vector')} <~> {binary_quantize_sql(f'CAST(:question_vector AS {column_sql_type()})')}
+        LIMIT :candidate_count
+    )
+    SELECT 
+        ce.vector <=> CAST(:question_vector AS {column_sql_type()}) AS distance,
+        ce.text_content,
+        ce.correlation_type,
+        ce.id as embedding_id,
+        ce.id_text_origin as origin_text_id
+    FROM candidates c
+    INNER JOIN db_correlation_embedding ce ON ce.id = c.id
+    WHERE ce.vector IS NOT NULL
+    ORDER BY distance ASC
+    LIMIT :limit_count
+""")
+
+_QUESTION_VECTOR_SQL = f"CAST(:question_vector AS {column_sql_type()})"
+
+_GROUPED_CANDIDATES_DIRECT_SQL = f"""
+        SELECT ce.id, ce.id_text_origin, ce.text_content, ce.correlation_type,
+               ce.vector <=> {_QUESTION_VECTOR_SQL} AS distance
+        FROM db_correlation_embedding ce
+        WHERE ce.vector IS NOT NULL
+        ORDER BY distance ASC
+        LIMIT :candidate_count"""
+
+_GROUPED_CANDIDATES_BINARY_SQL = f"""
+        SELECT ce.id, ce.id_text_origin, ce.text_content, ce.correlation_type,
+               ce.vector <=> {_QUESTION_VECTOR_SQL} AS distance
+        FROM (
+            SELECT id
+            FROM db_correlation_embedding
+            ORDER BY {binary_quantize_sql('vector')} <~> {binary_quantize_sql(_QUESTION_VECTOR_SQL)}
+            LIMIT :binary_candidate_count
+        ) b
+        INNER JOIN db_correlation_embedding ce ON ce.id = b.id
+        WHERE ce.vector IS NOT NULL
+        ORDER BY distance ASC
+        LIMIT :candidate_count"""
+
+def _grouped_search_query(candidates_sql: str):
+    """
+    Busca agrupada: sobre o conjunto de candidatos ANN, numera as variantes de cada texto
+    de origem (ROW_NUMBER), escolhe as top_k origens pela melhor variante e devolve até
+    hits_per_origin variantes de cada uma. Os textos de origem são buscados depois, uma vez
+    por origem (fetch_origin_texts).
+    """
+    return text(f"""
+    WITH candidates AS ({candidates_sql}
+    ),
+    ranked AS (
+        SELECT c.*,
+               ROW_NUMBER() OVER (PARTITION BY c.id_text_origin ORDER BY c.distance ASC, c.id ASC) AS origin_rank
+        FROM candidates c
+    ),
+    top_origins AS (
+        SELECT id_text_origin, distance AS origin_distance
+        FROM ranked
+        WHERE origin_rank = 1
+        ORDER BY distance ASC
+        LIMIT :limit_count
+    )
+    SELECT 
+        r.distance,
+        r.text_content,
+        r.correlation_type,
+        r.id AS embedding_id,
+        t.id_text_origin AS origin_text_id,
+        r.origin_rank
+    FROM top_origins t
+    INNER JOIN ranked r ON r.id_text_origin = t.id_text_origin AND r.origin_rank <= :hits_per_origin
+    ORDER BY t.origin_distance ASC, t.id_text_origin ASC, r.origin_rank ASC
+""")
+
+SEARCH_GROUPED_QUERY = _grouped_search_query(_GROUPED_CANDIDATES_DIRECT_SQL)
+SEARCH_GROUPED_BINARY_QUERY = _grouped_search_query(_GROUPED_CANDIDATES_BINARY_SQL)
+
+# Campos aceitos em fields=; origin_texts é o mapa de textos de origem da resposta
+SEARCH_FIELDS = frozenset({
+    'distance', 'text_content', 'correlation_type', 'embedding_id', 'origin_text_id', 'origin_texts'
+})
+
+# Busca híbrida em um único comando: a lista vetorial (HNSW) e a textual (GIN sobre o tsvector
+# dos textos de origem) são ranqueadas separadamente e combinadas por reciprocal rank fusion.
+# Cada texto de origem encontrado pelo full-text entra com a sua variante mais próxima da pergunta.
+# Os termos da pergunta são combinados com OR: com AND, perguntas em linguagem natural
+# raramente casam com um texto inteiro.
+_LEXICAL_QUERY_SQL = (
+    f"to_tsquery('{TEXT_SEARCH_CONFIG}'::regconfig, "
+    f"replace(CAST(plainto_tsquery('{TEXT_SEARCH_CONFIG}'::regconfig, :question_text) AS text), ' & ', ' | '))"
+)
+
+SEARCH_HYBRID_QUERY = text(f"""
+    WITH vector_candidates AS (
+        SELECT ce.id, ce.vector <=> {_QUESTION_VECTOR_SQL} AS distance
+        FROM db_correlation_embedding ce
+        WHERE ce.vector IS NOT NULL
+        ORDER BY distance ASC
+        LIMIT :candidate_count
+    ),
+    vector_ranked AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY distance ASC, id ASC) AS vector_rank
+        FROM vector_candidates
+    ),
+    lexical_origins AS (
+        SELECT ot.id, ts_rank_cd(ot.{TEXT_SEARCH_COLUMN}, q.query) AS lexical_score
+        FROM db_origin_text ot, {_LEXICAL_QUERY_SQL} AS q(query)
+        WHERE ot.{TEXT_SEARCH_COLUMN} @@ q.query
+        ORDER BY lexical_score DESC
+        LIMIT :candidate_count
+    ),
+    lexical_ranked AS (
+        SELECT best.id, ROW_NUMBER() OVER (ORDER BY lo.lexical_score DESC, lo.id ASC) AS lexical_rank
+        FROM lexical_origins lo
+        CROSS JOIN LATERAL (
+            SELECT ce.id
+            FROM db_correlation_embedding ce
+            WHERE ce.id_text_origin = lo.id AND ce.vector IS NOT NULL
+            ORDER BY ce.vector <=> {_QUESTION_VECTOR_SQL} ASC
+            LIMIT 1
+        ) best
+    ),
+    fused AS (
+        SELECT COALESCE(v.id, l.id) AS id,
+               COALESCE(1.0 / (:rrf_k + v.vector_rank), 0) + COALESCE(1.0 / (:rrf_k + l.lexical_rank), 0) AS rrf_score
+        FROM vector_ranked v
+        FULL OUTER JOIN lexical_ranked l ON l.id = v.id
+    )
+    SELECT 
+        ce.vector <=> {_QUESTION_VECTOR_SQL} AS distance,
+        ce.text_content,
+        ce.correlation_type,
+        ce.id as embedding_id,
+        ce.id_text_origin as origin_text_id,
+        f.rrf_score
+    FROM fused f
+    INNER JOIN db_correlation_embedding ce ON ce.id = f.id
+    ORDER BY f.rrf_score DESC, distance ASC
+    LIMIT :limit_count
+""")
+
+def _batch_search_query(question_count: int):
+    """
+    Busca de várias perguntas em um único comando: cada vetor da lista VALUES faz a sua
+    própria busca pelo índice HNSW no LATERAL; position mantém a ordem de entrada.
+    """
+    values = ",\n            ".join(
+        f"({position}, CAST(:question_vector_{position} AS {column_sql_type()}))"
+        for position in range(question_count)
+    )
+    return text(f"""
+    SELECT 
+        q.position,
+        hit.distance,
+        hit.text_content,
+        hit.correlation_type,
+        hit.embedding_id,
+        hit.origin_text_id
+    FROM (
+        VALUES
+            {values}
+    ) AS q(position, question_vector)
+    CROSS JOIN LATERAL (
+        SELECT 
+            ce.vector <=> q.question_vector AS distance,
+            ce.text_content,
+            ce.correlation_type,
+            ce.id as embedding_id,
+            ce.id_text_origin as origin_text_id
+        FROM db_correlation_embedding ce
+        WHERE ce.vector IS NOT NULL
+        ORDER BY distance ASC
+        LIMIT :limit_count
+    ) hit
+    ORDER BY q.position ASC, hit.distance ASC
+""")
+
+# Colunas de db_correlation_embedding de cada filtro da busca (vector_store.FILTER_FIELDS)
+_FILTER_COLUMNS = {"correlation_type": "ce.correlation_type", "origin_text_id": "ce.id_text_origin"}
+
+def _filtered_search_query(filter_fields: tuple):
     """
+    Busca vetorial restrita aos filtros informados (um parâmetro de array por filtro)
+    """
+    conditions = "".join(f"\n      AND {_FILTER_COLUMNS[field]} = ANY(:{field})" for field in filter_fields)
+    return text(f"""
+    SELECT
+        ce.vector <=> CAST(:question_vector AS {column_sql_type()}) AS distance,
+        ce.text_content,
+        ce.correlation_type,
+        ce.id as embedding_id,
+        ce.id_text_origin as origin_text_id
+    FROM db_correlation_embedding ce
+    WHERE ce.vector IS NOT NULL{conditions}
+    ORDER BY distance ASC
+    LIMIT :limit_count
+""")
+
+SET_EF_SEARCH_QUERY = text("SELECT set_config('hnsw.ef_search', :ef_search, true)")
+
+def _validate_search_params(question: str, top_k: int, oversample: int = 0, hits_per_origin: int = 0,
+                            mode: str = "vector") -> None:
     if not question or not question.strip():
         raise ValueError("Question cannot be empty")
     
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of {SEARCH_MODES}")
+    
+    if mode == "hybrid" and hits_per_origin:
+        raise ValueError("hits_per_origin is not supported in hybrid mode")
+    
+    if not isinstance(oversample, int) or oversample < 0:
+        raise ValueError("oversample must be a non-negative integer")
+    
+    if not isinstance(hits_per_origin, int) or hits_per_origin < 0:
+        raise ValueError("hits_per_origin must be a non-negative integer")
+    
     if not isinstance(top_k, int) or top_k <= 0:
         raise ValueError("top_k must be a positive integer")
     
     if top_k > 1000:  # Limite máximo para evitar sobrecarga
         raise ValueError("top_k cannot exceed 1000")
+
+def _parse_fields(fields) -> Optional[frozenset]:
+    """
+    Normaliza a projeção de campos ("a,b" ou lista); None mantém todos os campos
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    fields = frozenset(field.strip() for field in fields if field.strip())
+    if not fields:
+        raise ValueError("fields cannot be empty")
+    unknown = fields - SEARCH_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(sorted(SEARCH_FIELDS))}")
+    return fields
+
+def _vector_literal(vector) -> str:
+    """
+    Formata o vetor no literal textual do pgvector ('[x,y,...]')
+    """
+    return '[' + ','.join(str(float(x)) for x in vector) + ']'
+
+def _ef_search_statement(candidate_count: int) -> tuple:
+    # O HNSW devolve no máximo ef_search candidatos (padrão 40); vale só para esta transação
+    ef_search = str(min(max(candidate_count, 40), HNSW_MAX_EF_SEARCH))
+    return SET_EF_SEARCH_QUERY, {'ef_search': ef_search}
+
+def _search_plan(question_embedding, top_k: int, oversample: int, hits_per_origin: int = 0,
+                 question_text: str = None) -> tuple:
+    """
+    Comandos da busca vetorial, na ordem de execução (o último retorna os resultados),
+    e a função que formata as linhas retornadas. Com question_text, a busca é híbrida
+    (o oversample não se aplica).
+    """
+    params = {'question_vector': _vector_literal(question_embedding), 'limit_count': top_k}
+    if question_text is not None:
+        params['question_text'] = question_text
+        params['candidate_count'] = min(top_k * HYBRID_SEARCH_CANDIDATE_FACTOR, HNSW_MAX_EF_SEARCH)
+        params['rrf_k'] = HYBRID_RRF_K
+        return [
+            _ef_search_statement(params['candidate_count']),
+            (SEARCH_HYBRID_QUERY, params)
+        ], _format_search_rows
+    if hits_per_origin:
+        candidate_count = min(top_k * GROUPED_SEARCH_CANDIDATE_FACTOR, HNSW_MAX_EF_SEARCH)
+        params['candidate_count'] = candidate_count
+        params['hits_per_origin'] = hits_per_origin
+        if oversample:
+            params['binary_candidate_count'] = candidate_count * oversample
+            statements = [
+                _ef_search_statement(params['binary_candidate_count']),
+                (SEARCH_GROUPED_BINARY_QUERY, params)
+            ]
+        else:
+            statements = [_ef_search_statement(candidate_count), (SEARCH_GROUPED_QUERY, params)]
+        return statements, _format_grouped_rows
+    if not oversample:
+        return [(SEARCH_VETORIAL_QUERY, params)], _format_search_rows
+    params['candidate_count'] = top_k * oversample
+    return [
+        _ef_search_statement(params['candidate_count']),
+        (SEARCH_BINARY_RERANK_QUERY, params)
+    ], _format_search_rows
+
+def search_by_vector(session, question_embedding, top_k: int, oversample: int = 0, hits_per_origin: int = 0,
+                     question_text: str = None) -> list:
+    """
+    Executa a busca vetorial para um vetor já calculado, na sessão informada.
+    Com question_text, faz a busca híbrida (vetorial + full-text)
+    """
+    statements, format_rows = _search_plan(question_embedding, top_k, oversample, hits_per_origin, question_text)
+    for statement, params in statements:
+        result = session.execute(statement, params)
+    return format_rows(result.fetchall())
+
+async def search_by_vector_async(session, question_embedding, top_k: int, oversample: int = 0,
+                                 hits_per_origin: int = 0, question_text: str = None) -> list:
+    statements, format_rows = _search_plan(question_embedding, top_k, oversample, hits_per_origin, question_text)
+    for statement, params in statements:
+        result = await session.execute(statement, params)
+    return format_rows(result.fetchall())
+
+def _format_grouped_rows(rows) -> list:
+    """
+    Agrupa as linhas da busca agrupada por texto de origem, na ordem da melhor distância
+    """
+    groups = []
+    for row in rows:
+        if not groups or groups[-1]['origin_text_id'] != row[4]:
+            groups.append({
+                'origin_text_id': row[4],
+                'distance': float(row[0]),
+                'hits': []
+            })
+        groups[-1]['hits'].append({
+            'distance': float(row[0]),
+            'text_content': row[1],
+            'correlation_type': row[2],
+            'embedding_id': row[3]
+        })
+    return groups
+
+def _format_search_rows(rows) -> list:
+    formatted_results = []
+    for row in rows:
+        formatted_results.append({
+            'distance': float(row[0]),
+            'text_content': row[1],
+            'correlation_type': row[2],
+            'embedding_id': row[3],
+            'origin_text_id': row[4]
+        })
+    return formatted_results
+
+def _origin_text_ids(results: list) -> list:
+    # Ordem da primeira ocorrência, sem repetição
+    return list(dict.fromkeys(result['origin_text_id'] for result in results))
+
+def _origin_texts_statement(origin_text_ids: list):
+    return select(DbOriginText.id, DbOriginText.data).where(DbOriginText.id.in_(origin_text_ids))
+
+def fetch_origin_texts(session, origin_text_ids: list) -> dict:
+    """
+    Busca os textos de origem distintos em uma única consulta: {id: texto}
+    """
+    if not origin_text_ids:
+        return {}
+    rows = session.execute(_origin_texts_statement(origin_text_ids)).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+async def fetch_origin_texts_async(session, origin_text_ids: list) -> dict:
+    if not origin_text_ids:
+        return {}
+    rows = (await session.execute(_origin_texts_statement(origin_text_ids))).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+def _project_results(results: list, fields: Optional[frozenset], grouped: bool) -> list:
+    """
+    Mantém apenas os campos pedidos em cada resultado (nos hits, na busca agrupada)
+    """
+    if fields is None:
+        return results
+    if grouped:
+        for group in results:
+            group['hits'] = [{k: v for k, v in hit.items() if k in fields} for hit in group['hits']]
+        return results
+    return [{k: v for k, v in result.items() if k in fields} for result in results]
+
+def _search_vector_index(index, question_embedding, top_k: int, fields: Optional[frozenset]) -> dict:
+    """
+    Busca no índice local mapeado em memória, no mesmo formato da busca no Postgres
+    """
+    hits = index.search(question_embedding, top_k)
+    rows = index.rows([embedding_id for embedding_id, _ in hits])
+    results = [
+        {
+            'distance': distance,
+            'text_content': rows[embedding_id][0],
+            'correlation_type': rows[embedding_id][1],
+            'embedding_id': embedding_id,
+            'origin_text_id': rows[embedding_id][2]
+        }
+        for embedding_id, distance in hits
+        if embedding_id in rows
+    ]
+    response = {}
+    if fields is None or 'origin_texts' in fields:
+        response['origin_texts'] = index.origin_texts(_origin_text_ids(results))
+    response['results'] = _project_results(results, fields, False)
+    return response
+
+def _search_store(store, question_embedding, top_k: int, filters: Optional[dict], fields: Optional[frozenset]) -> dict:
+    """
+    Busca pela interface VectorStore (backend numpy ou busca com filtros)
+    """
+    results = store.search(question_embedding, top_k, filters)
+    response = {}
+    if fields is None or 'origin_texts' in fields:
+        response['origin_texts'] = store.get_origin_texts(_origin_text_ids(results))
+    response['results'] = _project_results(results, fields, False)
+    return response
+
+def _validate_store_search(store, hits_per_origin: int, question_text: Optional[str], filters: Optional[dict]) -> None:
+    if filters and (question_text is not None or hits_per_origin):
+        raise ValueError("filters are only supported in vector mode without hits_per_origin")
+    
+    if not isinstance(store, PgVectorStore) and (question_text is not None or hits_per_origin):
+        raise ValueError("hybrid mode and hits_per_origin require VECTOR_STORE_BACKEND=pgvector")
+
+def search_vetorial(question: str, top_k: int, oversample: int = None, hits_per_origin: int = None,
+                    fields=None, mode: str = None, filters: dict = None):
+    """
+    Search for similar embeddings in the PostgreSQL database using vector similarity.
+    
+    Args:
+        question (str): The question to search for
+        top_k (int): Number of top results to return (default: 30)
+        oversample (int): Two-phase search factor: top_k * oversample candidates are taken
+            by Hamming distance over the binary-quantized vectors and re-ranked by exact
+            cosine distance. 0 searches the full vectors directly (default: BINARY_SEARCH_OVERSAMPLE)
+        hits_per_origin (int): Grouped mode: return the top_k best origin texts, each with its
+            hits_per_origin best-scoring variants. 0 or None returns the flat variant list
+        fields (iterable): Projection of the result fields (SEARCH_FIELDS). "origin_texts"
+            controls whether the origin texts are fetched. None returns everything
+        mode (str): "vector" (cosine distance only) or "hybrid": the vector and the full-text
+            matches over the origin texts merged by reciprocal rank fusion, which finds exact
+            identifiers and codes at small top_k. oversample and hits_per_origin do not
+            apply to hybrid (default: SEARCH_MODE)
+        filters (dict): Restrict the search to the given values, e.g.
+            {"correlation_type": [...], "origin_text_id": [...]} (vector mode, no grouping)
+    
+    The search goes through the vector store chosen by VECTOR_STORE_BACKEND; hybrid and
+    grouped searches need the pgvector backend. With MMAP_INDEX_ENABLED, plain vector
+    searches on pgvector (no hybrid mode, no grouping, no filters) are served exactly from
+    the local memory-mapped index instead of Postgres.
+    
+    Returns:
+        dict: {"results": [...], "origin_texts": {origin_text_id: data}} or None if error occurs.
+              Each result carries distance, text_content, correlation_type, embedding_id and
+              origin_text_id; the origin texts come once each in the origin_texts map. In grouped
+              mode, results are dicts with origin_text_id, distance (best hit) and hits
+    """
+    oversample = BINARY_SEARCH_OVERSAMPLE if oversample is None else oversample
+    hits_per_origin = hits_per_origin or 0
+    mode = mode or SEARCH_MODE
+    _validate_search_params(question, top_k, oversample, hits_per_origin, mode)
+    fields = _parse_fields(fields)
+    question_text = question if mode == "hybrid" else None
+    filters = normalize_filters(filters)
+    store = get_vector_store()
+    _validate_store_search(store, hits_per_origin, question_text, filters)
     
     try:
-        question_embedding = embedding_service(question)
+        with observe_stage("search", "question_embedding"):
+            question_embedding = query_embedding_service(question)
+        
+        if filters or not isinstance(store, PgVectorStore):
+            with observe_stage("search", "store"):
+                return _search_store(store, question_embedding, top_k, filters, fields)
+        
+        index = get_vector_index()
+        if index is not None and question_text is None and not hits_per_origin:
+            with observe_stage("search", "mmap_index"):
+                return _search_vector_index(index, question_embedding, top_k, fields)
         
         with get_db_session() as session:
-            # Usar parâmetros seguros para pgvector - converter para lista Python
-            # O SQLAlchemy irá tratar a conversão de forma segura
-            
-            query = text("""
-                SELECT 
-                    ce.vector <=> CAST(:question_vector AS vector) AS distance,
-                    ce.text_content,
-                    ce.correlation_type,
-                    ot.data as origin_text_data,
-                    ce.id as embedding_id,
-                    ot.id as origin_text_id
-                FROM db_correlation_embedding ce
-                INNER JOIN db_origin_text ot ON ce.id_text_origin = ot.id
-                WHERE ce.vector IS NOT NULL
-                ORDER BY distance ASC
-                LIMIT :limit_count
-            """)
-            
-            embedding_str = '[' + ','.join(str(float(x)) for x in question_embedding) + ']'
-            
-            result = session.execute(
-                query, 
-                {
-                    'question_vector': embedding_str,
-                    'limit_count': top_k
-                }
-            )
+            with observe_stage("search", "sql"):
+                results = search_by_vector(session, question_embedding, top_k, oversample, hits_per_origin, question_text)
+            response = {}
+            if fields is None or 'origin_texts' in fields:
+                with observe_stage("search", "origin_texts"):
+                    response['origin_texts'] = fetch_origin_texts(session, _origin_text_ids(results))
+        response['results'] = _project_results(results, fields, bool(hits_per_origin))
+        return response
             
-            results = result.fetchall()
+    except Exception as e:
+        print(f"Error in vector search: {e}")
+        return None
+
+async def search_vetorial_async(question: str, top_k: int, oversample: int = None, hits_per_origin: int = None,
+                                fields=None, mode: str = None, filters: dict = None):
+    """
+    Async variant of search_vetorial: the question embedding and the database query
+    run on the event loop (AsyncAzureOpenAI + asyncpg) instead of blocking it.
+    
+    Returns:
+        dict: Same result format as search_vetorial, or None if error occurs
+    """
+    oversample = BINARY_SEARCH_OVERSAMPLE if oversample is None else oversample
+    hits_per_origin = hits_per_origin or 0
+    mode = mode or SEARCH_MODE
+    _validate_search_params(question, top_k, oversample, hits_per_origin, mode)
+    fields = _parse_fields(fields)
+    question_text = question if mode == "hybrid" else None
+    filters = normalize_filters(filters)
+    store = get_vector_store()
+    _validate_store_search(store, hits_per_origin, question_text, filters)
+    
+    try:
+        with observe_stage("search", "question_embedding"):
+            question_embedding = await query_embedding_service_async(question)
+        
+        # As implementações de VectorStore são síncronas: rodam fora do event loop
+        if filters or not isinstance(store, PgVectorStore):
+            with observe_stage("search", "store"):
+                return await asyncio.to_thread(_search_store, store, question_embedding, top_k, filters, fields)
+        
+        index = get_vector_index()
+        if index is not None and question_text is None and not hits_per_origin:
+            with observe_stage("search", "mmap_index"):
+                return await asyncio.to_thread(_search_vector_index, index, question_embedding, top_k, fields)
+        
+        async with get_async_db_session() as session:
+            with observe_stage("search", "sql"):
+                results = await search_by_vector_async(
+                    session, question_embedding, top_k, oversample, hits_per_origin, question_text
+                )
+            response = {}
+            if fields is None or 'origin_texts' in fields:
+                with observe_stage("search", "origin_texts"):
+                    response['origin_texts'] = await fetch_origin_texts_async(session, _origin_text_ids(results))
+        response['results'] = _project_results(results, fields, bool(hits_per_origin))
+        return response
             
-            formatted_results = []
-            for row in results:
-                formatted_results.append({
-                    'distance': float(row[0]),
-                    'text_content': row[1],
-                    'correlation_type': row[2],
-                    'origin_text_data': row[3],
-                    'embedding_id': row[4],
-                    'origin_text_id': row[5]
-                })
+    except Exception as e:
+        print(f"Error in vector search: {e}")
+        return None
+
+def _validate_batch_search_params(questions: list, top_k: int) -> None:
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("questions must be a non-empty list")
+    
+    if len(questions) > SEARCH_BATCH_MAX_QUESTIONS:
+        raise ValueError(f"questions cannot exceed {SEARCH_BATCH_MAX_QUESTIONS}")
+    
+    for position, question in enumerate(questions):
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError(f"Question cannot be empty (position {position})")
+    
+    _validate_search_params(questions[0], top_k)
+
+def _batch_search_plan(question_embeddings: list, top_k: int) -> list:
+    params = {'limit_count': top_k}
+    for position, question_embedding in enumerate(question_embeddings):
+        params[f'question_vector_{position}'] = _vector_literal(question_embedding)
+    return [_ef_search_statement(top_k), (_batch_search_query(len(question_embeddings)), params)]
+
+def _format_batch_rows(rows, question_count: int) -> list:
+    """
+    Separa as linhas da busca em lote por posição da pergunta (listas vazias sem resultados)
+    """
+    rows_by_question = [[] for _ in range(question_count)]
+    for row in rows:
+        rows_by_question[row[0]].append(row[1:])
+    return [_format_search_rows(question_rows) for question_rows in rows_by_question]
+
+def search_by_vectors(session, question_embeddings: list, top_k: int) -> list:
+    """
+    Executa a busca de vários vetores em um único comando; uma lista de resultados por vetor
+    """
+    for statement, params in _batch_search_plan(question_embeddings, top_k):
+        result = session.execute(statement, params)
+    return _format_batch_rows(result.fetchall(), len(question_embeddings))
+
+async def search_by_vectors_async(session, question_embeddings: list, top_k: int) -> list:
+    for statement, params in _batch_search_plan(question_embeddings, top_k):
+        result = await session.execute(statement, params)
+    return _format_batch_rows(result.fetchall(), len(question_embeddings))
+
+def _batch_origin_text_ids(results_by_question: list) -> list:
+    return _origin_text_ids([result for results in results_by_question for result in results])
+
+def _batch_response(questions: list, results_by_question: list, fields: Optional[frozenset]) -> list:
+    return [
+        {'question': question, 'results': _project_results(results, fields, False)}
+        for question, results in zip(questions, results_by_question)
+    ]
+
+def _search_batch_store(store, questions: list, question_embeddings: list, top_k: int,
+                        fields: Optional[frozenset]) -> dict:
+    """
+    Busca em lote pela interface VectorStore: uma busca por pergunta (backends sem SQL)
+    """
+    results_by_question = [store.search(question_embedding, top_k) for question_embedding in question_embeddings]
+    response = {}
+    if fields is None or 'origin_texts' in fields:
+        response['origin_texts'] = store.get_origin_texts(_batch_origin_text_ids(results_by_question))
+    response['results'] = _batch_response(questions, results_by_question, fields)
+    return response
+
+def search_batch(questions: list, top_k: int, fields=None):
+    """
+    Search many questions at once: one batched embeddings request for the questions
+    missing from the query cache and one SQL statement for all nearest-neighbour lookups.
+    
+    Args:
+        questions (list): Questions to search for (at most SEARCH_BATCH_MAX_QUESTIONS)
+        top_k (int): Number of results per question
+        fields (iterable): Same projection as search_vetorial
+    
+    Returns:
+        dict: {"results": [{"question": ..., "results": [...]}, ...], "origin_texts": {...}}
+              with one entry per question in input order, or None if error occurs.
+              origin_texts holds the origin texts of all questions, once each
+    """
+    _validate_batch_search_params(questions, top_k)
+    fields = _parse_fields(fields)
+    store = get_vector_store()
+    
+    try:
+        question_embeddings = query_embedding_batch_service(questions)
+        
+        if not isinstance(store, PgVectorStore):
+            return _search_batch_store(store, questions, question_embeddings, top_k, fields)
+        
+        with get_db_session() as session:
+            results_by_question = search_by_vectors(session, question_embeddings, top_k)
+            response = {}
+            if fields is None or 'origin_texts' in fields:
+                response['origin_texts'] = fetch_origin_texts(session, _batch_origin_text_ids(results_by_question))
+        response['results'] = _batch_response(questions, results_by_question, fields)
+        return response
             
-            return formatted_results
+    except Exception as e:
+        print(f"Error in batch vector search: {e}")
+        return None
+
+async def search_batch_async(questions: list, top_k: int, fields=None):
+    """
+    Async variant of search_batch.
+    
+    Returns:
+        dict: Same result format as search_batch, or None if error occurs
+    """
+    _validate_batch_search_params(questions, top_k)
+    fields = _parse_fields(fields)
+    store = get_vector_store()
+    
+    try:
+        question_embeddings = await query_embedding_batch_service_async(questions)
+        
+        if not isinstance(store, PgVectorStore):
+            return await asyncio.to_thread(_search_batch_store, store, questions, question_embeddings, top_k, fields)
+        
+        async with get_async_db_session() as session:
+            results_by_question = await search_by_vectors_async(session, question_embeddings, top_k)
+            response = {}
+            if fields is None or 'origin_texts' in fields:
+                response['origin_texts'] = await fetch_origin_texts_async(
+                    session, _batch_origin_text_ids(results_by_question)
+                )
+        response['results'] = _batch_response(questions, results_by_question, fields)
+        return response
             
     except Exception as e:
-        print(f"Error in vector search: {e}")
+        print(f"Error in batch vector search: {e}")
         return None
 
 
+class PgVectorStore:
+    """
+    VectorStore backed by the PostgreSQL tables (db_origin_text / db_correlation_embedding)
+    and pgvector. Writes also keep the local memory-mapped index up to date when enabled.
+    """
+    def add_origin_texts(self, texts: list) -> list:
+        with get_db_session() as session:
+            origin_texts = [DbOriginText(data=data) for data in texts]
+            for origin_text in origin_texts:
+                session.add(origin_text)
+            session.commit()
+            for origin_text in origin_texts:
+                session.refresh(origin_text)
+            ids = [origin_text.id for origin_text in origin_texts]
+        
+        index = get_vector_index()
+        if index is not None:
+            index.add_origin_texts(dict(zip(ids, texts)))
+        return ids
+    
+    def upsert(self, rows: list) -> list:
+        with get_db_session() as session:
+            embeddings = []
+            updated = False
+            for row in rows:
+                embedding = DbCorrelationEmbedding(
+                    id_text_origin=row["id_text_origin"],
+                    correlation_type=row["correlation_type"],
+                    text_content=row["text_content"],
+                    vector=row["embedding"]
+                )
+                if row.get("embedding_id") is not None:
+                    embedding.id = row["embedding_id"]
+                    embedding = session.merge(embedding)
+                    updated = True
+                else:
+                    session.add(embedding)
+                embeddings.append(embedding)
+            session.commit()
+            ids = [embedding.id for embedding in embeddings]
+            
+            # As linhas gravadas entram no índice local sem esperar a próxima sincronização;
+            # o índice só acrescenta linhas, então uma substituição o recria
+            index = get_vector_index()
+            if index is not None:
+                if updated:
+                    rebuild_from_database(index, session)
+                else:
+                    index.append([
+                        {
+                            "embedding_id": embedding_id,
+                            "origin_text_id": row["id_text_origin"],
+                            "correlation_type": row["correlation_type"],
+                            "text_content": row["text_content"],
+                            "embedding": row["embedding"]
+                        }
+                        for embedding_id, row in zip(ids, rows)
+                    ])
+        return ids
+    
+    def search(self, query_vector, top_k: int, filters: Optional[dict] = None) -> list:
+        filters = normalize_filters(filters)
+        with get_db_session() as session:
+            if not filters:
+                return search_by_vector(session, query_vector, top_k)
+            params = {'question_vector': _vector_literal(query_vector), 'limit_count': top_k}
+            params.update({field: list(values) for field, values in filters.items()})
+            statement, ef_params = _ef_search_statement(top_k * FILTERED_SEARCH_CANDIDATE_FACTOR)
+            session.execute(statement, ef_params)
+            rows = session.execute(_filtered_search_query(tuple(filters)), params).fetchall()
+            return _format_search_rows(rows)
+    
+    def get_origin_texts(self, origin_text_ids: list) -> dict:
+        with get_db_session() as session:
+            return fetch_origin_texts(session, origin_text_ids)
+    
+    def delete_by_origin(self, origin_text_ids: list) -> int:
+        with get_db_session() as session:
+            deleted = session.execute(
+                delete(DbCorrelationEmbedding).where(DbCorrelationEmbedding.id_text_origin.in_(origin_text_ids))
+            ).rowcount
+            session.execute(delete(DbOriginText).where(DbOriginText.id.in_(origin_text_ids)))
+            session.commit()
+        # A contagem do banco diverge do índice local, que é recriado na sincronização
+        notify_vector_index_sync()
+        return deleted
+
+_vector_store = None
+_vector_store_lock = threading.Lock()
+
+def get_vector_store():
+    """
+    Vector store of the process, chosen by VECTOR_STORE_BACKEND: "pgvector" (default) or
+    "numpy" (in memory, for tests and benchmarks without PostgreSQL).
+    """
+    global _vector_store
+    backend = os.getenv('VECTOR_STORE_BACKEND', 'pgvector').lower()
+    if backend not in VECTOR_STORE_BACKENDS:
+        raise ValueError(f"VECTOR_STORE_BACKEND must be one of {VECTOR_STORE_BACKENDS}")
+    store_class = PgVectorStore if backend == "pgvector" else NumpyVectorStore
+    if not isinstance(_vector_store, store_class):
+        with _vector_store_lock:
+            if not isinstance(_vector_store, store_class):
+                _vector_store = PgVectorStore() if backend == "pgvector" else NumpyVectorStore(EMBEDDING_DIMENSIONS)
+    return _vector_store
+
+def delete_origin_texts(origin_text_ids: list) -> int:
+    """
+    Delete origin texts and all their embeddings from the configured vector store.
+    
+    Returns:
+        int: Number of embeddings deleted
+    """
+    if not origin_text_ids:
+        return 0
+    return get_vector_store().delete_by_origin(origin_text_ids)
 
 # Teste local
 # print(json.dumps(generate_text_semantic("Responsa em json, quanto é 2 + 2", "você é uma matematico"), indent=2, ensure_ascii=False))
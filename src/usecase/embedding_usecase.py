@@ -1,7 +1,35 @@
-from src.service.embedding_service import generate_text_semantic_service, embedding_service, save_original_text, save_embedding_to_postgresql, search_vetorial
+from src.service.embedding_service import GENERATION_MODEL, WRITE_MODES, generate_text_semantic_service, embedding_service, embedding_batch_service, save_original_text, save_embedding_to_postgresql, bulk_save_embeddings, search_vetorial, search_vetorial_async, search_batch, search_batch_async
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from src.models.database_models import CorrelationType
-import json
+from src.models.embedding_batch import EmbeddingBatch, EmbeddingRecord
+from src.infrastructure.generation_cache import get_generation_cache
+from src.infrastructure.metrics import observe_stage
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+# Número máximo de chamadas de geração (chat completions) simultâneas
+GENERATION_MAX_IN_FLIGHT = int(os.getenv('GENERATION_MAX_IN_FLIGHT', '8'))
+
+# Modo de geração: "per_type" faz uma chamada por tipo de correlação (três prompts);
+# "single_call" gera os três tipos em uma única chamada com resposta JSON estruturada
+GENERATION_MODE = os.getenv('GENERATION_MODE', 'per_type')
+GENERATION_MODES = ("per_type", "single_call")
+SINGLE_CALL_PROMPT = "multi_relacionamento"
+
+# Caminho opcional para gravar o lote gerado em JSON (depuração)
+EMBEDDING_DEBUG_DUMP = os.getenv('EMBEDDING_DEBUG_DUMP')
+
+# Modo de escrita no banco: "orm" (objetos ORM em lote), "insert" (INSERT multi-linha)
+# ou "copy" (COPY binário); todos gravam a requisição inteira em uma única transação
+EMBEDDING_WRITE_MODE = os.getenv('EMBEDDING_WRITE_MODE', 'orm')
+
+TYPE_RELATIONSHIP = ["similaridade_semantica", "relacionamento_semantico", "contexto_compartilhado"]
+
+TYPE_MAPPING = {
+    "similaridade_semantica": CorrelationType.SIMILARIDADE_SEMANTICA,
+    "relacionamento_semantico": CorrelationType.RELACIONAMENTO_SEMANTICO,
+    "contexto_compartilhado": CorrelationType.CONTEXTO_COMPARTILHADO
+}
 
 def create_overlapping_chunks(texts, overlap_size):
     """
@@ -34,8 +62,10 @@ def create_overlapping_chunks(texts, overlap_size):
     
     return overlapping_texts
 
-def embedding_usecase(input_text: str, index: int, chunk_size: int = 500, overlap_size: int = 100):
-    
+def split_into_chunks(input_text: str, chunk_size: int = 500, overlap_size: int = 100) -> list:
+    """
+    Divide o texto em chunks de até chunk_size caracteres e aplica o overlap manual.
+    """
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=0,  # função com de overlap da langchain não funciona
@@ -45,133 +75,305 @@ def embedding_usecase(input_text: str, index: int, chunk_size: int = 500, overla
     
     initial_chunks = text_splitter.split_text(input_text)
     
-    text_chunks = create_overlapping_chunks(initial_chunks, overlap_size)
+    return create_overlapping_chunks(initial_chunks, overlap_size)
+
+def select_generated_texts(text_data: dict, index: int) -> list:
+    """
+    Retorna até index textos gerados de um registro (vazio se a geração falhou).
+    """
+    results = text_data["data"]
+    if not isinstance(results, dict):
+        return []
+    return list(results.values())[:index]
+
+def build_processed_embedding(text_type: str, text_content: str, chunk_index: int, total_chunks, embedding) -> dict:
+    """
+    Monta o registro gravado em db_correlation_embedding para um texto gerado.
+    """
+    return {
+        "correlation_type": TYPE_MAPPING.get(text_type, text_type),
+        "text_content": f"{text_content}\n[Chunk {chunk_index} de {total_chunks if total_chunks is not None else 'N/A'}]",
+        "embedding": embedding
+    }
+
+def load_prompts(type_relationship: list = None) -> dict:
+    """
+    Lê uma única vez o prompt de cada tipo de correlação em src/prompt/.
+    Com o cache de gerações ativo, descarta as gerações feitas com versões antigas de cada prompt.
+    """
+    prompts = {}
+    for text in type_relationship or TYPE_RELATIONSHIP:
+        with open(f'src/prompt/{text}.txt', 'r', encoding='utf-8') as file:
+            prompts[text] = file.read()
     
-    type_relationship = ["similaridade_semantica", "relacionamento_semantico", "contexto_compartilhado"]
+    cache = get_generation_cache()
+    if cache is not None:
+        for text, prompt_assistant in prompts.items():
+            cache.invalidate_prompt(text, prompt_assistant)
+    return prompts
+
+def generate_cached(chunk_text: str, prompt_name: str, prompt_assistant: str, **kwargs):
+    """
+    Reaproveita a geração armazenada para (chunk, versão do prompt, modelo) quando existir;
+    caso contrário chama o modelo e armazena o resultado válido.
+    """
+    cache = get_generation_cache()
+    if cache is not None:
+        cached = cache.get(GENERATION_MODEL, prompt_assistant, chunk_text)
+        if cached is not None:
+            return cached
     
-    all_texts = []
+    result = generate_text_semantic_service(chunk_text, prompt_assistant, **kwargs)
     
-    for chunk_index, chunk_text in enumerate(text_chunks):
-        for text in type_relationship:
-            with open(f'src/prompt/{text}.txt', 'r', encoding='utf-8') as file:
-                prompt_assistant = file.read()
-            
-            input_text_all = generate_text_semantic_service(chunk_text, prompt_assistant)
-            
-            result_data = {
-                "type": text,
-                "data": input_text_all,
-                "chunk_index": chunk_index,
-                "original_chunk": chunk_text
-            }
-            all_texts.append(result_data)
+    if cache is not None and isinstance(result, dict):
+        cache.put(GENERATION_MODEL, prompt_name, prompt_assistant, chunk_text, result)
+    return result
 
-    count = 0
-    embedding_json = []
+def _run_bounded(function, jobs: list, max_in_flight: int = None) -> list:
+    """
+    Executa function para cada job em um pool de threads limitado a max_in_flight
+    chamadas simultâneas, devolvendo os resultados na ordem dos jobs.
+    """
+    if not jobs:
+        return []
     
-    for text_data in all_texts:
-        text_type = text_data["type"]
-        results = text_data["data"]
-        chunk_index = text_data["chunk_index"]
-        original_chunk = text_data["original_chunk"]
-        
-        type_count = 0
-        
-        if isinstance(results, dict):
-            for key, text_content in results.items():
-                if type_count >= index:
-                    break
-                    
-                text_embedding = embedding_service(text_content)
-                
-                embedding_data = {
-                    "id_text_origin": "",
-                    "type": text_type,
-                    "text": text_content,
-                    "embedding": text_embedding,
-                    "chunk_index": chunk_index,
-                    "original_chunk": original_chunk,
-                    "chunk_metadata": {
-                        "chunk_size": chunk_size,
-                        "chunk_overlap": overlap_size,
-                        "total_chunks": len(text_chunks)
-                    }
-                }
-                
-                embedding_json.append(embedding_data)
-                count += 1
-                type_count += 1
-
-    with open('embedding_temp.json', 'w', encoding='utf-8') as temp_file:
-        json.dump(embedding_json, temp_file, indent=2, ensure_ascii=False)
-
-    embedding_json_output = json.dumps(embedding_json, indent=2, ensure_ascii=False)    
-    return embedding_json_output
-
-def embedding_save_usecase(embedding_json: str):
+    max_workers = max(1, min(max_in_flight or GENERATION_MAX_IN_FLIGHT, len(jobs)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="semantic-generation") as executor:
+        return list(executor.map(function, jobs))
+
+def generate_semantic_texts(text_chunks: list, prompts: dict, max_in_flight: int = None) -> list:
     """
-    Save the original text and embeddings to the database.
+    Gera os textos de cada chunk para cada tipo de correlação de forma concorrente.
+    
+    As chamadas ao modelo são feitas em um pool de threads limitado a max_in_flight
+    requisições simultâneas; o resultado sai na ordem determinística chunk -> tipo.
+    
+    Args:
+        text_chunks: Lista de strings com os chunks de texto
+        prompts: Dicionário tipo de correlação -> prompt do assistente
+        max_in_flight: Máximo de chamadas simultâneas (default: GENERATION_MAX_IN_FLIGHT)
+    
+    Returns:
+        Lista de dicionários com type, data, chunk_index e original_chunk
     """
+    jobs = [
+        (chunk_index, chunk_text, text)
+        for chunk_index, chunk_text in enumerate(text_chunks)
+        for text in prompts
+    ]
     
-    type_mapping = {
-        "similaridade_semantica": CorrelationType.SIMILARIDADE_SEMANTICA,
-        "relacionamento_semantico": CorrelationType.RELACIONAMENTO_SEMANTICO,
-        "contexto_compartilhado": CorrelationType.CONTEXTO_COMPARTILHADO
-    }
+    generated = _run_bounded(
+        lambda job: generate_cached(job[1], job[2], prompts[job[2]]),
+        jobs,
+        max_in_flight
+    )
     
-    embedding_data = json.loads(embedding_json)
+    return [
+        {
+            "type": text,
+            "data": input_text_all,
+            "chunk_index": chunk_index,
+            "original_chunk": chunk_text
+        }
+        for (chunk_index, chunk_text, text), input_text_all in zip(jobs, generated)
+    ]
+
+def generate_semantic_texts_single_call(text_chunks: list, prompt_assistant: str, max_in_flight: int = None) -> list:
+    """
+    Gera os três tipos de correlação de cada chunk em uma única chamada ao modelo.
     
-    chunks_data = {}
-    for data in embedding_data:
-        chunk_index = data.get("chunk_index", 0)
-        if chunk_index not in chunks_data:
-            chunks_data[chunk_index] = {
-                "original_chunk": data.get("original_chunk", ""),
-                "embeddings": []
-            }
-        chunks_data[chunk_index]["embeddings"].append(data)
+    A resposta é um objeto JSON com as chaves similaridade_semantica,
+    relacionamento_semantico e contexto_compartilhado, que é distribuído nos
+    mesmos registros produzidos por generate_semantic_texts (ordem chunk -> tipo).
+    
+    Args:
+        text_chunks: Lista de strings com os chunks de texto
+        prompt_assistant: Prompt que pede os três conjuntos em um único JSON
+        max_in_flight: Máximo de chamadas simultâneas (default: GENERATION_MAX_IN_FLIGHT)
     
-    saved_ids = []
+    Returns:
+        Lista de dicionários com type, data, chunk_index e original_chunk
+    """
+    generated = _run_bounded(
+        lambda chunk_text: generate_cached(
+            chunk_text, SINGLE_CALL_PROMPT, prompt_assistant, response_format={"type": "json_object"}
+        ),
+        list(text_chunks),
+        max_in_flight
+    )
     
-    for chunk_index, chunk_info in chunks_data.items():
-        chunk_text = chunk_info["original_chunk"]
-        id_text_origin = save_original_text(chunk_text)
+    all_texts = []
+    for chunk_index, (chunk_text, response) in enumerate(zip(text_chunks, generated)):
+        all_texts.extend(fan_out_single_call(chunk_index, chunk_text, response))
+    return all_texts
+
+def fan_out_single_call(chunk_index: int, chunk_text: str, response) -> list:
+    """
+    Distribui a resposta JSON do modo single_call em um registro por tipo de correlação.
+    """
+    return [
+        {
+            "type": text,
+            "data": response.get(text) if isinstance(response, dict) else None,
+            "chunk_index": chunk_index,
+            "original_chunk": chunk_text
+        }
+        for text in TYPE_RELATIONSHIP
+    ]
+
+def embedding_usecase(input_text: str, index: int, chunk_size: int = 500, overlap_size: int = 100, max_in_flight: int = None, generation_mode: str = None, debug_dump_path: str = None):
+    """
+    Split the text, generate the semantic variants of each chunk and embed them.
+    
+    Returns:
+        EmbeddingBatch: Generated texts with their vectors as a float32 matrix
+    """
+    generation_mode = generation_mode or GENERATION_MODE
+    if generation_mode not in GENERATION_MODES:
+        raise ValueError(f"generation_mode must be one of {GENERATION_MODES}")
+    
+    with observe_stage("embedding", "chunking"):
+        text_chunks = split_into_chunks(input_text, chunk_size, overlap_size)
+    
+    with observe_stage("embedding", "generation"):
+        if generation_mode == "single_call":
+            prompt_assistant = load_prompts([SINGLE_CALL_PROMPT])[SINGLE_CALL_PROMPT]
+            all_texts = generate_semantic_texts_single_call(text_chunks, prompt_assistant, max_in_flight)
+        else:
+            all_texts = generate_semantic_texts(text_chunks, load_prompts(), max_in_flight)
+
+    # Coleta todos os textos gerados antes de chamar a API, para embedar em lotes
+    pending_texts = []
+    
+    for text_data in all_texts:
+        for text_content in select_generated_texts(text_data, index):
+            pending_texts.append((text_data, text_content))
+
+    with observe_stage("embedding", "embedding"):
+        text_embeddings = embedding_batch_service([text_content for _, text_content in pending_texts])
+
+    with observe_stage("embedding", "batch_build"):
+        records = [
+            EmbeddingRecord(text_data["type"], text_content, text_data["chunk_index"], row)
+            for row, (text_data, text_content) in enumerate(pending_texts)
+        ]
+        embedding_batch = EmbeddingBatch.build(
+            records,
+            text_embeddings,
+            dict(enumerate(text_chunks)),
+            chunk_size=chunk_size,
+            chunk_overlap=overlap_size,
+            total_chunks=len(text_chunks)
+        )
+
+    debug_dump_path = debug_dump_path or EMBEDDING_DEBUG_DUMP
+    if debug_dump_path:
+        embedding_batch.dump(debug_dump_path)
+
+    return embedding_batch
+
+def embedding_save_usecase(embedding_batch: EmbeddingBatch, write_mode: str = None):
+    """
+    Save the original text and embeddings to the database.
+    
+    Args:
+        embedding_batch (EmbeddingBatch): Batch returned by embedding_usecase
+            (a JSON string in the legacy embedding_temp.json format is also accepted)
+        write_mode (str): "orm", "insert" or "copy" (default: EMBEDDING_WRITE_MODE)
+    
+    Returns:
+        list: IDs of the saved original texts; all chunks are written in one transaction
+    """
+    write_mode = write_mode or EMBEDDING_WRITE_MODE
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode must be one of {WRITE_MODES}")
+    
+    with observe_stage("save", "prepare"):
+        if isinstance(embedding_batch, str):
+            embedding_batch = EmbeddingBatch.from_json(embedding_batch)
         
-        processed_embeddings = []
-        for data in chunk_info["embeddings"]:
-            text_content = data["text"]
-            
-            if "chunk_index" in data and "original_chunk" in data:
-                chunk_info_text = f"\n[Chunk {data['chunk_index']} de {data.get('chunk_metadata', {}).get('total_chunks', 'N/A')}]"
-                text_content = f"{text_content}{chunk_info_text}"
-            
-            processed_embedding = {
-                "correlation_type": type_mapping.get(data["type"], data["type"]),
-                "text_content": text_content,
-                "embedding": data["embedding"]
-            }
-            processed_embeddings.append(processed_embedding)
+        chunk_texts = []
+        chunk_embeddings = []
         
-        save_embedding_to_postgresql(id_text_origin, processed_embeddings)
-        saved_ids.append(id_text_origin)
+        for chunk_index, records in embedding_batch.group_by_chunk().items():
+            chunk_texts.append(embedding_batch.chunks.get(chunk_index, ""))
+            
+            processed_embeddings = [
+                build_processed_embedding(
+                    record.type, record.text, record.chunk_index, embedding_batch.total_chunks, embedding_batch.vector(record)
+                )
+                for record in records
+            ]
+            chunk_embeddings.append(processed_embeddings)
     
-    return saved_ids
+    with observe_stage("save", "db_write"):
+        return bulk_save_embeddings(chunk_texts, chunk_embeddings, write_mode)
 
-def embedding_search_usecase(question: str, top_k: int = 5):
+def embedding_search_usecase(question: str, top_k: int = 5, oversample: int = None, hits_per_origin: int = None,
+                             fields=None, mode: str = None, filters: dict = None):
     """
     Use case to search for embeddings based on a question.
     
     Args:
         question (str): The question to search for.
         top_k (int): The number of top results to return.
+        oversample (int): Candidates per result for the binary-quantized search with re-ranking
+            (0 disables it; default: BINARY_SEARCH_OVERSAMPLE).
+        hits_per_origin (int): Group results by origin text, keeping this many variants per origin.
+        fields (str | list): Fields to keep in each result (e.g. "text_content,distance").
+        mode (str): "vector" or "hybrid" (vector + full-text merged by reciprocal rank fusion).
+        filters (dict): Restrict results by correlation_type and/or origin_text_id.
     
     Returns:
-        list: List of tuples containing (distance, text_content, correlation_type, origin_text_data)
-              or None if error occurs
+        dict: {"results": [...], "origin_texts": {...}} or None if error occurs
     """
     try:
-        results = search_vetorial(question, top_k)
+        results = search_vetorial(question, top_k, oversample, hits_per_origin, fields, mode, filters)
         return results
     except Exception as e:
         result_error = f"Error in embedding search use case: {e}"
         return result_error
+
+
+async def embedding_search_usecase_async(question: str, top_k: int = 5, oversample: int = None,
+                                        hits_per_origin: int = None, fields=None, mode: str = None,
+                                        filters: dict = None):
+    """
+    Async variant of embedding_search_usecase, used by the API routes.
+    """
+    try:
+        results = await search_vetorial_async(question, top_k, oversample, hits_per_origin, fields, mode, filters)
+        return results
+    except Exception as e:
+        result_error = f"Error in embedding search use case: {e}"
+        return result_error
+
+
+def embedding_search_batch_usecase(questions: list, top_k: int = 5, fields=None):
+    """
+    Use case to search many questions in one request.
+    
+    Args:
+        questions (list): The questions to search for.
+        top_k (int): The number of top results per question.
+        fields (str | list): Fields to keep in each result.
+    
+    Returns:
+        dict: {"results": [...], "origin_texts": {...}} with one entry per question, in input order
+    """
+    try:
+        return search_batch(questions, top_k, fields)
+    except Exception as e:
+        result_error = f"Error in embedding search batch use case: {e}"
+        return result_error
+
+
+async def embedding_search_batch_usecase_async(questions: list, top_k: int = 5, fields=None):
+    """
+    Async variant of embedding_search_batch_usecase, used by the API routes.
+    """
+    try:
+        return await search_batch_async(questions, top_k, fields)
+    except Exception as e:
+        result_error = f"Error in embedding search batch use case: {e}"
+        return result_error
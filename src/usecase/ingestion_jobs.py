@@ -0,0 +1,150 @@
+from src.infrastructure.job_store import JobStore, get_job_store
+from src.usecase.ingestion_pipeline import embedding_pipeline_usecase
+from typing import Optional
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Quantos jobs de ingestão são processados em paralelo
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Intervalo máximo entre consultas à fila quando nenhum job novo é avisado
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+
+INGESTION_JOB = "embedding"
+
+
+class IngestionWorkerPool:
+    """
+    Pool de threads que consome os jobs de ingestão da fila persistida
+    """
+    def __init__(self, store: JobStore, workers: int = None, poll_interval: float = None):
+        self.store = store
+        self.workers = workers or JOB_WORKERS
+        self.poll_interval = poll_interval or JOB_POLL_INTERVAL
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        self.store.requeue_expired()
+        self._stop.clear()
+        for worker in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingestion-worker-{worker}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="ingestion-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"{self.workers} workers de ingestão iniciados")
+
+    def notify(self) -> None:
+        """
+        Acorda os workers após um novo job ser enfileirado
+        """
+        self._wake.set()
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Para de buscar novos jobs e aguarda os jobs em andamento.
+        Jobs não concluídos até o timeout voltam para a fila quando o lease expirar.
+        """
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job = self.store.claim_next()
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            run_ingestion_job(self.store, job)
+
+    def _heartbeat(self) -> None:
+        """
+        Renova o lease dos jobs deste processo e recupera os jobs de processos que pararam
+        """
+        interval = self.store.lease_seconds / 3
+        while not self._stop.wait(interval):
+            try:
+                self.store.renew_leases()
+                if self.store.requeue_expired():
+                    self._wake.set()
+            except Exception as e:
+                logger.error(f"Erro no heartbeat dos jobs de ingestão: {e}")
+
+
+def run_ingestion_job(store: JobStore, job: dict) -> None:
+    """
+    Executa um job de ingestão, registrando o progresso por chunk gravado
+    """
+    job_id = job["id"]
+    payload = job["payload"]
+
+    def report_progress(chunks_done: int, chunks_total: int, vectors_saved: int):
+        store.update_progress(job_id, chunks_done, chunks_total, vectors_saved)
+
+    try:
+        text_ids = embedding_pipeline_usecase(payload["text"], payload["index"], progress_callback=report_progress)
+        store.complete(job_id, text_ids)
+        logger.info(f"Job {job_id} concluído: {len(text_ids)} chunks gravados")
+    except Exception as e:
+        logger.error(f"Job {job_id} falhou: {e}")
+        store.fail(job_id, str(e))
+
+
+_worker_pool: Optional[IngestionWorkerPool] = None
+
+
+def start_ingestion_workers() -> IngestionWorkerPool:
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = IngestionWorkerPool(get_job_store())
+        _worker_pool.start()
+    return _worker_pool
+
+
+def stop_ingestion_workers() -> None:
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.stop()
+        _worker_pool = None
+
+
+def submit_ingestion_job(input_text: str, index: int) -> str:
+    """
+    Enfileira a ingestão de um texto e retorna o id do job
+    """
+    if not input_text or not input_text.strip():
+        raise ValueError("Input text cannot be empty")
+    job_id = get_job_store().create(INGESTION_JOB, {"text": input_text, "index": index})
+    if _worker_pool is not None:
+        _worker_pool.notify()
+    return job_id
+
+
+def get_ingestion_job(job_id: str) -> Optional[dict]:
+    """
+    Retorna o estado público de um job, ou None se o id não existir
+    """
+    job = get_job_store().get(job_id)
+    if job is None:
+        return None
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "chunks_total": job["chunks_total"],
+        "chunks_done": job["chunks_done"],
+        "vectors_saved": job["vectors_saved"],
+        "text_ids": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
@@ -0,0 +1,270 @@
+from src.service.embedding_service import (
+    EMBEDDING_BATCH_MAX_ITEMS,
+    WRITE_MODES,
+    PgVectorStore,
+    embedding_batch_service,
+    save_chunks_with_embeddings,
+    bulk_save_embeddings,
+    get_vector_store
+)
+from src.infrastructure.connection_postgresql import UnitOfWork
+from src.infrastructure.mmap_vector_index import notify_vector_index_sync
+from src.usecase.embedding_usecase import (
+    GENERATION_MAX_IN_FLIGHT,
+    GENERATION_MODE,
+    GENERATION_MODES,
+    EMBEDDING_WRITE_MODE,
+    SINGLE_CALL_PROMPT,
+    split_into_chunks,
+    load_prompts,
+    generate_cached,
+    fan_out_single_call,
+    select_generated_texts,
+    build_processed_embedding
+)
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from contextlib import nullcontext
+import threading
+import queue
+import os
+
+# Quantos chunks podem esperar entre um estágio e o próximo (backpressure)
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+_END = object()
+
+
+class _StageFailure:
+    """
+    Leva a exceção de um estágio até o consumidor final
+    """
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(outbound: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    Coloca o item na fila respeitando o limite; desiste se o pipeline foi interrompido
+    """
+    while not stop.is_set():
+        try:
+            outbound.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(inbound: queue.Queue, stop: threading.Event, block: bool = True):
+    """
+    Lê o próximo item da fila. Retorna _END no fim da fila ou se o pipeline foi interrompido,
+    None se block=False e a fila estiver vazia, e relança a falha de um estágio anterior.
+    """
+    while True:
+        try:
+            item = inbound.get(timeout=0.1) if block else inbound.get_nowait()
+        except queue.Empty:
+            if not block:
+                return None
+            if stop.is_set():
+                return _END
+            continue
+        if isinstance(item, _StageFailure):
+            raise item.error
+        return item
+
+
+def _iter_queue(inbound: queue.Queue, stop: threading.Event):
+    """
+    Consome a fila até o marcador de fim
+    """
+    while True:
+        item = _get(inbound, stop)
+        if item is _END:
+            return
+        yield item
+
+
+def _start_stage(name: str, items, outbound: queue.Queue, stop: threading.Event) -> threading.Thread:
+    """
+    Executa o iterável `items` em uma thread, publicando cada resultado em `outbound`
+    """
+    def run():
+        try:
+            for item in items:
+                if not _put(outbound, item, stop):
+                    return
+        except BaseException as e:
+            _put(outbound, _StageFailure(e), stop)
+        finally:
+            # Fecha o gerador para liberar seus recursos (ex.: pool de threads) ao interromper
+            items.close()
+            _put(outbound, _END, stop)
+
+    thread = threading.Thread(target=run, name=f"ingestion-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def iter_generated_chunks(text_chunks: list, generation_mode: str, max_in_flight: int = None):
+    """
+    Estágio de geração: produz (chunk_index, chunk_text, all_texts) na ordem dos chunks.
+
+    As chamadas ao modelo rodam em um pool limitado a max_in_flight; novos chunks só são
+    enviados enquanto houver no máximo max_in_flight chamadas pendentes, então a geração
+    nunca se adianta demais em relação aos estágios seguintes.
+    """
+    max_in_flight = max_in_flight or GENERATION_MAX_IN_FLIGHT
+    if generation_mode == "single_call":
+        prompt_assistant = load_prompts([SINGLE_CALL_PROMPT])[SINGLE_CALL_PROMPT]
+    else:
+        prompts = load_prompts()
+
+    def submit(executor, chunk_index, chunk_text):
+        if generation_mode == "single_call":
+            return [executor.submit(
+                generate_cached, chunk_text, SINGLE_CALL_PROMPT, prompt_assistant,
+                response_format={"type": "json_object"}
+            )]
+        return [executor.submit(generate_cached, chunk_text, text, prompts[text]) for text in prompts]
+
+    def collect(chunk_index, chunk_text, futures):
+        if generation_mode == "single_call":
+            return fan_out_single_call(chunk_index, chunk_text, futures[0].result())
+        return [
+            {"type": text, "data": future.result(), "chunk_index": chunk_index, "original_chunk": chunk_text}
+            for text, future in zip(prompts, futures)
+        ]
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="semantic-generation")
+    try:
+        pending = deque()
+        pending_calls = 0
+        for chunk_index, chunk_text in enumerate(text_chunks):
+            futures = submit(executor, chunk_index, chunk_text)
+            pending.append((chunk_index, chunk_text, futures))
+            pending_calls += len(futures)
+            while pending and pending_calls >= max_in_flight:
+                chunk_index_done, chunk_text_done, futures_done = pending.popleft()
+                pending_calls -= len(futures_done)
+                yield chunk_index_done, chunk_text_done, collect(chunk_index_done, chunk_text_done, futures_done)
+        while pending:
+            chunk_index_done, chunk_text_done, futures_done = pending.popleft()
+            yield chunk_index_done, chunk_text_done, collect(chunk_index_done, chunk_text_done, futures_done)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_embedded_chunks(generated_chunks: queue.Queue, stop: threading.Event, index: int, total_chunks: int,
+                         max_batch_size: int = None):
+    """
+    Estágio de embedding: para cada chunk gerado produz (chunk_text, processed_embeddings).
+
+    Chunks que já estão esperando na fila são agrupados em uma única chamada de embeddings
+    (até max_batch_size textos), sem esperar por chunks que ainda não foram gerados.
+    """
+    max_batch_size = max_batch_size or EMBEDDING_BATCH_MAX_ITEMS
+    finished = False
+    while not finished:
+        first = _get(generated_chunks, stop)
+        if first is _END:
+            return
+        group = [first]
+        group_texts = len(first[2]) * index
+        while group_texts < max_batch_size:
+            item = _get(generated_chunks, stop, block=False)
+            if item is None:
+                break
+            if item is _END:
+                finished = True
+                break
+            group.append(item)
+            group_texts += len(item[2]) * index
+
+        pending = []
+        for chunk_index, chunk_text, all_texts in group:
+            for text_data in all_texts:
+                for text_content in select_generated_texts(text_data, index):
+                    pending.append((chunk_index, text_data["type"], text_content))
+
+        embeddings = embedding_batch_service([text_content for _, _, text_content in pending])
+
+        by_chunk = {chunk_index: [] for chunk_index, _, _ in group}
+        for (chunk_index, text_type, text_content), embedding in zip(pending, embeddings):
+            by_chunk[chunk_index].append(
+                build_processed_embedding(text_type, text_content, chunk_index, total_chunks, embedding)
+            )
+        for chunk_index, chunk_text, _ in group:
+            yield chunk_text, by_chunk[chunk_index]
+
+
+def embedding_pipeline_usecase(input_text: str, index: int, chunk_size: int = 500, overlap_size: int = 100,
+                               max_in_flight: int = None, generation_mode: str = None, write_mode: str = None,
+                               queue_size: int = None, progress_callback=None) -> list:
+    """
+    Ingest a text as a streaming pipeline: split -> generate -> embed -> persist.
+
+    Each stage runs concurrently and hands chunks to the next one through bounded queues,
+    so chunk N is written to the database while chunk N+1 is being embedded and the next
+    chunks are being generated. Only a few chunks are held in memory at any time, whatever
+    the document size. All writes share one unit of work: the request is saved entirely
+    or not at all.
+
+    Args:
+        input_text (str): Text to ingest
+        index (int): Maximum number of generated texts per correlation type
+        chunk_size (int): Chunk size in characters
+        overlap_size (int): Overlap between chunks in characters
+        max_in_flight (int): Maximum concurrent generation calls
+        generation_mode (str): "per_type" or "single_call" (default: GENERATION_MODE)
+        write_mode (str): "orm", "insert" or "copy" (default: EMBEDDING_WRITE_MODE)
+        queue_size (int): Chunks buffered between stages (default: PIPELINE_QUEUE_SIZE)
+        progress_callback: Optional callable(chunks_done, total_chunks, vectors_saved),
+            called after each chunk is written
+
+    Returns:
+        list: IDs of the saved original texts, in chunk order
+    """
+    generation_mode = generation_mode or GENERATION_MODE
+    if generation_mode not in GENERATION_MODES:
+        raise ValueError(f"generation_mode must be one of {GENERATION_MODES}")
+    write_mode = write_mode or EMBEDDING_WRITE_MODE
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode must be one of {WRITE_MODES}")
+    queue_size = queue_size or PIPELINE_QUEUE_SIZE
+
+    text_chunks = split_into_chunks(input_text, chunk_size, overlap_size)
+
+    stop = threading.Event()
+    generated_chunks = queue.Queue(maxsize=queue_size)
+    embedded_chunks = queue.Queue(maxsize=queue_size)
+    threads = [
+        _start_stage("generate", iter_generated_chunks(text_chunks, generation_mode, max_in_flight), generated_chunks, stop),
+        _start_stage("embed", iter_embedded_chunks(generated_chunks, stop, index, len(text_chunks)), embedded_chunks, stop),
+    ]
+
+    saved_ids = []
+    vectors_saved = 0
+    # Outros backends de VectorStore (ex.: numpy) não têm transação: cada chunk é gravado direto
+    transactional = isinstance(get_vector_store(), PgVectorStore)
+    try:
+        with UnitOfWork() if transactional else nullcontext() as uow:
+            for chunk_text, processed_embeddings in _iter_queue(embedded_chunks, stop):
+                if uow is not None:
+                    chunk_ids = save_chunks_with_embeddings(uow.session, [chunk_text], [processed_embeddings], write_mode)
+                else:
+                    chunk_ids = bulk_save_embeddings([chunk_text], [processed_embeddings], write_mode)
+                saved_ids.extend(chunk_ids)
+                vectors_saved += len(processed_embeddings)
+                if progress_callback:
+                    progress_callback(len(saved_ids), len(text_chunks), vectors_saved)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    notify_vector_index_sync()
+    return saved_ids
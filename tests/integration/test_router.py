@@ -1,48 +1,124 @@
 import pytest
 from fastapi.testclient import TestClient
 from src.main import app  # Assuming your FastAPI app is in src/main.py
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 
 client = TestClient(app)
 
-@patch('src.controller.api.router.embedding_usecase')
-@patch('src.controller.api.router.embedding_save_usecase')
-def test_create_embedding_success(mock_embedding_save_usecase, mock_embedding_usecase):
-    # Mock the use cases
-    mock_embedding_usecase.return_value = "mocked_embedding"
-    mock_embedding_save_usecase.return_value = ["id1", "id2"]
+@patch('src.controller.api.router.submit_ingestion_job')
+def test_create_embedding_success(mock_submit_ingestion_job):
+    # Mock the use case
+    mock_submit_ingestion_job.return_value = "job-1"
 
     response = client.post("/new_rag/embedding", json={"text": "some text", "index": 2})
     
-    assert response.status_code == 200
+    assert response.status_code == 202
     assert response.json() == {
-        "message": "Embedding created successfully",
-        "text_ids": ["id1", "id2"],
-        "total_chunks": 2,
+        "message": "Embedding job queued",
+        "job_id": "job-1",
+        "status_url": "/new_rag/jobs/job-1",
     }
-    mock_embedding_usecase.assert_called_once_with("some text", 2)
-    mock_embedding_save_usecase.assert_called_once_with("mocked_embedding")
+    mock_submit_ingestion_job.assert_called_once_with("some text", 2)
 
-@patch('src.controller.api.router.embedding_usecase')
-def test_create_embedding_value_error(mock_embedding_usecase):
-    mock_embedding_usecase.side_effect = ValueError("Test error")
+@patch('src.controller.api.router.submit_ingestion_job')
+def test_create_embedding_value_error(mock_submit_ingestion_job):
+    mock_submit_ingestion_job.side_effect = ValueError("Test error")
 
     response = client.post("/new_rag/embedding", json={"text": "some text", "index": 2})
 
     assert response.status_code == 400
     assert "Invalid input: Test error" in response.json()["detail"]
 
-@patch('src.controller.api.router.embedding_search_usecase')
+@patch('src.controller.api.router.get_ingestion_job')
+def test_get_job_success(mock_get_ingestion_job):
+    mock_get_ingestion_job.return_value = {"job_id": "job-1", "status": "running", "chunks_done": 3}
+
+    response = client.get("/new_rag/jobs/job-1")
+
+    assert response.status_code == 200
+    assert response.json()["chunks_done"] == 3
+    mock_get_ingestion_job.assert_called_once_with("job-1")
+
+@patch('src.controller.api.router.get_ingestion_job')
+def test_get_job_not_found(mock_get_ingestion_job):
+    mock_get_ingestion_job.return_value = None
+
+    response = client.get("/new_rag/jobs/missing")
+
+    assert response.status_code == 404
+
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
 def test_search_embedding_success(mock_embedding_search_usecase):
-    mock_embedding_search_usecase.return_value = [{"text": "result1"}, {"text": "result2"}]
+    mock_embedding_search_usecase.return_value = {
+        "results": [{"origin_text_id": 1}, {"origin_text_id": 1}],
+        "origin_texts": {1: "origin"}
+    }
 
     response = client.get("/new_rag/search_vetorial?question=my_question&top_k=2")
 
     assert response.status_code == 200
-    assert response.json() == {"results": [{"text": "result1"}, {"text": "result2"}]}
-    mock_embedding_search_usecase.assert_called_once_with("my_question", 2)
+    assert response.json() == {
+        "results": [{"origin_text_id": 1}, {"origin_text_id": 1}],
+        "origin_texts": {"1": "origin"}
+    }
+    mock_embedding_search_usecase.assert_called_once_with("my_question", 2, None, None, None, None, None)
+
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
+def test_search_embedding_with_oversample(mock_embedding_search_usecase):
+    mock_embedding_search_usecase.return_value = {"results": [], "origin_texts": {}}
+
+    response = client.get("/new_rag/search_vetorial?question=my_question&top_k=2&oversample=8")
+
+    assert response.status_code == 200
+    mock_embedding_search_usecase.assert_called_once_with("my_question", 2, 8, None, None, None, None)
+
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
+def test_search_embedding_grouped_by_origin(mock_embedding_search_usecase):
+    mock_embedding_search_usecase.return_value = {"results": [{"origin_text_id": 1, "hits": []}]}
+
+    response = client.get("/new_rag/search_vetorial?question=my_question&top_k=3&hits_per_origin=2")
+
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"origin_text_id": 1, "hits": []}]}
+    mock_embedding_search_usecase.assert_called_once_with("my_question", 3, None, 2, None, None, None)
+
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
+def test_search_embedding_hybrid_mode(mock_embedding_search_usecase):
+    mock_embedding_search_usecase.return_value = {"results": [], "origin_texts": {}}
+
+    response = client.get("/new_rag/search_vetorial?question=ABC-123&top_k=3&mode=hybrid")
+
+    assert response.status_code == 200
+    mock_embedding_search_usecase.assert_called_once_with("ABC-123", 3, None, None, None, "hybrid", None)
+
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
+def test_search_embedding_correlation_type_filter(mock_embedding_search_usecase):
+    mock_embedding_search_usecase.return_value = {"results": [], "origin_texts": {}}
+
+    response = client.get("/new_rag/search_vetorial", params={
+        "question": "q", "top_k": 3, "correlation_type": "Similaridade semântica,Contexto Compartilhado"
+    })
+
+    assert response.status_code == 200
+    mock_embedding_search_usecase.assert_called_once_with(
+        "q", 3, None, None, None, None, {"correlation_type": ["Similaridade semântica", "Contexto Compartilhado"]}
+    )
+
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
+def test_search_embedding_fields_and_gzip(mock_embedding_search_usecase):
+    mock_embedding_search_usecase.return_value = {"results": [{"text_content": "x" * 50}] * 100}
+
+    response = client.get(
+        "/new_rag/search_vetorial?question=my_question&top_k=100&fields=text_content",
+        headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["results"]) == 100
+    mock_embedding_search_usecase.assert_called_once_with("my_question", 100, None, None, "text_content", None, None)
 
-@patch('src.controller.api.router.embedding_search_usecase')
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
 def test_search_embedding_http_exception(mock_embedding_search_usecase):
     mock_embedding_search_usecase.return_value = "Internal server error occurred."
 
@@ -51,7 +127,7 @@ def test_search_embedding_http_exception(mock_embedding_search_usecase):
     assert response.status_code == 500
     assert "Internal server error occurred." in response.json()["detail"]
 
-@patch('src.controller.api.router.embedding_search_usecase')
+@patch('src.controller.api.router.embedding_search_usecase_async', new_callable=AsyncMock)
 def test_search_embedding_exception(mock_embedding_search_usecase):
     mock_embedding_search_usecase.side_effect = Exception("Generic error")
 
@@ -59,3 +135,25 @@ def test_search_embedding_exception(mock_embedding_search_usecase):
 
     assert response.status_code == 500
     assert "Error in search: Generic error" in response.json()["detail"]
+
+@patch('src.controller.api.router.embedding_search_batch_usecase_async', new_callable=AsyncMock)
+def test_search_batch_success(mock_search_batch_usecase):
+    mock_search_batch_usecase.return_value = {
+        "results": [{"question": "q1", "results": []}, {"question": "q2", "results": []}],
+        "origin_texts": {}
+    }
+
+    response = client.post("/new_rag/search_batch", json={"questions": ["q1", "q2"], "top_k": 3})
+
+    assert response.status_code == 200
+    assert [item["question"] for item in response.json()["results"]] == ["q1", "q2"]
+    mock_search_batch_usecase.assert_called_once_with(["q1", "q2"], 3, None)
+
+@patch('src.controller.api.router.embedding_search_batch_usecase_async', new_callable=AsyncMock)
+def test_search_batch_error(mock_search_batch_usecase):
+    mock_search_batch_usecase.return_value = "Error in embedding search batch use case: questions must be a non-empty list"
+
+    response = client.post("/new_rag/search_batch", json={"questions": []})
+
+    assert response.status_code == 500
+    assert "questions must be a non-empty list" in response.json()["detail"]
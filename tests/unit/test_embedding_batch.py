@@ -0,0 +1,58 @@
+import json
+import numpy as np
+from src.models import EmbeddingBatch, EmbeddingRecord
+
+
+def _batch():
+    records = [
+        EmbeddingRecord("similaridade_semantica", "a", 0, 0),
+        EmbeddingRecord("contexto_compartilhado", "b", 1, 1),
+        EmbeddingRecord("relacionamento_semantico", "c", 0, 2),
+    ]
+    return EmbeddingBatch.build(
+        records,
+        [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]],
+        {0: "chunk 0", 1: "chunk 1"},
+        chunk_size=500,
+        chunk_overlap=100,
+        total_chunks=2
+    )
+
+
+class TestEmbeddingBatch:
+    """Test cases for the in-process embedding batch"""
+
+    def test_vectors_are_contiguous_float32(self):
+        batch = _batch()
+
+        assert batch.vectors.dtype == np.float32
+        assert batch.vectors.flags['C_CONTIGUOUS']
+        assert batch.vectors.shape == (3, 2)
+        np.testing.assert_allclose(batch.vector(batch.records[1]), [0.3, 0.4])
+
+    def test_records_are_slotted(self):
+        record = EmbeddingRecord("t", "x", 0, 0)
+        assert not hasattr(record, '__dict__')
+
+    def test_group_by_chunk_preserves_order(self):
+        groups = _batch().group_by_chunk()
+
+        assert list(groups) == [0, 1]
+        assert [record.text for record in groups[0]] == ["a", "c"]
+
+    def test_json_round_trip(self):
+        batch = _batch()
+
+        restored = EmbeddingBatch.from_json(batch.to_json())
+
+        assert len(restored) == 3
+        assert restored.chunks == batch.chunks
+        assert restored.total_chunks == 2
+        np.testing.assert_allclose(restored.vectors, batch.vectors)
+        assert json.loads(batch.to_json())[0]["original_chunk"] == "chunk 0"
+
+    def test_empty_batch(self):
+        batch = EmbeddingBatch.build([], [], {})
+
+        assert len(batch) == 0
+        assert batch.group_by_chunk() == {}
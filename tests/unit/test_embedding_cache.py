@@ -0,0 +1,117 @@
+import os
+import pytest
+from unittest.mock import patch
+
+import src.infrastructure.embedding_cache as embedding_cache_module
+from src.infrastructure.embedding_cache import (
+    LRUCache,
+    EmbeddingCache,
+    pack_vector,
+    unpack_vector,
+    get_embedding_cache
+)
+
+
+class TestLRUCache:
+    """Test cases for the in-memory LRU tier"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_ttl_expiration(self):
+        cache = LRUCache(max_entries=10, ttl_seconds=60)
+        cache.put("a", 1, stored_at=0)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestEmbeddingCache:
+    """Test cases for the content-addressed embedding cache"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_size=2)
+        yield cache
+        cache.close()
+
+    def test_pack_unpack_float32(self):
+        assert unpack_vector(pack_vector([0.5, -1.25, 2.0])) == [0.5, -1.25, 2.0]
+        assert len(pack_vector([0.0] * 3072)) == 3072 * 4
+
+    def test_key_depends_on_model_dimensions_and_text(self):
+        key = EmbeddingCache.make_key("model", 3072, "text")
+        assert key == EmbeddingCache.make_key("model", 3072, "text")
+        assert key != EmbeddingCache.make_key("model", 1024, "text")
+        assert key != EmbeddingCache.make_key("other", 3072, "text")
+        assert key != EmbeddingCache.make_key("model", 3072, "text ")
+
+    def test_miss_then_hit_with_counters(self, cache):
+        assert cache.get("model", 3, "hello") is None
+        cache.put("model", 3, "hello", [0.5, 0.25, 1.0])
+
+        assert cache.get("model", 3, "hello") == [0.5, 0.25, 1.0]
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["disk_entries"] == 1
+
+    def test_disk_tier_survives_memory_eviction_and_reopen(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = EmbeddingCache(path, memory_size=1)
+        cache.put_many("model", 1, ["a", "b"], [[1.0], [2.0]])
+
+        assert cache.get("model", 1, "a") == [1.0]
+        assert cache.stats()["disk_hits"] == 1
+        cache.close()
+
+        reopened = EmbeddingCache(path, memory_size=1)
+        assert reopened.get_many("model", 1, ["b", "c", "a"]) == [[2.0], None, [1.0]]
+        reopened.close()
+
+    def test_ttl_expiration_on_disk(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_size=0, ttl_seconds=60)
+        with patch('src.infrastructure.embedding_cache.time.time', return_value=0):
+            cache.put("model", 1, "old", [1.0])
+
+        assert cache.get("model", 1, "old") is None
+        assert cache.stats()["disk_entries"] == 0
+        cache.close()
+
+    def test_size_eviction_keeps_most_recent(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_size=0, max_entries=2)
+        with patch('src.infrastructure.embedding_cache.time.time', side_effect=[1, 2, 3, 4]):
+            cache.put("model", 1, "a", [1.0])
+            cache.put("model", 1, "b", [2.0])
+            cache.put("model", 1, "c", [3.0])
+            cache.evict()
+
+        assert cache.get_many("model", 1, ["a", "b", "c"]) == [None, [2.0], [3.0]]
+        cache.close()
+
+
+class TestGetEmbeddingCache:
+    """Test cases for the process-wide cache accessor"""
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('EMBEDDING_CACHE_ENABLED', None)
+            assert get_embedding_cache() is None
+
+    def test_enabled_returns_singleton(self, tmp_path):
+        embedding_cache_module._embedding_cache = None
+        env = {'EMBEDDING_CACHE_ENABLED': 'true', 'EMBEDDING_CACHE_PATH': str(tmp_path / "cache.db")}
+        with patch.dict(os.environ, env):
+            cache = get_embedding_cache()
+            assert cache is get_embedding_cache()
+        cache.close()
+        embedding_cache_module._embedding_cache = None
@@ -1,12 +1,27 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from src.service.embedding_service import (
     generate_text_semantic_service,
     embedding_service,
+    embedding_batch_service,
+    _pack_embedding_batches,
     save_original_text,
     save_embedding_to_postgresql,
-    search_vetorial
+    search_vetorial,
+    search_vetorial_async,
+    search_by_vector,
+    SEARCH_VETORIAL_QUERY,
+    SEARCH_BINARY_RERANK_QUERY,
+    embedding_service_async,
+    insert_original_texts,
+    insert_embeddings,
+    bulk_save_embeddings,
+    save_chunks_with_embeddings
 )
+from src.service.embedding_service import query_embedding_service, query_embedding_service_async
+from src.service.embedding_service import search_batch, search_by_vectors
+from src.infrastructure.query_cache import QueryEmbeddingCache
 from src.models.database_models import DbOriginText, DbCorrelationEmbedding
 import json
 
@@ -29,6 +44,17 @@ def test_generate_text_semantic_service_json_error(mock_client):
     response = generate_text_semantic_service("test input", "test prompt")
     assert response is None
 
+@patch('src.service.embedding_service.client')
+def test_generate_text_semantic_service_json_mode(mock_client):
+    mock_completion = MagicMock()
+    mock_completion.choices[0].message.content = '{"similaridade_semantica": {"result_1": "a"}}'
+    mock_client.chat.completions.create.return_value = mock_completion
+
+    response = generate_text_semantic_service("test input", "test prompt", response_format={"type": "json_object"})
+
+    assert response == {"similaridade_semantica": {"result_1": "a"}}
+    assert mock_client.chat.completions.create.call_args.kwargs["response_format"] == {"type": "json_object"}
+
 @patch('src.service.embedding_service.client')
 def test_embedding_service_success(mock_client):
     mock_embedding = MagicMock()
@@ -42,6 +68,78 @@ def test_embedding_service_empty_input():
     with pytest.raises(ValueError, match="Input text cannot be empty"):
         embedding_service("")
 
+def _embedding_response(vectors, start=0):
+    response = MagicMock()
+    response.data = [MagicMock(index=start + i, embedding=v) for i, v in enumerate(vectors)]
+    return response
+
+def test_pack_embedding_batches_respects_item_and_token_limits():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 400, "e"]
+    # ~11 tokens cada texto curto, ~101 o longo
+    assert _pack_embedding_batches(texts, 2, 1000) == [texts[0:2], texts[2:4], texts[4:5]]
+    assert _pack_embedding_batches(texts, 10, 30) == [texts[0:2], texts[2:3], texts[3:4], texts[4:5]]
+
+@patch('src.service.embedding_service.client')
+def test_embedding_batch_service_preserves_order(mock_client):
+    response = MagicMock()
+    # A API pode devolver os itens fora de ordem; o campo index define a posição
+    response.data = [MagicMock(index=1, embedding=[0.2]), MagicMock(index=0, embedding=[0.1])]
+    mock_client.embeddings.create.return_value = response
+
+    assert embedding_batch_service(["first", "second"]) == [[0.1], [0.2]]
+    mock_client.embeddings.create.assert_called_once_with(
+        model="text-embedding-3-large", input=["first", "second"]
+    )
+
+@patch('src.service.embedding_service.client')
+def test_embedding_batch_service_uses_multiple_batches(mock_client):
+    mock_client.embeddings.create.side_effect = lambda model, input: _embedding_response([[float(len(t))] for t in input])
+
+    result = embedding_batch_service(["a", "bb", "ccc"], max_batch_size=2)
+
+    assert result == [[1.0], [2.0], [3.0]]
+    assert mock_client.embeddings.create.call_count == 2
+
+@patch('src.service.embedding_service.client')
+def test_embedding_batch_service_splits_incomplete_batch(mock_client):
+    def create(model, input):
+        if len(input) > 1:
+            return _embedding_response([[0.0]])  # resposta parcial
+        return _embedding_response([[float(len(input[0]))]])
+    mock_client.embeddings.create.side_effect = create
+
+    assert embedding_batch_service(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+
+@patch('src.service.embedding_service.get_embedding_cache')
+@patch('src.service.embedding_service.client')
+def test_embedding_batch_service_only_embeds_cache_misses(mock_client, mock_get_embedding_cache):
+    mock_cache = MagicMock()
+    mock_cache.get_many.return_value = [[9.0], None, None]
+    mock_get_embedding_cache.return_value = mock_cache
+    mock_client.embeddings.create.return_value = _embedding_response([[1.0]])
+
+    result = embedding_batch_service(["cached", "new", "new"])
+
+    assert result == [[9.0], [1.0], [1.0]]
+    # Textos repetidos são enviados uma única vez
+    mock_client.embeddings.create.assert_called_once_with(model="text-embedding-3-large", input=["new"])
+    mock_cache.put_many.assert_called_once_with("text-embedding-3-large", 3072, ["new"], [[1.0]])
+
+@patch('src.service.embedding_service.get_embedding_cache')
+@patch('src.service.embedding_service.client')
+def test_embedding_service_cache_hit_skips_api(mock_client, mock_get_embedding_cache):
+    mock_cache = MagicMock()
+    mock_cache.get.return_value = [0.5]
+    mock_get_embedding_cache.return_value = mock_cache
+
+    assert embedding_service("question") == [0.5]
+    mock_client.embeddings.create.assert_not_called()
+
+def test_embedding_batch_service_empty_input():
+    assert embedding_batch_service([]) == []
+    with pytest.raises(ValueError, match="Input text cannot be empty"):
+        embedding_batch_service(["ok", " "])
+
 @patch('src.service.embedding_service.get_db_session')
 def test_save_original_text(mock_get_db_session):
     mock_session = MagicMock()
@@ -89,6 +187,146 @@ def test_search_vetorial_invalid_top_k():
     with pytest.raises(ValueError, match="top_k cannot exceed 1000"):
         search_vetorial("question", 1001)
 
+@patch.dict('src.service.embedding_service.EMBEDDING_REQUEST_OPTIONS', {"dimensions": 1024})
+@patch('src.service.embedding_service.get_embedding_cache', return_value=None)
+@patch('src.service.embedding_service.client')
+def test_embedding_batch_service_requests_reduced_dimensions(mock_client, mock_cache):
+    mock_client.embeddings.create.return_value = _embedding_response([[1.0], [2.0]])
+
+    embedding_batch_service(["a", "b"])
+
+    mock_client.embeddings.create.assert_called_once_with(
+        model="text-embedding-3-large", input=["a", "b"], dimensions=1024
+    )
+
+@patch('src.service.embedding_service.get_embedding_cache', return_value=None)
+@patch('src.service.embedding_service.async_client')
+def test_embedding_service_async(mock_async_client, mock_cache):
+    mock_response = MagicMock()
+    mock_response.data[0].embedding = [0.1, 0.2]
+    mock_async_client.embeddings.create = AsyncMock(return_value=mock_response)
+
+    assert asyncio.run(embedding_service_async("question")) == [0.1, 0.2]
+    with pytest.raises(ValueError, match="Input text cannot be empty"):
+        asyncio.run(embedding_service_async("  "))
+
+@patch('src.service.embedding_service.query_embedding_service_async', new_callable=AsyncMock)
+@patch('src.service.embedding_service.get_async_db_session')
+def test_search_vetorial_async_success(mock_get_async_db_session, mock_embedding_service_async):
+    mock_embedding_service_async.return_value = [0.1, 0.2, 0.3]
+    mock_session = MagicMock()
+    search_result, origin_result = MagicMock(), MagicMock()
+    search_result.fetchall.return_value = [(0.123, 'text', 'type', 7, 3), (0.2, 'text 2', 'type', 8, 3)]
+    origin_result.fetchall.return_value = [(3, 'origin')]
+    mock_session.execute = AsyncMock(side_effect=[search_result, origin_result])
+    mock_get_async_db_session.return_value.__aenter__.return_value = mock_session
+
+    response = asyncio.run(search_vetorial_async("question", 5))
+
+    assert response['results'][0] == {
+        'distance': 0.123,
+        'text_content': 'text',
+        'correlation_type': 'type',
+        'embedding_id': 7,
+        'origin_text_id': 3
+    }
+    assert response['origin_texts'] == {3: 'origin'}
+    params = mock_session.execute.call_args_list[0][0][1]
+    assert params == {'question_vector': '[0.1,0.2,0.3]', 'limit_count': 5}
+    # Um único SELECT para os textos de origem distintos
+    assert mock_session.execute.await_count == 2
+
+@patch('src.service.embedding_service.query_embedding_service')
+@patch('src.service.embedding_service.get_db_session')
+def test_search_vetorial_fields_projection_skips_origin_texts(mock_get_db_session, mock_query_embedding):
+    mock_query_embedding.return_value = [0.1]
+    mock_session = MagicMock()
+    mock_get_db_session.return_value.__enter__.return_value = mock_session
+    mock_session.execute.return_value.fetchall.return_value = [(0.5, 'text', 'type', 7, 3)]
+
+    response = search_vetorial("question", 5, fields="text_content, distance")
+
+    assert response == {'results': [{'distance': 0.5, 'text_content': 'text'}]}
+    mock_session.execute.assert_called_once()
+
+def test_search_vetorial_invalid_fields():
+    with pytest.raises(ValueError, match="Unknown fields: origin_text_data"):
+        search_vetorial("question", 5, fields="distance,origin_text_data")
+    with pytest.raises(ValueError, match="fields cannot be empty"):
+        search_vetorial("question", 5, fields=" , ")
+
+@patch('src.service.embedding_service.embedding_service')
+def test_query_embedding_service_uses_normalized_question_cache(mock_embedding_service):
+    mock_embedding_service.return_value = [0.5]
+    with patch('src.service.embedding_service.get_query_cache', return_value=QueryEmbeddingCache()):
+        assert query_embedding_service("  O que é IA? ") == [0.5]
+        assert query_embedding_service("o que É  ia?") == [0.5]
+
+    mock_embedding_service.assert_called_once_with("o que é ia?")
+
+def test_query_embedding_service_async_coalesces_identical_questions():
+    calls = []
+
+    async def fake_embedding(question):
+        calls.append(question)
+        await asyncio.sleep(0.01)
+        return [0.25]
+
+    async def run():
+        return await asyncio.gather(*(query_embedding_service_async("Question") for _ in range(5)))
+
+    with patch('src.service.embedding_service.embedding_service_async', side_effect=fake_embedding), \
+         patch('src.service.embedding_service.get_query_cache', return_value=QueryEmbeddingCache()):
+        results = asyncio.run(run())
+
+    assert results == [[0.25]] * 5
+    assert calls == ["question"]
+
+def test_search_by_vector_direct():
+    mock_session = MagicMock()
+    mock_session.execute.return_value.fetchall.return_value = []
+
+    search_by_vector(mock_session, [0.5, 0.25], 5, oversample=0)
+
+    mock_session.execute.assert_called_once_with(
+        SEARCH_VETORIAL_QUERY, {'question_vector': '[0.5,0.25]', 'limit_count': 5}
+    )
+
+def test_search_by_vector_binary_rerank():
+    mock_session = MagicMock()
+    mock_session.execute.return_value.fetchall.return_value = [(0.1, 'text', 'type', 7, 3)]
+
+    results = search_by_vector(mock_session, [0.5, 0.25], 5, oversample=10)
+
+    assert results[0]['embedding_id'] == 7
+    set_ef_search, rerank = mock_session.execute.call_args_list
+    assert set_ef_search[0][1] == {'ef_search': '50'}
+    assert rerank[0][0] is SEARCH_BINARY_RERANK_QUERY
+    assert rerank[0][1]['candidate_count'] == 50
+    assert rerank[0][1]['limit_count'] == 5
+    assert "<~>" in str(SEARCH_BINARY_RERANK_QUERY)
+
+def test_search_by_vector_caps_ef_search():
+    mock_session = MagicMock()
+    mock_session.execute.return_value.fetchall.return_value = []
+
+    search_by_vector(mock_session, [0.5], 2, oversample=2)
+    assert mock_session.execute.call_args_list[0][0][1] == {'ef_search': '40'}
+
+    mock_session.reset_mock()
+    search_by_vector(mock_session, [0.5], 500, oversample=10)
+    assert mock_session.execute.call_args_list[0][0][1] == {'ef_search': '1000'}
+
+def test_search_vetorial_invalid_oversample():
+    with pytest.raises(ValueError, match="oversample must be a non-negative integer"):
+        search_vetorial("question", 5, oversample=-1)
+
+def test_search_vetorial_async_invalid_params():
+    with pytest.raises(ValueError, match="Question cannot be empty"):
+        asyncio.run(search_vetorial_async("", 5))
+    with pytest.raises(ValueError, match="top_k cannot exceed 1000"):
+        asyncio.run(search_vetorial_async("question", 1001))
+
 # Additional test cases for better coverage
 @patch('src.service.embedding_service.client')
 def test_generate_text_semantic_service_exception(mock_client):
@@ -205,4 +443,404 @@ def test_search_vetorial_no_results(mock_get_db_session, mock_embedding_service)
     mock_session.execute.return_value.fetchall.return_value = []
 
     results = search_vetorial("question", 5)
-    assert results == []
+    assert results == {'results': [], 'origin_texts': {}}
+    mock_session.execute.assert_called_once()
+
+@pytest.fixture
+def sqlite_session():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Base
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def test_insert_original_texts_returns_ids_in_order(sqlite_session):
+    ids = insert_original_texts(sqlite_session, ["a", "b", "c"])
+
+    assert len(ids) == 3
+    stored = {row.id: row.data for row in sqlite_session.query(DbOriginText).all()}
+    assert [stored[i] for i in ids] == ["a", "b", "c"]
+    assert insert_original_texts(sqlite_session, []) == []
+
+def test_insert_embeddings_multi_row(sqlite_session):
+    ids = insert_original_texts(sqlite_session, ["chunk"])
+    insert_embeddings(sqlite_session, [
+        {"id_text_origin": ids[0], "correlation_type": "Similaridade semântica", "text_content": "t1", "embedding": [0.1] * 3072},
+        {"id_text_origin": ids[0], "correlation_type": "Contexto Compartilhado", "text_content": "t2", "embedding": [0.2] * 3072},
+    ])
+
+    rows = sqlite_session.query(DbCorrelationEmbedding).order_by(DbCorrelationEmbedding.id).all()
+    assert [row.text_content for row in rows] == ["t1", "t2"]
+    assert all(row.id_text_origin == ids[0] for row in rows)
+
+@patch('src.service.embedding_service.copy_embeddings')
+@patch('src.service.embedding_service.insert_original_texts')
+@patch('src.service.embedding_service.UnitOfWork')
+def test_bulk_save_embeddings_copy_mode(mock_unit_of_work, mock_insert_original_texts, mock_copy_embeddings):
+    mock_uow = MagicMock()
+    mock_unit_of_work.return_value.__enter__.return_value = mock_uow
+    mock_insert_original_texts.return_value = [10, 11]
+
+    chunk_embeddings = [
+        [{"correlation_type": "t", "text_content": "a", "embedding": [0.1]}],
+        [{"correlation_type": "t", "text_content": "b", "embedding": [0.2]},
+         {"correlation_type": "t", "text_content": "c", "embedding": [0.3]}],
+    ]
+    result = bulk_save_embeddings(["chunk 0", "chunk 1"], chunk_embeddings, "copy")
+
+    assert result == [10, 11]
+    # Uma única unidade de trabalho (uma transação) para todos os chunks
+    mock_unit_of_work.assert_called_once()
+    mock_insert_original_texts.assert_called_once_with(mock_uow.session, ["chunk 0", "chunk 1"])
+    rows = mock_copy_embeddings.call_args[0][1]
+    assert [(row["id_text_origin"], row["text_content"]) for row in rows] == [(10, "a"), (11, "b"), (11, "c")]
+    mock_uow.session.commit.assert_not_called()
+
+def test_save_chunks_with_embeddings_orm_mode(sqlite_session):
+    ids = save_chunks_with_embeddings(sqlite_session, ["c0", "c1"], [
+        [{"correlation_type": "Similaridade semântica", "text_content": "a", "embedding": [0.1] * 3072}],
+        [{"correlation_type": "Contexto Compartilhado", "text_content": "b", "embedding": [0.2] * 3072}],
+    ], "orm")
+
+    rows = sqlite_session.query(DbCorrelationEmbedding).order_by(DbCorrelationEmbedding.id).all()
+    assert [(row.id_text_origin, row.text_content) for row in rows] == [(ids[0], "a"), (ids[1], "b")]
+
+@patch('src.service.embedding_service.get_db_session')
+def test_copy_embeddings_uses_binary_copy(mock_get_db_session):
+    from src.service.embedding_service import copy_embeddings
+    mock_session = MagicMock()
+    cursor = mock_session.connection.return_value.connection.cursor.return_value
+
+    copy_embeddings(mock_session, [
+        {"id_text_origin": 1, "correlation_type": "t", "text_content": "a", "embedding": [0.1, 0.2]}
+    ])
+
+    sql, buffer = cursor.copy_expert.call_args[0]
+    assert "FROM STDIN WITH (FORMAT binary)" in sql
+    assert buffer.read().startswith(b'PGCOPY')
+    cursor.close.assert_called_once()
+
+def test_bulk_save_embeddings_invalid_mode():
+    with pytest.raises(ValueError, match="write_mode must be one of"):
+        bulk_save_embeddings(["chunk"], [[]], "unknown")
+
+def test_grouped_search_query_keeps_best_hits_per_origin(sqlite_session):
+    from src.service.embedding_service import _grouped_search_query, _format_grouped_rows, fetch_origin_texts
+    from sqlalchemy import text
+
+    origin_ids = insert_original_texts(sqlite_session, ["origin A", "origin B", "origin C"])
+    # text_content guarda a "distância" de cada variante
+    distances = {origin_ids[0]: [0.30, 0.10, 0.20], origin_ids[1]: [0.15, 0.50], origin_ids[2]: [0.90]}
+    insert_embeddings(sqlite_session, [
+        {"id_text_origin": origin_id, "correlation_type": "Similaridade semântica",
+         "text_content": str(distance), "embedding": None}
+        for origin_id, values in distances.items() for distance in values
+    ])
+    candidates_sql = """
+        SELECT ce.id, ce.id_text_origin, ce.text_content, ce.correlation_type,
+               CAST(ce.text_content AS REAL) AS distance
+        FROM db_correlation_embedding ce
+        ORDER BY distance ASC
+        LIMIT :candidate_count"""
+
+    rows = sqlite_session.execute(
+        _grouped_search_query(candidates_sql),
+        {"candidate_count": 100, "limit_count": 2, "hits_per_origin": 2}
+    ).fetchall()
+    groups = _format_grouped_rows(rows)
+
+    assert [group["origin_text_id"] for group in groups] == [origin_ids[0], origin_ids[1]]
+    assert [hit["distance"] for hit in groups[0]["hits"]] == [0.10, 0.20]
+    assert [hit["distance"] for hit in groups[1]["hits"]] == [0.15, 0.50]
+    assert groups[0]["distance"] == 0.10
+    assert fetch_origin_texts(sqlite_session, [group["origin_text_id"] for group in groups]) == {
+        origin_ids[0]: "origin A", origin_ids[1]: "origin B"
+    }
+
+def test_search_by_vector_grouped_plan():
+    from src.service.embedding_service import SEARCH_GROUPED_QUERY, SEARCH_GROUPED_BINARY_QUERY
+
+    mock_session = MagicMock()
+    mock_session.execute.return_value.fetchall.return_value = [
+        (0.1, 'a', 'type', 7, 3, 1),
+        (0.2, 'b', 'type', 8, 3, 2),
+        (0.3, 'c', 'type', 9, 4, 1)
+    ]
+
+    groups = search_by_vector(mock_session, [0.5], 5, hits_per_origin=2)
+
+    assert [group['origin_text_id'] for group in groups] == [3, 4]
+    assert [hit['embedding_id'] for hit in groups[0]['hits']] == [7, 8]
+    set_ef_search, grouped = mock_session.execute.call_args_list
+    assert grouped[0][0] is SEARCH_GROUPED_QUERY
+    assert grouped[0][1]['candidate_count'] == 75
+    assert set_ef_search[0][1] == {'ef_search': '75'}
+
+    mock_session.reset_mock()
+    search_by_vector(mock_session, [0.5], 5, oversample=4, hits_per_origin=2)
+    set_ef_search, grouped = mock_session.execute.call_args_list
+    assert grouped[0][0] is SEARCH_GROUPED_BINARY_QUERY
+    assert grouped[0][1]['binary_candidate_count'] == 300
+    assert set_ef_search[0][1] == {'ef_search': '300'}
+
+def test_query_embedding_batch_service_async_single_call_for_missing_questions():
+    from src.service.embedding_service import query_embedding_batch_service_async
+    cache = QueryEmbeddingCache()
+    cache.put("cached question", [9.0])
+
+    with patch('src.service.embedding_service.get_query_cache', return_value=cache), \
+         patch('src.service.embedding_service.async_client') as mock_async_client:
+        mock_async_client.embeddings.create = AsyncMock(return_value=_embedding_response([[1.0], [2.0]]))
+        vectors = asyncio.run(query_embedding_batch_service_async(
+            ["First?", "Cached  Question", "first?", "Second?"]
+        ))
+
+    assert vectors == [[1.0], [9.0], [1.0], [2.0]]
+    mock_async_client.embeddings.create.assert_awaited_once_with(
+        model="text-embedding-3-large", input=["first?", "second?"]
+    )
+    assert cache.get("SECOND?") == [2.0]
+
+def test_search_by_vectors_single_lateral_statement():
+    mock_session = MagicMock()
+    mock_session.execute.return_value.fetchall.return_value = [
+        (0, 0.1, 'a', 'type', 7, 3),
+        (0, 0.2, 'b', 'type', 8, 4),
+        (2, 0.3, 'c', 'type', 9, 3)
+    ]
+
+    results = search_by_vectors(mock_session, [[0.5], [0.25], [1.0]], 2)
+
+    assert [[hit['embedding_id'] for hit in hits] for hits in results] == [[7, 8], [], [9]]
+    set_ef_search, search = mock_session.execute.call_args_list
+    assert set_ef_search[0][1] == {'ef_search': '40'}
+    assert search[0][1] == {
+        'limit_count': 2, 'question_vector_0': '[0.5]', 'question_vector_1': '[0.25]', 'question_vector_2': '[1.0]'
+    }
+    sql = str(search[0][0])
+    assert "CROSS JOIN LATERAL" in sql and ":question_vector_2" in sql
+
+@patch('src.service.embedding_service.query_embedding_batch_service')
+@patch('src.service.embedding_service.get_db_session')
+def test_search_batch_results_in_input_order(mock_get_db_session, mock_batch_embedding):
+    mock_batch_embedding.return_value = [[0.1], [0.2]]
+    mock_session = MagicMock()
+    mock_get_db_session.return_value.__enter__.return_value = mock_session
+    search_result, origin_result = MagicMock(), MagicMock()
+    search_result.fetchall.return_value = [(0, 0.1, 'a', 'type', 7, 3), (1, 0.2, 'b', 'type', 8, 3)]
+    origin_result.fetchall.return_value = [(3, 'origin')]
+    mock_session.execute.side_effect = [MagicMock(), search_result, origin_result]
+
+    response = search_batch(["q1", "q2"], 1, fields="embedding_id,origin_texts")
+
+    assert response == {
+        'origin_texts': {3: 'origin'},
+        'results': [
+            {'question': 'q1', 'results': [{'embedding_id': 7}]},
+            {'question': 'q2', 'results': [{'embedding_id': 8}]}
+        ]
+    }
+    mock_batch_embedding.assert_called_once_with(["q1", "q2"])
+
+def test_search_batch_invalid_params():
+    with pytest.raises(ValueError, match="questions must be a non-empty list"):
+        search_batch([], 5)
+    with pytest.raises(ValueError, match=r"Question cannot be empty \(position 1\)"):
+        search_batch(["ok", " "], 5)
+    with pytest.raises(ValueError, match="top_k must be a positive integer"):
+        search_batch(["ok"], 0)
+    with patch('src.service.embedding_service.SEARCH_BATCH_MAX_QUESTIONS', 2):
+        with pytest.raises(ValueError, match="questions cannot exceed 2"):
+            search_batch(["a", "b", "c"], 5)
+
+def test_search_by_vector_hybrid_plan():
+    from src.service.embedding_service import SEARCH_HYBRID_QUERY
+
+    mock_session = MagicMock()
+    mock_session.execute.return_value.fetchall.return_value = [(0.4, 'ABC-123', 'type', 7, 3, 0.032)]
+
+    results = search_by_vector(mock_session, [0.5], 5, oversample=8, question_text="código ABC-123")
+
+    assert results == [{
+        'distance': 0.4, 'text_content': 'ABC-123', 'correlation_type': 'type', 'embedding_id': 7, 'origin_text_id': 3
+    }]
+    set_ef_search, hybrid = mock_session.execute.call_args_list
+    assert hybrid[0][0] is SEARCH_HYBRID_QUERY
+    assert hybrid[0][1] == {
+        'question_vector': '[0.5]', 'limit_count': 5, 'question_text': "código ABC-123",
+        'candidate_count': 20, 'rrf_k': 60
+    }
+    assert set_ef_search[0][1] == {'ef_search': '40'}
+    sql = str(SEARCH_HYBRID_QUERY)
+    assert "data_tsv @@ q.query" in sql and "FULL OUTER JOIN lexical_ranked" in sql
+
+@patch('src.service.embedding_service.query_embedding_service')
+@patch('src.service.embedding_service.search_by_vector')
+@patch('src.service.embedding_service.get_db_session')
+def test_search_vetorial_hybrid_mode_passes_question(mock_get_db_session, mock_search_by_vector, mock_query_embedding):
+    mock_query_embedding.return_value = [0.1]
+    mock_search_by_vector.return_value = []
+
+    search_vetorial("Código ABC-123", 5, fields="distance", mode="hybrid")
+
+    mock_search_by_vector.assert_called_once_with(
+        mock_get_db_session.return_value.__enter__.return_value, [0.1], 5, 0, 0, "Código ABC-123"
+    )
+
+def test_search_vetorial_invalid_mode():
+    with pytest.raises(ValueError, match="mode must be one of"):
+        search_vetorial("question", 5, mode="lexical")
+    with pytest.raises(ValueError, match="hits_per_origin is not supported in hybrid mode"):
+        search_vetorial("question", 5, hits_per_origin=2, mode="hybrid")
+
+@patch('src.service.embedding_service.query_embedding_service', return_value=[0.0, 1.0, 0.0])
+@patch('src.service.embedding_service.get_db_session')
+def test_search_vetorial_served_from_local_index(mock_get_db_session, mock_query_embedding, tmp_path):
+    from src.infrastructure.mmap_vector_index import MmapVectorIndex
+    index = MmapVectorIndex(str(tmp_path / "index"), 3)
+    index.append([
+        {"embedding_id": 7, "origin_text_id": 3, "correlation_type": "type", "text_content": "a",
+         "embedding": [1.0, 0.0, 0.0]},
+        {"embedding_id": 8, "origin_text_id": 3, "correlation_type": "type", "text_content": "b",
+         "embedding": [0.0, 1.0, 0.0]}
+    ], {3: "origin"})
+
+    with patch('src.service.embedding_service.get_vector_index', return_value=index):
+        response = search_vetorial("question", 1)
+        hybrid = search_vetorial("question", 1, fields="embedding_id", mode="hybrid")
+
+    assert response == {
+        'origin_texts': {3: 'origin'},
+        'results': [{'distance': pytest.approx(0.0, abs=1e-6), 'text_content': 'b', 'correlation_type': 'type',
+                     'embedding_id': 8, 'origin_text_id': 3}]
+    }
+    # Modos que o índice local não atende continuam no Postgres
+    assert hybrid is not None
+    mock_get_db_session.assert_called_once()
+    index.close()
+
+@patch('src.service.embedding_service.get_db_session')
+def test_save_embedding_appends_to_local_index(mock_get_db_session):
+    mock_session = MagicMock()
+    mock_get_db_session.return_value.__enter__.return_value = mock_session
+    mock_index = MagicMock()
+
+    with patch('src.service.embedding_service.get_vector_index', return_value=mock_index):
+        save_embedding_to_postgresql(3, [{"correlation_type": "t", "text_content": "a", "embedding": [0.1]}])
+
+    rows = mock_index.append.call_args[0][0]
+    assert rows[0]["origin_text_id"] == 3
+    assert rows[0]["embedding"] == [0.1]
+    assert rows[0]["embedding_id"] is mock_session.add.call_args[0][0].id
+
+@pytest.fixture
+def numpy_backend(monkeypatch):
+    monkeypatch.setenv('VECTOR_STORE_BACKEND', 'numpy')
+    monkeypatch.setattr('src.service.embedding_service._vector_store', None)
+    yield
+    monkeypatch.setattr('src.service.embedding_service._vector_store', None)
+
+def _unit_vector(position, dimensions=3072):
+    vector = [0.0] * dimensions
+    vector[position] = 1.0
+    return vector
+
+@patch('src.service.embedding_service.get_db_session')
+def test_numpy_backend_save_search_and_delete(mock_get_db_session, numpy_backend):
+    from src.service.embedding_service import delete_origin_texts
+    origin_id = save_original_text("origin")
+    save_embedding_to_postgresql(origin_id, [
+        {"correlation_type": "Similaridade semântica", "text_content": "a", "embedding": _unit_vector(0)},
+        {"correlation_type": "Contexto Compartilhado", "text_content": "b", "embedding": _unit_vector(1)}
+    ])
+
+    with patch('src.service.embedding_service.query_embedding_service', return_value=_unit_vector(0)):
+        response = search_vetorial("question", 5)
+        filtered = search_vetorial("question", 5, filters={"correlation_type": ["Contexto Compartilhado"]})
+        with pytest.raises(ValueError, match="require VECTOR_STORE_BACKEND=pgvector"):
+            search_vetorial("question", 5, mode="hybrid")
+
+    assert [result['text_content'] for result in response['results']] == ["a", "b"]
+    assert response['origin_texts'] == {origin_id: "origin"}
+    assert [result['text_content'] for result in filtered['results']] == ["b"]
+    assert delete_origin_texts([origin_id]) == 2
+    mock_get_db_session.assert_not_called()
+
+def test_bulk_save_embeddings_numpy_backend(numpy_backend):
+    from src.service.embedding_service import get_vector_store
+    origin_ids = bulk_save_embeddings(["c1", "c2"], [
+        [{"correlation_type": "t", "text_content": "a", "embedding": _unit_vector(0)}],
+        [{"correlation_type": "t", "text_content": "b", "embedding": _unit_vector(1)}]
+    ])
+
+    store = get_vector_store()
+    assert len(store) == 2
+    assert store.get_origin_texts(origin_ids) == dict(zip(origin_ids, ["c1", "c2"]))
+
+def test_get_vector_store_invalid_backend(monkeypatch):
+    from src.service.embedding_service import get_vector_store
+    monkeypatch.setenv('VECTOR_STORE_BACKEND', 'faiss')
+    with pytest.raises(ValueError, match="VECTOR_STORE_BACKEND must be one of"):
+        get_vector_store()
+
+@patch('src.service.embedding_service.query_embedding_service', return_value=[0.1, 0.2])
+@patch('src.service.embedding_service.get_db_session')
+def test_search_vetorial_filters_on_pgvector(mock_get_db_session, mock_query_embedding):
+    mock_session = MagicMock()
+    mock_get_db_session.return_value.__enter__.return_value = mock_session
+    mock_session.execute.return_value.fetchall.return_value = [(0.1, 'text', 'Similaridade semântica', 4, 2)]
+
+    with patch('src.service.embedding_service.get_vector_index') as mock_get_vector_index:
+        response = search_vetorial("question", 5, filters={"correlation_type": "Similaridade semântica", "origin_text_id": [2]})
+
+    mock_get_vector_index.assert_not_called()
+    ef_call, search_call = mock_session.execute.call_args_list[:2]
+    assert ef_call[0][1] == {'ef_search': '50'}
+    sql = str(search_call[0][0])
+    assert "ce.correlation_type = ANY(:correlation_type)" in sql
+    assert "ce.id_text_origin = ANY(:origin_text_id)" in sql
+    assert search_call[0][1]['correlation_type'] == ['Similaridade semântica']
+    assert search_call[0][1]['origin_text_id'] == [2]
+    assert response['results'][0]['embedding_id'] == 4
+
+def test_search_vetorial_filters_validation():
+    with pytest.raises(ValueError, match="Unknown filters: color"):
+        search_vetorial("question", 5, filters={"color": ["red"]})
+    with pytest.raises(ValueError, match="filters are only supported in vector mode"):
+        search_vetorial("question", 5, hits_per_origin=2, filters={"origin_text_id": [1]})
+
+@patch('src.service.embedding_service.notify_vector_index_sync')
+@patch('src.service.embedding_service.get_db_session')
+def test_pgvector_delete_by_origin(mock_get_db_session, mock_notify, sqlite_session):
+    from src.service.embedding_service import delete_origin_texts
+    mock_get_db_session.return_value.__enter__.return_value = sqlite_session
+    ids = insert_original_texts(sqlite_session, ["keep", "drop"])
+    insert_embeddings(sqlite_session, [
+        {"id_text_origin": origin_id, "correlation_type": "Contexto Compartilhado", "text_content": "x",
+         "embedding": _unit_vector(0)}
+        for origin_id in (ids[0], ids[1], ids[1])
+    ])
+    sqlite_session.commit()
+
+    assert delete_origin_texts([ids[1]]) == 2
+    assert [row.id for row in sqlite_session.query(DbOriginText).all()] == [ids[0]]
+    assert sqlite_session.query(DbCorrelationEmbedding).count() == 1
+    mock_notify.assert_called_once()
+
+def test_search_batch_numpy_backend(numpy_backend):
+    origin_id = save_original_text("origin")
+    save_embedding_to_postgresql(origin_id, [
+        {"correlation_type": "Similaridade semântica", "text_content": "a", "embedding": _unit_vector(0)},
+        {"correlation_type": "Contexto Compartilhado", "text_content": "b", "embedding": _unit_vector(1)}
+    ])
+
+    with patch('src.service.embedding_service.query_embedding_batch_service',
+               return_value=[_unit_vector(1), _unit_vector(0)]):
+        response = search_batch(["q1", "q2"], 1)
+
+    assert [item['results'][0]['text_content'] for item in response['results']] == ["b", "a"]
+    assert response['origin_texts'] == {origin_id: "origin"}
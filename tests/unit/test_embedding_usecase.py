@@ -1,7 +1,9 @@
 import json
 import pytest
-from unittest.mock import patch, mock_open
-from src.usecase.embedding_usecase import create_overlapping_chunks, embedding_usecase
+import numpy as np
+from unittest.mock import patch, mock_open, MagicMock
+from src.models.embedding_batch import EmbeddingBatch
+from src.usecase.embedding_usecase import create_overlapping_chunks, embedding_usecase, generate_semantic_texts, generate_semantic_texts_single_call
 
 def test_create_overlapping_chunks():
     texts = ["abcde", "fghij", "klmno"]
@@ -39,18 +41,18 @@ def test_create_overlapping_chunks_single_item():
     assert create_overlapping_chunks(["abcde"], 2) == ["abcde"]
 
 @patch('src.usecase.embedding_usecase.generate_text_semantic_service')
-@patch('src.usecase.embedding_usecase.embedding_service')
+@patch('src.usecase.embedding_usecase.embedding_batch_service')
 @patch('builtins.open', new_callable=mock_open, read_data='prompt text')
 def test_embedding_usecase(mock_file_open, mock_embedding_service, mock_generate_text_semantic_service):
     # Mock services
     mock_generate_text_semantic_service.return_value = {"key": "generated text"}
-    mock_embedding_service.return_value = [0.1, 0.2, 0.3]
+    mock_embedding_service.side_effect = lambda texts: [[0.1, 0.2, 0.3] for _ in texts]
 
     input_text = "This is a test text for the use case. It should be split into chunks."
     index = 1
     
-    result_json_str = embedding_usecase(input_text, index)
-    result = json.loads(result_json_str)
+    embedding_batch = embedding_usecase(input_text, index)
+    result = embedding_batch.to_dicts()
 
     assert isinstance(result, list)
     assert len(result) > 0
@@ -66,3 +68,172 @@ def test_embedding_usecase(mock_file_open, mock_embedding_service, mock_generate
     
     assert mock_generate_text_semantic_service.called
     assert mock_embedding_service.called
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+@patch('src.usecase.embedding_usecase.embedding_batch_service')
+@patch('builtins.open', new_callable=mock_open, read_data='prompt text')
+def test_embedding_usecase_embeds_all_texts_in_one_batch_call(mock_file_open, mock_embedding_batch_service, mock_generate_text_semantic_service):
+    mock_generate_text_semantic_service.return_value = {"result_1": "a", "result_2": "b", "result_3": "c"}
+    mock_embedding_batch_service.side_effect = lambda texts: [[float(i)] for i in range(len(texts))]
+
+    result = embedding_usecase("short text", 2).to_dicts()
+
+    mock_embedding_batch_service.assert_called_once()
+    # 1 chunk x 3 tipos x 2 textos, na ordem de geração
+    assert [item["text"] for item in result] == ["a", "b"] * 3
+    assert [item["embedding"] for item in result] == [[float(i)] for i in range(6)]
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+@patch('src.usecase.embedding_usecase.embedding_batch_service')
+@patch('builtins.open', new_callable=mock_open, read_data='prompt text')
+def test_embedding_usecase_returns_float32_batch_without_dump(mock_file_open, mock_embedding_batch_service, mock_generate_text_semantic_service):
+    mock_generate_text_semantic_service.return_value = {"result_1": "a"}
+    mock_embedding_batch_service.side_effect = lambda texts: [[0.5, 0.25] for _ in texts]
+
+    embedding_batch = embedding_usecase("short text", 1)
+
+    assert isinstance(embedding_batch, EmbeddingBatch)
+    assert embedding_batch.vectors.dtype == np.float32
+    assert embedding_batch.vectors.shape == (3, 2)
+    assert embedding_batch.chunks == {0: "short text"}
+    # Sem a opção de depuração nenhum arquivo é gravado (apenas os prompts são lidos)
+    assert all(call.args[1] == 'r' for call in mock_file_open.call_args_list)
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+@patch('src.usecase.embedding_usecase.embedding_batch_service')
+def test_embedding_usecase_debug_dump(mock_embedding_batch_service, mock_generate_text_semantic_service, tmp_path):
+    mock_generate_text_semantic_service.return_value = {"result_1": "a"}
+    mock_embedding_batch_service.side_effect = lambda texts: [[0.5] for _ in texts]
+    dump_path = tmp_path / "embedding_temp.json"
+
+    embedding_usecase("short text", 1, debug_dump_path=str(dump_path))
+
+    dumped = json.loads(dump_path.read_text(encoding='utf-8'))
+    assert len(dumped) == 3
+    assert dumped[0]["embedding"] == [0.5]
+    assert dumped[0]["original_chunk"] == "short text"
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_generate_semantic_texts_keeps_chunk_type_order(mock_generate_text_semantic_service):
+    import time
+
+    def generate(chunk_text, prompt):
+        # Chamadas mais lentas primeiro, para que terminem fora de ordem
+        time.sleep(0.01 if chunk_text == "c0" else 0)
+        return {"result_1": f"{chunk_text}-{prompt}"}
+    mock_generate_text_semantic_service.side_effect = generate
+
+    prompts = {"tipo_a": "pa", "tipo_b": "pb"}
+    result = generate_semantic_texts(["c0", "c1"], prompts, max_in_flight=4)
+
+    assert [(r["chunk_index"], r["type"]) for r in result] == [(0, "tipo_a"), (0, "tipo_b"), (1, "tipo_a"), (1, "tipo_b")]
+    assert result[3]["data"] == {"result_1": "c1-pb"}
+    assert result[0]["original_chunk"] == "c0"
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_generate_semantic_texts_respects_max_in_flight(mock_generate_text_semantic_service):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    state = {"current": 0, "peak": 0}
+
+    def generate(chunk_text, prompt):
+        with lock:
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+        time.sleep(0.005)
+        with lock:
+            state["current"] -= 1
+        return {}
+    mock_generate_text_semantic_service.side_effect = generate
+
+    generate_semantic_texts([f"c{i}" for i in range(6)], {"a": "p", "b": "p"}, max_in_flight=3)
+
+    assert mock_generate_text_semantic_service.call_count == 12
+    assert state["peak"] <= 3
+
+def test_generate_semantic_texts_empty_chunks():
+    assert generate_semantic_texts([], {"a": "p"}) == []
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_generate_semantic_texts_single_call_fans_out_types(mock_generate_text_semantic_service):
+    mock_generate_text_semantic_service.return_value = {
+        "similaridade_semantica": {"result_1": "s"},
+        "relacionamento_semantico": {"result_1": "r"},
+        "contexto_compartilhado": {"result_1": "c"}
+    }
+
+    result = generate_semantic_texts_single_call(["c0", "c1"], "prompt")
+
+    # Uma chamada por chunk, em modo JSON
+    assert mock_generate_text_semantic_service.call_count == 2
+    mock_generate_text_semantic_service.assert_any_call("c0", "prompt", response_format={"type": "json_object"})
+    assert [(r["chunk_index"], r["type"]) for r in result] == [
+        (0, "similaridade_semantica"), (0, "relacionamento_semantico"), (0, "contexto_compartilhado"),
+        (1, "similaridade_semantica"), (1, "relacionamento_semantico"), (1, "contexto_compartilhado"),
+    ]
+    assert result[1]["data"] == {"result_1": "r"}
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_generate_semantic_texts_single_call_invalid_response(mock_generate_text_semantic_service):
+    mock_generate_text_semantic_service.return_value = None
+
+    result = generate_semantic_texts_single_call(["c0"], "prompt")
+
+    assert len(result) == 3
+    assert all(r["data"] is None for r in result)
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+@patch('src.usecase.embedding_usecase.embedding_batch_service')
+@patch('builtins.open', new_callable=mock_open, read_data='prompt text')
+def test_embedding_usecase_single_call_mode(mock_file_open, mock_embedding_batch_service, mock_generate_text_semantic_service):
+    mock_generate_text_semantic_service.return_value = {
+        "similaridade_semantica": {"result_1": "s1", "result_2": "s2"},
+        "relacionamento_semantico": {"result_1": "r1"},
+        "contexto_compartilhado": {"result_1": "c1"}
+    }
+    mock_embedding_batch_service.side_effect = lambda texts: [[0.1] for _ in texts]
+
+    result = embedding_usecase("short text", 1, generation_mode="single_call").to_dicts()
+
+    mock_generate_text_semantic_service.assert_called_once()
+    assert [(item["type"], item["text"]) for item in result] == [
+        ("similaridade_semantica", "s1"),
+        ("relacionamento_semantico", "r1"),
+        ("contexto_compartilhado", "c1"),
+    ]
+
+def test_embedding_usecase_invalid_generation_mode():
+    with pytest.raises(ValueError, match="generation_mode must be one of"):
+        embedding_usecase("short text", 1, generation_mode="unknown")
+
+@patch('src.usecase.embedding_usecase.get_generation_cache')
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_generate_semantic_texts_reuses_cached_generation(mock_generate_text_semantic_service, mock_get_generation_cache):
+    stored = {}
+    mock_cache = MagicMock()
+    mock_cache.get.side_effect = lambda model, prompt, chunk: stored.get((prompt, chunk))
+    mock_cache.put.side_effect = lambda model, name, prompt, chunk, result: stored.__setitem__((prompt, chunk), result)
+    mock_get_generation_cache.return_value = mock_cache
+    mock_generate_text_semantic_service.return_value = {"result_1": "gerado"}
+
+    first = generate_semantic_texts(["c0"], {"a": "pa", "b": "pb"})
+    second = generate_semantic_texts(["c0"], {"a": "pa", "b": "pb v2"})
+
+    # Segunda execução só chama o modelo para o prompt alterado
+    assert mock_generate_text_semantic_service.call_count == 3
+    mock_generate_text_semantic_service.assert_called_with("c0", "pb v2")
+    assert [r["data"] for r in second] == [r["data"] for r in first]
+
+@patch('src.usecase.embedding_usecase.get_generation_cache')
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_generate_semantic_texts_does_not_cache_failed_generation(mock_generate_text_semantic_service, mock_get_generation_cache):
+    mock_cache = MagicMock()
+    mock_cache.get.return_value = None
+    mock_get_generation_cache.return_value = mock_cache
+    mock_generate_text_semantic_service.return_value = None
+
+    generate_semantic_texts(["c0"], {"a": "pa"})
+
+    mock_cache.put.assert_not_called()
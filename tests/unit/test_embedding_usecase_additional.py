@@ -1,21 +1,24 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock, AsyncMock, mock_open
 import json
 from src.usecase.embedding_usecase import (
     embedding_save_usecase,
-    embedding_search_usecase
+    embedding_search_usecase,
+    embedding_search_usecase_async,
+    embedding_search_batch_usecase_async
 )
 from src.models.database_models import CorrelationType
+from src.models.embedding_batch import EmbeddingBatch, EmbeddingRecord
 
 
 class TestEmbeddingSaveUseCase:
     """Test cases for embedding_save_usecase function"""
     
-    @patch('src.usecase.embedding_usecase.save_original_text')
-    @patch('src.usecase.embedding_usecase.save_embedding_to_postgresql')
-    def test_embedding_save_usecase_single_chunk(self, mock_save_embedding, mock_save_original):
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_single_chunk(self, mock_bulk_save):
         """Test embedding save use case with single chunk"""
-        mock_save_original.return_value = 123
+        mock_bulk_save.return_value = [123]
         
         embedding_data = [
             {
@@ -33,22 +36,21 @@ class TestEmbeddingSaveUseCase:
         result = embedding_save_usecase(embedding_json)
         
         assert result == [123]
-        mock_save_original.assert_called_once_with("original text")
-        mock_save_embedding.assert_called_once()
+        mock_bulk_save.assert_called_once()
         
         # Verify the processed embedding data
-        call_args = mock_save_embedding.call_args
-        assert call_args[0][0] == 123  # id_text_origin
-        processed_embeddings = call_args[0][1]
+        chunk_texts, chunk_embeddings, write_mode = mock_bulk_save.call_args[0]
+        assert chunk_texts == ["original text"]
+        assert write_mode == "orm"
+        processed_embeddings = chunk_embeddings[0]
         assert len(processed_embeddings) == 1
         assert processed_embeddings[0]["correlation_type"] == CorrelationType.SIMILARIDADE_SEMANTICA
         assert "[Chunk 0 de 1]" in processed_embeddings[0]["text_content"]
 
-    @patch('src.usecase.embedding_usecase.save_original_text')
-    @patch('src.usecase.embedding_usecase.save_embedding_to_postgresql')
-    def test_embedding_save_usecase_multiple_chunks(self, mock_save_embedding, mock_save_original):
-        """Test embedding save use case with multiple chunks"""
-        mock_save_original.side_effect = [123, 124]
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_multiple_chunks(self, mock_bulk_save):
+        """Test embedding save use case with multiple chunks in one unit of work"""
+        mock_bulk_save.return_value = [123, 124]
         
         embedding_data = [
             {
@@ -73,14 +75,16 @@ class TestEmbeddingSaveUseCase:
         result = embedding_save_usecase(embedding_json)
         
         assert result == [123, 124]
-        assert mock_save_original.call_count == 2
-        assert mock_save_embedding.call_count == 2
+        # Todos os chunks vão em uma única chamada (uma transação)
+        mock_bulk_save.assert_called_once()
+        chunk_texts, chunk_embeddings, _ = mock_bulk_save.call_args[0]
+        assert chunk_texts == ["original text 1", "original text 2"]
+        assert [len(embeddings) for embeddings in chunk_embeddings] == [1, 1]
 
-    @patch('src.usecase.embedding_usecase.save_original_text')
-    @patch('src.usecase.embedding_usecase.save_embedding_to_postgresql')
-    def test_embedding_save_usecase_multiple_embeddings_same_chunk(self, mock_save_embedding, mock_save_original):
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_multiple_embeddings_same_chunk(self, mock_bulk_save):
         """Test embedding save use case with multiple embeddings for same chunk"""
-        mock_save_original.return_value = 123
+        mock_bulk_save.return_value = [123]
         
         embedding_data = [
             {
@@ -105,19 +109,17 @@ class TestEmbeddingSaveUseCase:
         result = embedding_save_usecase(embedding_json)
         
         assert result == [123]
-        mock_save_original.assert_called_once_with("original text")
-        mock_save_embedding.assert_called_once()
+        chunk_texts, chunk_embeddings, _ = mock_bulk_save.call_args[0]
+        assert chunk_texts == ["original text"]
         
         # Verify multiple embeddings were processed for same chunk
-        call_args = mock_save_embedding.call_args
-        processed_embeddings = call_args[0][1]
+        processed_embeddings = chunk_embeddings[0]
         assert len(processed_embeddings) == 2
 
-    @patch('src.usecase.embedding_usecase.save_original_text')
-    @patch('src.usecase.embedding_usecase.save_embedding_to_postgresql')
-    def test_embedding_save_usecase_unknown_type(self, mock_save_embedding, mock_save_original):
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_unknown_type(self, mock_bulk_save):
         """Test embedding save use case with unknown correlation type"""
-        mock_save_original.return_value = 123
+        mock_bulk_save.return_value = [123]
         
         embedding_data = [
             {
@@ -133,15 +135,13 @@ class TestEmbeddingSaveUseCase:
         result = embedding_save_usecase(embedding_json)
         
         assert result == [123]
-        call_args = mock_save_embedding.call_args
-        processed_embeddings = call_args[0][1]
+        processed_embeddings = mock_bulk_save.call_args[0][1][0]
         assert processed_embeddings[0]["correlation_type"] == "unknown_type"
 
-    @patch('src.usecase.embedding_usecase.save_original_text')
-    @patch('src.usecase.embedding_usecase.save_embedding_to_postgresql')
-    def test_embedding_save_usecase_no_chunk_metadata(self, mock_save_embedding, mock_save_original):
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_no_chunk_metadata(self, mock_bulk_save):
         """Test embedding save use case without chunk metadata"""
-        mock_save_original.return_value = 123
+        mock_bulk_save.return_value = [123]
         
         embedding_data = [
             {
@@ -157,10 +157,52 @@ class TestEmbeddingSaveUseCase:
         result = embedding_save_usecase(embedding_json)
         
         assert result == [123]
-        call_args = mock_save_embedding.call_args
-        processed_embeddings = call_args[0][1]
+        processed_embeddings = mock_bulk_save.call_args[0][1][0]
         assert "[Chunk 0 de N/A]" in processed_embeddings[0]["text_content"]
 
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_with_batch(self, mock_bulk_save):
+        """Test embedding save use case receiving the in-process batch directly"""
+        mock_bulk_save.return_value = [10, 11]
+        records = [
+            EmbeddingRecord("similaridade_semantica", "text a", 0, 0),
+            EmbeddingRecord("contexto_compartilhado", "text b", 1, 1)
+        ]
+        embedding_batch = EmbeddingBatch.build(records, [[0.1, 0.2], [0.3, 0.4]], {0: "chunk 0", 1: "chunk 1"}, total_chunks=2)
+
+        result = embedding_save_usecase(embedding_batch)
+
+        assert result == [10, 11]
+        chunk_texts, chunk_embeddings, _ = mock_bulk_save.call_args[0]
+        assert chunk_texts == ["chunk 0", "chunk 1"]
+        processed = chunk_embeddings[1]
+        assert processed[0]["correlation_type"] == CorrelationType.CONTEXTO_COMPARTILHADO
+        assert processed[0]["text_content"] == "text b\n[Chunk 1 de 2]"
+        assert list(processed[0]["embedding"]) == pytest.approx([0.3, 0.4])
+
+    @patch('src.usecase.embedding_usecase.bulk_save_embeddings')
+    def test_embedding_save_usecase_bulk_write_mode(self, mock_bulk_save):
+        """Test embedding save use case selecting the bulk COPY path"""
+        mock_bulk_save.return_value = [10, 11]
+        records = [
+            EmbeddingRecord("similaridade_semantica", "text a", 0, 0),
+            EmbeddingRecord("contexto_compartilhado", "text b", 1, 1)
+        ]
+        embedding_batch = EmbeddingBatch.build(records, [[0.1], [0.2]], {0: "chunk 0", 1: "chunk 1"}, total_chunks=2)
+
+        result = embedding_save_usecase(embedding_batch, write_mode="copy")
+
+        assert result == [10, 11]
+        chunk_texts, chunk_embeddings, write_mode = mock_bulk_save.call_args[0]
+        assert chunk_texts == ["chunk 0", "chunk 1"]
+        assert chunk_embeddings[1][0]["text_content"] == "text b\n[Chunk 1 de 2]"
+        assert write_mode == "copy"
+
+    def test_embedding_save_usecase_invalid_write_mode(self):
+        """Test embedding save use case with unknown write mode"""
+        with pytest.raises(ValueError, match="write_mode must be one of"):
+            embedding_save_usecase(EmbeddingBatch.build([], [], {}), write_mode="unknown")
+
     def test_embedding_save_usecase_invalid_json(self):
         """Test embedding save use case with invalid JSON"""
         with pytest.raises(json.JSONDecodeError):
@@ -182,7 +224,7 @@ class TestEmbeddingSearchUseCase:
         result = embedding_search_usecase("test question", 5)
         
         assert result == expected_results
-        mock_search_vetorial.assert_called_once_with("test question", 5)
+        mock_search_vetorial.assert_called_once_with("test question", 5, None, None, None, None, None)
 
     @patch('src.usecase.embedding_usecase.search_vetorial')
     def test_embedding_search_usecase_with_exception(self, mock_search_vetorial):
@@ -192,7 +234,7 @@ class TestEmbeddingSearchUseCase:
         result = embedding_search_usecase("test question", 5)
         
         assert "Error in embedding search use case: Search failed" in result
-        mock_search_vetorial.assert_called_once_with("test question", 5)
+        mock_search_vetorial.assert_called_once_with("test question", 5, None, None, None, None, None)
 
     @patch('src.usecase.embedding_usecase.search_vetorial')
     def test_embedding_search_usecase_default_top_k(self, mock_search_vetorial):
@@ -201,7 +243,7 @@ class TestEmbeddingSearchUseCase:
         
         result = embedding_search_usecase("test question")
         
-        mock_search_vetorial.assert_called_once_with("test question", 5)
+        mock_search_vetorial.assert_called_once_with("test question", 5, None, None, None, None, None)
         assert result == []
 
     @patch('src.usecase.embedding_usecase.search_vetorial')
@@ -211,5 +253,43 @@ class TestEmbeddingSearchUseCase:
         
         result = embedding_search_usecase("test question", 10)
         
-        mock_search_vetorial.assert_called_once_with("test question", 10)
+        mock_search_vetorial.assert_called_once_with("test question", 10, None, None, None, None, None)
         assert result == []
+
+    @patch('src.usecase.embedding_usecase.search_vetorial_async', new_callable=AsyncMock)
+    def test_embedding_search_usecase_async(self, mock_search_vetorial_async):
+        """Test async embedding search use case"""
+        mock_search_vetorial_async.return_value = [{"text_content": "text"}]
+
+        result = asyncio.run(embedding_search_usecase_async("test question", 3))
+
+        assert result == [{"text_content": "text"}]
+        mock_search_vetorial_async.assert_awaited_once_with("test question", 3, None, None, None, None, None)
+
+    @patch('src.usecase.embedding_usecase.search_vetorial_async', new_callable=AsyncMock)
+    def test_embedding_search_usecase_async_with_exception(self, mock_search_vetorial_async):
+        """Test async embedding search use case with exception"""
+        mock_search_vetorial_async.side_effect = Exception("Search failed")
+
+        result = asyncio.run(embedding_search_usecase_async("test question"))
+
+        assert "Error in embedding search use case: Search failed" in result
+
+    @patch('src.usecase.embedding_usecase.search_batch_async', new_callable=AsyncMock)
+    def test_embedding_search_batch_usecase_async(self, mock_search_batch_async):
+        """Test async batch search use case"""
+        mock_search_batch_async.return_value = {"results": [{"question": "q", "results": []}]}
+
+        result = asyncio.run(embedding_search_batch_usecase_async(["q"], 3, "distance"))
+
+        assert result == {"results": [{"question": "q", "results": []}]}
+        mock_search_batch_async.assert_awaited_once_with(["q"], 3, "distance")
+
+    @patch('src.usecase.embedding_usecase.search_batch_async', new_callable=AsyncMock)
+    def test_embedding_search_batch_usecase_async_with_exception(self, mock_search_batch_async):
+        """Test async batch search use case with exception"""
+        mock_search_batch_async.side_effect = ValueError("questions must be a non-empty list")
+
+        result = asyncio.run(embedding_search_batch_usecase_async([]))
+
+        assert "Error in embedding search batch use case: questions must be a non-empty list" in result
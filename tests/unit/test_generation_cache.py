@@ -0,0 +1,66 @@
+import os
+import pytest
+from unittest.mock import patch
+
+import src.infrastructure.generation_cache as generation_cache_module
+from src.infrastructure.generation_cache import GenerationCache, get_generation_cache, hash_text
+
+
+class TestGenerationCache:
+    """Test cases for the memoized generation store"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = GenerationCache(str(tmp_path / "generation.db"))
+        yield cache
+        cache.close()
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get("model", "prompt", "chunk") is None
+        cache.put("model", "tipo", "prompt", "chunk", {"result_1": "texto"})
+
+        assert cache.get("model", "prompt", "chunk") == {"result_1": "texto"}
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    def test_key_includes_model_and_prompt(self, cache):
+        cache.put("model", "tipo", "prompt", "chunk", {"result_1": "texto"})
+
+        assert cache.get("other-model", "prompt", "chunk") is None
+        assert cache.get("model", "prompt v2", "chunk") is None
+        assert cache.get("model", "prompt", "other chunk") is None
+
+    def test_invalidate_prompt_only_removes_that_type(self, cache):
+        cache.put("model", "tipo_a", "prompt a v1", "chunk", {"a": "1"})
+        cache.put("model", "tipo_b", "prompt b v1", "chunk", {"b": "1"})
+
+        removed = cache.invalidate_prompt("tipo_a", "prompt a v2")
+
+        assert removed == 1
+        assert cache.get("model", "prompt a v1", "chunk") is None
+        assert cache.get("model", "prompt b v1", "chunk") == {"b": "1"}
+
+    def test_invalidate_prompt_runs_once_per_version(self, cache):
+        cache.invalidate_prompt("tipo_a", "prompt a v2")
+        cache.put("model", "tipo_a", "prompt a v1", "chunk", {"a": "1"})
+
+        assert cache.invalidate_prompt("tipo_a", "prompt a v2") == 0
+
+    def test_hash_text(self):
+        assert hash_text("a") == hash_text("a")
+        assert hash_text("a") != hash_text("b")
+
+
+def test_get_generation_cache_disabled_by_default():
+    with patch.dict(os.environ, {}, clear=False):
+        os.environ.pop('GENERATION_CACHE_ENABLED', None)
+        assert get_generation_cache() is None
+
+
+def test_get_generation_cache_enabled(tmp_path):
+    generation_cache_module._generation_cache = None
+    env = {'GENERATION_CACHE_ENABLED': 'true', 'GENERATION_CACHE_PATH': str(tmp_path / "generation.db")}
+    with patch.dict(os.environ, env):
+        cache = get_generation_cache()
+        assert cache is get_generation_cache()
+    cache.close()
+    generation_cache_module._generation_cache = None
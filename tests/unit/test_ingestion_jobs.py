@@ -0,0 +1,107 @@
+import time
+import pytest
+from unittest.mock import patch
+
+from src.infrastructure.job_store import JobStore, JOB_SUCCEEDED, JOB_FAILED
+from src.usecase import ingestion_jobs
+from src.usecase.ingestion_jobs import IngestionWorkerPool, run_ingestion_job
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = JobStore(str(tmp_path / "jobs.db"))
+    yield job_store
+    job_store.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestIngestionJobs:
+    """Test cases for the ingestion job workers"""
+
+    @patch('src.usecase.ingestion_jobs.embedding_pipeline_usecase')
+    def test_run_job_records_progress_and_result(self, mock_pipeline, store):
+        def pipeline(text, index, progress_callback):
+            progress_callback(1, 2, 6)
+            progress_callback(2, 2, 12)
+            return ["id1", "id2"]
+        mock_pipeline.side_effect = pipeline
+        job_id = store.create("embedding", {"text": "abc", "index": 2})
+
+        run_ingestion_job(store, store.claim_next())
+
+        job = store.get(job_id)
+        assert job["status"] == JOB_SUCCEEDED
+        assert (job["chunks_done"], job["chunks_total"], job["vectors_saved"]) == (2, 2, 12)
+        assert job["result"] == ["id1", "id2"]
+        assert mock_pipeline.call_args[0] == ("abc", 2)
+
+    @patch('src.usecase.ingestion_jobs.embedding_pipeline_usecase')
+    def test_run_job_records_error(self, mock_pipeline, store):
+        mock_pipeline.side_effect = RuntimeError("embedding API down")
+        job_id = store.create("embedding", {"text": "abc", "index": 2})
+
+        run_ingestion_job(store, store.claim_next())
+
+        job = store.get(job_id)
+        assert job["status"] == JOB_FAILED
+        assert job["error"] == "embedding API down"
+
+    @patch('src.usecase.ingestion_jobs.embedding_pipeline_usecase')
+    def test_worker_pool_processes_queued_jobs(self, mock_pipeline, store):
+        mock_pipeline.return_value = ["id"]
+        job_ids = [store.create("embedding", {"text": f"t{i}", "index": 1}) for i in range(4)]
+
+        pool = IngestionWorkerPool(store, workers=2, poll_interval=0.05)
+        pool.start()
+        try:
+            assert wait_for(lambda: all(store.get(job_id)["status"] == JOB_SUCCEEDED for job_id in job_ids))
+        finally:
+            pool.stop()
+        assert mock_pipeline.call_count == 4
+
+    @patch('src.usecase.ingestion_jobs.embedding_pipeline_usecase')
+    def test_heartbeat_keeps_long_job_from_being_requeued(self, mock_pipeline, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        store = JobStore(path, lease_seconds=0.15)
+        other_process = JobStore(path, lease_seconds=0.15)
+
+        def pipeline(text, index, progress_callback):
+            # Mais longo que o lease, sem progresso no meio
+            time.sleep(0.5)
+            return ["id"]
+        mock_pipeline.side_effect = pipeline
+        job_id = store.create("embedding", {"text": "t", "index": 1})
+
+        pool = IngestionWorkerPool(store, workers=1, poll_interval=0.05)
+        pool.start()
+        try:
+            assert wait_for(lambda: store.get(job_id)["status"] == "running")
+            for _ in range(4):
+                time.sleep(0.1)
+                assert other_process.requeue_expired() == 0
+            assert wait_for(lambda: store.get(job_id)["status"] == JOB_SUCCEEDED)
+        finally:
+            pool.stop()
+            store.close()
+            other_process.close()
+        assert mock_pipeline.call_count == 1
+
+    def test_submit_and_get_job(self, store):
+        with patch('src.usecase.ingestion_jobs.get_job_store', return_value=store):
+            job_id = ingestion_jobs.submit_ingestion_job("some text", 3)
+            job = ingestion_jobs.get_ingestion_job(job_id)
+
+            assert job["job_id"] == job_id
+            assert job["status"] == "queued"
+            assert job["text_ids"] is None
+            assert ingestion_jobs.get_ingestion_job("missing") is None
+            with pytest.raises(ValueError, match="Input text cannot be empty"):
+                ingestion_jobs.submit_ingestion_job("   ", 3)
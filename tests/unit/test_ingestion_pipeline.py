@@ -0,0 +1,126 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+from src.usecase.ingestion_pipeline import embedding_pipeline_usecase, iter_generated_chunks
+
+PROMPTS = {"similaridade_semantica": "p1", "relacionamento_semantico": "p2", "contexto_compartilhado": "p3"}
+LONG_TEXT = " ".join(f"frase numero {i} do documento." for i in range(60))
+
+
+@pytest.fixture
+def pipeline_mocks():
+    with patch('src.usecase.ingestion_pipeline.load_prompts', return_value=PROMPTS), \
+         patch('src.usecase.embedding_usecase.generate_text_semantic_service') as mock_generate, \
+         patch('src.usecase.ingestion_pipeline.embedding_batch_service') as mock_embed, \
+         patch('src.usecase.ingestion_pipeline.UnitOfWork') as mock_unit_of_work, \
+         patch('src.usecase.ingestion_pipeline.save_chunks_with_embeddings') as mock_save:
+        mock_unit_of_work.return_value.__exit__.return_value = False
+        mock_generate.return_value = {"result_1": "a", "result_2": "b"}
+        mock_embed.side_effect = lambda texts: [[0.1, 0.2] for _ in texts]
+        counter = iter(range(1000))
+        mock_save.side_effect = lambda session, texts, embeddings, mode: [next(counter) for _ in texts]
+        yield {
+            "generate": mock_generate,
+            "embed": mock_embed,
+            "unit_of_work": mock_unit_of_work,
+            "save": mock_save
+        }
+
+
+class TestEmbeddingPipelineUseCase:
+    """Test cases for the streaming ingestion pipeline"""
+
+    def test_saves_every_chunk_in_order_in_one_unit_of_work(self, pipeline_mocks):
+        result = embedding_pipeline_usecase(LONG_TEXT, 2, chunk_size=200, overlap_size=20)
+
+        saved_chunks = [c.args[1][0] for c in pipeline_mocks["save"].call_args_list]
+        assert len(saved_chunks) > 2
+        assert result == list(range(len(saved_chunks)))
+        pipeline_mocks["unit_of_work"].assert_called_once()
+        # 3 tipos x 2 textos por chunk
+        first_embeddings = pipeline_mocks["save"].call_args_list[0].args[2][0]
+        assert len(first_embeddings) == 6
+        assert first_embeddings[0]["correlation_type"] == "Similaridade semântica"
+        assert first_embeddings[0]["text_content"].endswith(f"[Chunk 0 de {len(saved_chunks)}]")
+
+    def test_persists_while_later_chunks_are_still_processed(self, pipeline_mocks):
+        events = []
+        lock = threading.Lock()
+
+        def generate(chunk_text, prompt, **kwargs):
+            time.sleep(0.01)
+            return {"result_1": chunk_text[:10]}
+
+        def embed(texts):
+            with lock:
+                events.append("embed")
+            return [[0.1] for _ in texts]
+
+        def save(session, texts, embeddings, mode):
+            with lock:
+                events.append("save")
+            return [0]
+
+        pipeline_mocks["generate"].side_effect = generate
+        pipeline_mocks["embed"].side_effect = embed
+        pipeline_mocks["save"].side_effect = save
+
+        embedding_pipeline_usecase(LONG_TEXT, 1, chunk_size=200, overlap_size=20, max_in_flight=1, queue_size=1)
+
+        # O primeiro chunk é gravado antes de o último ser embedado
+        assert events.index("save") < len(events) - 1 - events[::-1].index("embed")
+
+    def test_stage_failure_propagates_and_rolls_back(self, pipeline_mocks):
+        pipeline_mocks["embed"].side_effect = RuntimeError("embedding API down")
+
+        with pytest.raises(RuntimeError, match="embedding API down"):
+            embedding_pipeline_usecase(LONG_TEXT, 1, chunk_size=200)
+
+        exit_args = pipeline_mocks["unit_of_work"].return_value.__exit__.call_args[0]
+        assert exit_args[0] is RuntimeError
+
+    def test_persist_failure_stops_producers(self, pipeline_mocks):
+        pipeline_mocks["save"].side_effect = RuntimeError("db down")
+
+        with pytest.raises(RuntimeError, match="db down"):
+            embedding_pipeline_usecase(LONG_TEXT, 1, chunk_size=100, queue_size=1)
+
+        assert not [t for t in threading.enumerate() if t.name.startswith("ingestion-")]
+
+    def test_numpy_backend_writes_each_chunk_to_the_store(self, pipeline_mocks, monkeypatch):
+        from src.service.embedding_service import EMBEDDING_DIMENSIONS, get_vector_store
+        monkeypatch.setenv('VECTOR_STORE_BACKEND', 'numpy')
+        monkeypatch.setattr('src.service.embedding_service._vector_store', None)
+        pipeline_mocks["embed"].side_effect = lambda texts: [[1.0] * EMBEDDING_DIMENSIONS for _ in texts]
+
+        result = embedding_pipeline_usecase(LONG_TEXT, 1, chunk_size=200, overlap_size=20)
+
+        store = get_vector_store()
+        assert len(store.get_origin_texts(result)) == len(result)
+        assert len(store) == 3 * len(result)
+        pipeline_mocks["unit_of_work"].assert_not_called()
+        pipeline_mocks["save"].assert_not_called()
+        monkeypatch.setattr('src.service.embedding_service._vector_store', None)
+
+    def test_invalid_modes(self):
+        with pytest.raises(ValueError, match="generation_mode must be one of"):
+            embedding_pipeline_usecase("text", 1, generation_mode="unknown")
+        with pytest.raises(ValueError, match="write_mode must be one of"):
+            embedding_pipeline_usecase("text", 1, write_mode="unknown")
+
+
+@patch('src.usecase.embedding_usecase.generate_text_semantic_service')
+def test_iter_generated_chunks_single_call_mode(mock_generate):
+    mock_generate.return_value = {
+        "similaridade_semantica": {"result_1": "s"},
+        "relacionamento_semantico": {"result_1": "r"},
+        "contexto_compartilhado": {"result_1": "c"}
+    }
+    with patch('src.usecase.ingestion_pipeline.load_prompts', return_value={"multi_relacionamento": "p"}):
+        chunks = list(iter_generated_chunks(["c0", "c1", "c2"], "single_call", max_in_flight=2))
+
+    assert [chunk_index for chunk_index, _, _ in chunks] == [0, 1, 2]
+    assert mock_generate.call_count == 3
+    assert [text_data["data"] for text_data in chunks[2][2]] == [{"result_1": "s"}, {"result_1": "r"}, {"result_1": "c"}]
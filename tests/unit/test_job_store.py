@@ -0,0 +1,138 @@
+import time
+import sqlite3
+import pytest
+
+from src.infrastructure.job_store import JobStore, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = JobStore(str(tmp_path / "jobs.db"))
+    yield job_store
+    job_store.close()
+
+
+class TestJobStore:
+    """Test cases for the durable job queue"""
+
+    def test_create_and_get(self, store):
+        job_id = store.create("embedding", {"text": "abc", "index": 2})
+
+        job = store.get(job_id)
+        assert job["status"] == JOB_QUEUED
+        assert job["payload"] == {"text": "abc", "index": 2}
+        assert job["chunks_done"] == 0
+        assert job["result"] is None
+        assert store.get("missing") is None
+
+    def test_claim_next_is_fifo_and_exclusive(self, store):
+        first = store.create("embedding", {"n": 1})
+        second = store.create("embedding", {"n": 2})
+
+        claimed = store.claim_next()
+        assert claimed["id"] == first
+        assert claimed["status"] == JOB_RUNNING
+        assert claimed["attempts"] == 1
+        assert store.claim_next()["id"] == second
+        assert store.claim_next() is None
+
+    def test_progress_complete_and_fail(self, store):
+        ok_job = store.create("embedding", {})
+        bad_job = store.create("embedding", {})
+        store.claim_next()
+        store.claim_next()
+
+        store.update_progress(ok_job, chunks_done=2, chunks_total=5, vectors_saved=12)
+        assert store.get(ok_job)["vectors_saved"] == 12
+        store.complete(ok_job, ["id1", "id2"])
+        store.fail(bad_job, "boom")
+
+        assert store.get(ok_job)["status"] == JOB_SUCCEEDED
+        assert store.get(ok_job)["result"] == ["id1", "id2"]
+        assert store.get(bad_job)["status"] == JOB_FAILED
+        assert store.get(bad_job)["error"] == "boom"
+        assert store.count_by_status() == {JOB_SUCCEEDED: 1, JOB_FAILED: 1}
+
+    def test_jobs_survive_restart(self, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        store = JobStore(path, lease_seconds=0.05)
+        job_id = store.create("embedding", {"text": "abc"})
+        store.claim_next()
+        store.update_progress(job_id, 1, 3, 6)
+        store.close()
+
+        reopened = JobStore(path, lease_seconds=0.05)
+        time.sleep(0.06)
+        assert reopened.requeue_expired() == 1
+        job = reopened.get(job_id)
+        assert job["status"] == JOB_QUEUED
+        assert job["chunks_done"] == 0
+        assert job["owner"] is None
+        assert reopened.claim_next()["attempts"] == 2
+        reopened.close()
+
+    def test_live_lease_is_not_requeued_by_another_process(self, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        worker_a = JobStore(path, lease_seconds=0.2)
+        worker_b = JobStore(path, lease_seconds=0.2)
+        job_id = worker_a.create("embedding", {})
+        assert worker_a.claim_next()["owner"] == worker_a.owner
+
+        # Um segundo worker do uvicorn iniciando não devolve o job que o primeiro está processando
+        assert worker_b.requeue_expired() == 0
+        time.sleep(0.15)
+        assert worker_a.renew_leases() == 1
+        time.sleep(0.1)
+        assert worker_b.requeue_expired() == 0
+        assert worker_b.get(job_id)["status"] == JOB_RUNNING
+
+        # Sem heartbeat o lease expira e o job volta para a fila
+        time.sleep(0.25)
+        assert worker_b.requeue_expired() == 1
+        assert worker_b.claim_next()["owner"] == worker_b.owner
+        # O dono antigo não sobrescreve o estado do job
+        assert worker_a.complete(job_id, ["stale"]) is False
+        assert worker_b.get(job_id)["status"] == JOB_RUNNING
+        assert worker_b.complete(job_id, ["id1"]) is True
+        assert worker_b.get(job_id)["result"] == ["id1"]
+        worker_a.close()
+        worker_b.close()
+
+    def test_job_fails_after_max_attempts(self, tmp_path):
+        store = JobStore(str(tmp_path / "jobs.db"), lease_seconds=0, max_attempts=2)
+        job_id = store.create("embedding", {})
+
+        for _ in range(2):
+            assert store.claim_next()["id"] == job_id
+            time.sleep(0.01)
+            store.requeue_expired()
+
+        job = store.get(job_id)
+        assert job["status"] == JOB_FAILED
+        assert job["attempts"] == 2
+        assert "2 tentativas" in job["error"]
+        assert store.claim_next() is None
+        store.close()
+
+    def test_migrates_table_without_lease_columns(self, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+            "payload TEXT NOT NULL, chunks_total INTEGER, chunks_done INTEGER NOT NULL DEFAULT 0, "
+            "vectors_saved INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, updated_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "INSERT INTO jobs (id, kind, status, payload, attempts, created_at, updated_at) "
+            "VALUES ('old', 'embedding', 'running', '{}', 1, 0, 0)"
+        )
+        connection.commit()
+        connection.close()
+
+        store = JobStore(path)
+        # Jobs em execução de antes da migração não têm lease: voltam para a fila
+        assert store.requeue_expired() == 1
+        assert store.claim_next()["owner"] == store.owner
+        store.close()
@@ -0,0 +1,92 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from fastapi.testclient import TestClient
+
+from src.infrastructure.metrics import REGISTRY, observe_stage, observe_openai_call, record_token_usage, render_metrics
+
+
+def sample(name: str, labels: dict = None) -> float:
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+class TestMetricsHelpers:
+    """Test cases for the Prometheus metric helpers"""
+
+    def test_observe_stage_records_duration_even_on_error(self):
+        labels = {"pipeline": "test", "stage": "failing"}
+        before = sample("rag_stage_duration_seconds_count", labels)
+
+        with pytest.raises(RuntimeError):
+            with observe_stage("test", "failing"):
+                raise RuntimeError("boom")
+
+        assert sample("rag_stage_duration_seconds_count", labels) == before + 1
+
+    def test_observe_openai_call_counts_outcome(self):
+        success = sample("rag_openai_requests_total", {"operation": "test", "outcome": "success"})
+        error = sample("rag_openai_requests_total", {"operation": "test", "outcome": "error"})
+
+        with observe_openai_call("test"):
+            pass
+        with pytest.raises(ValueError):
+            with observe_openai_call("test"):
+                raise ValueError("429")
+
+        assert sample("rag_openai_requests_total", {"operation": "test", "outcome": "success"}) == success + 1
+        assert sample("rag_openai_requests_total", {"operation": "test", "outcome": "error"}) == error + 1
+        assert sample("rag_openai_request_duration_seconds_count", {"operation": "test"}) >= 2
+
+    def test_record_token_usage_ignores_missing_fields(self):
+        before = sample("rag_openai_tokens_total", {"operation": "test", "kind": "prompt"})
+
+        record_token_usage("test", SimpleNamespace(prompt_tokens=12, completion_tokens=None))
+        record_token_usage("test", None)
+        record_token_usage("test", MagicMock())
+
+        assert sample("rag_openai_tokens_total", {"operation": "test", "kind": "prompt"}) == before + 12
+        assert sample("rag_openai_tokens_total", {"operation": "test", "kind": "completion"}) == 0
+
+    def test_pool_gauges_from_existing_engine(self, tmp_path):
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import QueuePool
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=3)
+        instance = SimpleNamespace(_engine=engine)
+
+        with patch('src.infrastructure.connection_postgresql.DatabaseConnection._instance', instance), \
+             patch('src.infrastructure.connection_postgresql.AsyncDatabaseConnection._instance', None):
+            with engine.connect():
+                assert sample("rag_db_pool_size", {"engine": "sync"}) == 3
+                assert sample("rag_db_pool_checked_out", {"engine": "sync"}) == 1
+            assert sample("rag_db_pool_checked_out", {"engine": "sync"}) == 0
+            assert REGISTRY.get_sample_value("rag_db_pool_size", {"engine": "async"}) is None
+        engine.dispose()
+
+
+@patch('src.service.embedding_service.client')
+def test_generation_tokens_and_parse_failures_are_counted(mock_client):
+    from src.service.embedding_service import generate_text_semantic_service
+    mock_completion = MagicMock()
+    mock_completion.choices[0].message.content = 'not a json'
+    mock_completion.usage = SimpleNamespace(prompt_tokens=100, completion_tokens=40)
+    mock_client.chat.completions.create.return_value = mock_completion
+    failures = sample("rag_generation_json_parse_failures_total")
+    completion_tokens = sample("rag_openai_tokens_total", {"operation": "chat", "kind": "completion"})
+
+    assert generate_text_semantic_service("input", "prompt") is None
+
+    assert sample("rag_generation_json_parse_failures_total") == failures + 1
+    assert sample("rag_openai_tokens_total", {"operation": "chat", "kind": "completion"}) == completion_tokens + 40
+
+
+def test_metrics_endpoint():
+    from src.main import app
+    with observe_stage("embedding", "chunking"):
+        pass
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'rag_stage_duration_seconds_bucket{le="0.001",pipeline="embedding",stage="chunking"}' in response.text
+    assert render_metrics()[1].startswith("text/plain")
@@ -0,0 +1,168 @@
+import os
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.infrastructure.mmap_vector_index import MmapVectorIndex, VectorIndexSyncer, sync_from_database
+from src.models.database_models import Base, DbOriginText, DbCorrelationEmbedding
+
+
+def _row(embedding_id, vector, origin_text_id=1):
+    return {
+        "embedding_id": embedding_id,
+        "origin_text_id": origin_text_id,
+        "correlation_type": "Similaridade semântica",
+        "text_content": f"variant {embedding_id}",
+        "embedding": vector
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = MmapVectorIndex(str(tmp_path / "index"), 3, block_rows=2)
+    yield index
+    index.close()
+
+
+class TestMmapVectorIndex:
+    """Test cases for the memory-mapped vector index"""
+
+    def test_empty_index(self, index):
+        assert len(index) == 0
+        assert index.search([1.0, 0.0, 0.0], 5) == []
+
+    def test_search_returns_top_k_by_cosine_distance(self, index):
+        index.append([
+            _row(10, [1.0, 0.0, 0.0]),
+            _row(11, [0.0, 2.0, 0.0]),
+            _row(12, [1.0, 1.0, 0.0]),
+            _row(13, [0.0, 0.0, -1.0]),
+            _row(14, [3.0, 0.1, 0.0])
+        ], {1: "origin"})
+
+        hits = index.search([2.0, 0.0, 0.0], 3)
+
+        assert [embedding_id for embedding_id, _ in hits] == [10, 14, 12]
+        assert hits[0][1] == pytest.approx(0.0, abs=1e-6)
+        assert hits[2][1] == pytest.approx(1 - 1 / np.sqrt(2), abs=1e-6)
+        assert index.rows([12]) == {12: ("variant 12", "Similaridade semântica", 1)}
+        assert index.origin_texts([1, 2]) == {1: "origin"}
+
+    def test_append_ignores_known_ids(self, index):
+        assert index.append([_row(1, [1.0, 0.0, 0.0]), _row(2, [0.0, 1.0, 0.0])]) == 2
+        assert index.append([_row(2, [0.0, 1.0, 0.0]), _row(3, [0.0, 0.0, 1.0]), _row(3, [0.0, 0.0, 1.0])]) == 1
+        assert len(index) == 3
+        assert index.meta()["max_embedding_id"] == 3
+
+    def test_append_rejects_wrong_dimensions(self, index):
+        with pytest.raises(ValueError, match="Expected vectors with 3 dimensions"):
+            index.append([_row(1, [1.0, 0.0])])
+
+    def test_float16_storage(self, tmp_path):
+        index = MmapVectorIndex(str(tmp_path / "half"), 3, dtype="float16")
+        index.append([_row(1, [1.0, 0.0, 0.0]), _row(2, [0.0, 1.0, 0.0])])
+
+        assert os.path.getsize(os.path.join(index.path, "vectors-1.bin")) == 2 * 3 * 2
+        assert index.search([0.1, 1.0, 0.0], 1)[0][0] == 2
+        index.close()
+
+    def test_other_process_sees_appended_rows(self, index):
+        reader = MmapVectorIndex(index.path, 3)
+        assert len(reader) == 0
+
+        index.append([_row(1, [1.0, 0.0, 0.0])])
+
+        assert reader.search([1.0, 0.0, 0.0], 1)[0][0] == 1
+        reader.close()
+
+    def test_leftover_bytes_of_interrupted_write_are_overwritten(self, index):
+        index.append([_row(1, [1.0, 0.0, 0.0])])
+        with open(os.path.join(index.path, "vectors-1.bin"), "ab") as vectors_file:
+            vectors_file.write(b"\x00" * 7)
+
+        index.append([_row(2, [0.0, 1.0, 0.0])])
+
+        assert os.path.getsize(os.path.join(index.path, "vectors-1.bin")) == 2 * 3 * 4
+        assert index.search([0.0, 1.0, 0.0], 1)[0][0] == 2
+
+    def test_rebuild_switches_generation(self, index):
+        index.append([_row(1, [1.0, 0.0, 0.0])])
+        reader = MmapVectorIndex(index.path, 3)
+        assert len(reader) == 1
+
+        count = index.rebuild(
+            iter([[_row(5, [0.0, 1.0, 0.0], 2)], [_row(6, [0.0, 0.0, 1.0], 2)]]),
+            iter([{2: "new origin"}])
+        )
+
+        assert count == 2
+        assert index.meta()["generation"] == 2
+        assert not os.path.exists(os.path.join(index.path, "vectors-1.bin"))
+        assert reader.search([0.0, 0.0, 1.0], 5)[0][0] == 6
+        assert reader.origin_texts([2]) == {2: "new origin"}
+        reader.close()
+
+    def test_mismatched_dimensions_are_ignored_until_rebuild(self, index):
+        index.append([_row(1, [1.0, 0.0, 0.0])])
+        other = MmapVectorIndex(index.path, 4)
+
+        assert len(other) == 0
+        other.append([{**_row(2, [1.0, 0.0, 0.0, 0.0])}])
+        assert other.meta()["generation"] == 2
+        other.close()
+
+
+@pytest.fixture
+def sqlite_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _add_embedding(session, origin_id, position):
+    vector = [0.0] * 3072
+    vector[position] = 1.0
+    session.add(DbCorrelationEmbedding(
+        id_text_origin=origin_id, correlation_type="Contexto Compartilhado",
+        text_content=f"variant {position}", vector=vector
+    ))
+
+
+class TestSyncFromDatabase:
+    """Test cases for the database synchronization of the vector index"""
+
+    def test_incremental_sync_and_rebuild_after_delete(self, tmp_path, sqlite_session):
+        index = MmapVectorIndex(str(tmp_path / "index"), 3072)
+        sqlite_session.add(DbOriginText(id=1, data="origin text"))
+        for position in range(3):
+            _add_embedding(sqlite_session, 1, position)
+        sqlite_session.commit()
+
+        assert sync_from_database(index, sqlite_session) == {"appended": 3, "rebuilt": False, "count": 3}
+        assert index.origin_texts([1]) == {1: "origin text"}
+
+        _add_embedding(sqlite_session, 1, 3)
+        sqlite_session.commit()
+        assert sync_from_database(index, sqlite_session) == {"appended": 1, "rebuilt": False, "count": 4}
+
+        sqlite_session.query(DbCorrelationEmbedding).filter(DbCorrelationEmbedding.id == 2).delete()
+        sqlite_session.commit()
+        result = sync_from_database(index, sqlite_session)
+
+        assert result == {"appended": 0, "rebuilt": True, "count": 3}
+        query = np.zeros(3072)
+        query[1] = 1.0
+        assert 2 not in [embedding_id for embedding_id, _ in index.search(query, 5)]
+        index.close()
+
+    def test_syncer_logs_and_survives_errors(self, tmp_path):
+        index = MmapVectorIndex(str(tmp_path / "index"), 3)
+
+        def failing_session():
+            raise RuntimeError("database unavailable")
+
+        assert VectorIndexSyncer(index, failing_session, 60).sync_once() is None
+        index.close()
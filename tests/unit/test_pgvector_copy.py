@@ -0,0 +1,67 @@
+import struct
+import numpy as np
+from src.infrastructure.pgvector_copy import (
+    COPY_BINARY_HEADER,
+    build_copy_binary,
+    encode_int4,
+    encode_text,
+    encode_vector,
+    encode_halfvec
+)
+
+
+def _decode_copy(data: bytes) -> list:
+    """Decodifica o formato binário do COPY em listas de campos (bytes ou None)"""
+    assert data.startswith(COPY_BINARY_HEADER)
+    position = len(COPY_BINARY_HEADER)
+    rows = []
+    while True:
+        (field_count,) = struct.unpack_from('>h', data, position)
+        position += 2
+        if field_count == -1:
+            break
+        fields = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from('>i', data, position)
+            position += 4
+            if length == -1:
+                fields.append(None)
+                continue
+            fields.append(data[position:position + length])
+            position += length
+        rows.append(fields)
+    assert position == len(data)
+    return rows
+
+
+class TestPgvectorCopy:
+    """Test cases for the binary COPY encoder"""
+
+    def test_encode_vector_wire_format(self):
+        encoded = encode_vector(np.array([1.0, -2.5], dtype=np.float32))
+
+        dimensions, unused = struct.unpack_from('>hh', encoded)
+        assert (dimensions, unused) == (2, 0)
+        assert struct.unpack_from('>2f', encoded, 4) == (1.0, -2.5)
+        assert len(encoded) == 4 + 2 * 4
+
+    def test_encode_halfvec_wire_format(self):
+        encoded = encode_halfvec([0.5, 2.0])
+
+        assert struct.unpack_from('>hh', encoded) == (2, 0)
+        assert np.frombuffer(encoded[4:], dtype='>f2').tolist() == [0.5, 2.0]
+
+    def test_build_copy_binary_round_trip(self):
+        rows = [(7, "Contexto Compartilhado", "texto é", [0.25, 0.5]), (8, "tipo", None, [1.0, 2.0])]
+
+        buffer = build_copy_binary(rows, [encode_int4, encode_text, encode_text, encode_vector])
+        decoded = _decode_copy(buffer.read())
+
+        assert len(decoded) == 2
+        assert struct.unpack('>i', decoded[0][0]) == (7,)
+        assert decoded[0][2].decode('utf-8') == "texto é"
+        assert decoded[1][2] is None
+        assert decoded[1][3] == encode_vector([1.0, 2.0])
+
+    def test_build_copy_binary_empty(self):
+        assert build_copy_binary([], [encode_int4]).read() == COPY_BINARY_HEADER + struct.pack('>h', -1)
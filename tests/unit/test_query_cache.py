@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from src.infrastructure.query_cache import QueryEmbeddingCache, normalize_question
+
+
+class TestNormalizeQuestion:
+    """Test cases for question normalization"""
+
+    def test_case_whitespace_and_unicode(self):
+        assert normalize_question("  O que   é\tIA? ") == "o que é ia?"
+        # NFKC: forma decomposta e compatibilidade (ﬁ -> fi)
+        assert normalize_question("é ﬁm") == normalize_question("é fim")
+
+
+class TestQueryEmbeddingCache:
+    """Test cases for the query embedding cache"""
+
+    def test_get_or_compute_caches_by_normalized_question(self):
+        cache = QueryEmbeddingCache()
+        calls = []
+
+        def compute(question):
+            calls.append(question)
+            return [1.0]
+
+        assert cache.get_or_compute("Hello  World", compute) == [1.0]
+        assert cache.get_or_compute("hello world", compute) == [1.0]
+        assert calls == ["hello world"]
+        assert cache.get("HELLO WORLD") == [1.0]
+        assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 0, "entries": 1}
+
+    def test_ttl_and_lru_bounds(self):
+        cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=0.05)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.put("c", [3.0])
+        assert cache.get("a") is None
+        time.sleep(0.06)
+        assert cache.get("b") is None
+
+    def test_concurrent_threads_share_one_call(self):
+        cache = QueryEmbeddingCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute(question):
+            calls.append(question)
+            started.set()
+            release.wait(2)
+            return [0.5]
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("q", compute)))
+        leader.start()
+        started.wait(2)
+        followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute("Q", compute))) for _ in range(4)]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(2)
+
+        assert calls == ["q"]
+        assert results == [[0.5]] * 5
+        assert cache.stats()["coalesced"] == 4
+
+    def test_error_is_shared_and_not_cached(self):
+        cache = QueryEmbeddingCache()
+
+        def failing(question):
+            raise RuntimeError("API down")
+
+        with pytest.raises(RuntimeError, match="API down"):
+            cache.get_or_compute("q", failing)
+        assert cache.get_or_compute("q", lambda question: [1.0]) == [1.0]
+
+    def test_async_coalescing_and_cancellation(self):
+        cache = QueryEmbeddingCache()
+        calls = []
+
+        async def compute(question):
+            calls.append(question)
+            await asyncio.sleep(0.02)
+            return [0.75]
+
+        async def run():
+            cancelled = asyncio.ensure_future(cache.get_or_compute_async("q", compute))
+            others = [asyncio.ensure_future(cache.get_or_compute_async("Q ", compute)) for _ in range(3)]
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            return await asyncio.gather(*others)
+
+        assert asyncio.run(run()) == [[0.75]] * 3
+        assert calls == ["q"]
+        assert cache.get("q") == [0.75]
+
+    def test_async_error_propagates_to_all_waiters(self):
+        cache = QueryEmbeddingCache()
+
+        async def failing(question):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("API down")
+
+        async def run():
+            return await asyncio.gather(
+                *(cache.get_or_compute_async("q", failing) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.get("q") is None
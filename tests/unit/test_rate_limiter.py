@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError, RateLimitError
+
+from src.infrastructure.rate_limiter import (
+    AdaptiveRateLimiter,
+    BULK,
+    INTERACTIVE,
+    _retry_after_seconds,
+    rate_limit_lane
+)
+
+REQUEST = httpx.Request("POST", "https://example.openai.azure.com/openai/deployments/x/embeddings")
+
+
+def rate_limit_error(headers: dict = None) -> RateLimitError:
+    response = httpx.Response(429, headers=headers or {}, request=REQUEST)
+    return RateLimitError("Too Many Requests", response=response, body=None)
+
+
+def bad_request_error() -> BadRequestError:
+    response = httpx.Response(400, request=REQUEST)
+    return BadRequestError("maximum context length", response=response, body=None)
+
+
+def build_limiter(**options) -> AdaptiveRateLimiter:
+    options.setdefault("max_concurrency", 4)
+    options.setdefault("backoff_base", 0.001)
+    options.setdefault("backoff_max", 0.001)
+    options.setdefault("interactive_share", 0.0)
+    return AdaptiveRateLimiter("test", **options)
+
+
+class TestRetryAfter:
+    """Test cases for Retry-After parsing"""
+
+    def test_retry_after_ms_takes_precedence(self):
+        error = rate_limit_error({"retry-after-ms": "1500", "retry-after": "9"})
+        assert _retry_after_seconds(error) == 1.5
+
+    def test_retry_after_seconds(self):
+        assert _retry_after_seconds(rate_limit_error({"retry-after": "2"})) == 2.0
+
+    def test_retry_after_http_date(self):
+        error = rate_limit_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert _retry_after_seconds(error) == 0.0
+
+    def test_missing_or_invalid_header(self):
+        assert _retry_after_seconds(rate_limit_error()) is None
+        assert _retry_after_seconds(rate_limit_error({"retry-after": "soon"})) is None
+        assert _retry_after_seconds(RuntimeError("no response")) is None
+
+
+class TestAdaptiveRateLimiter:
+    """Test cases for the adaptive Azure OpenAI rate limiter"""
+
+    def test_aimd_decreases_on_429_and_recovers_on_success(self):
+        limiter = build_limiter(max_concurrency=8)
+        limiter.acquire()
+        limiter.release(1, "rate_limited", retry_after=0)
+        assert limiter.concurrency_limit == 4
+
+        # 429 da mesma rajada não reduz de novo
+        limiter.acquire()
+        limiter.release(1, "rate_limited", retry_after=0)
+        assert limiter.concurrency_limit == 4
+
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release(1, "success")
+        assert 4.9 < limiter.concurrency_limit < 5
+        for _ in range(100):
+            limiter.acquire()
+            limiter.release(1, "success")
+        assert limiter.concurrency_limit == 8
+        assert limiter.in_flight == 0
+
+    def test_retry_after_pauses_the_deployment(self):
+        limiter = build_limiter()
+        calls = []
+
+        def function():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise rate_limit_error({"retry-after-ms": "200"})
+            return "ok"
+
+        assert limiter.call(function) == "ok"
+        assert calls[1] - calls[0] >= 0.2
+        assert limiter.stats()["rate_limited"] == 1
+        assert limiter.in_flight == 0
+
+    def test_retries_stop_after_max_retries(self):
+        limiter = build_limiter(max_retries=2)
+        calls = []
+
+        def function():
+            calls.append(1)
+            raise APIConnectionError(request=REQUEST)
+
+        with pytest.raises(APIConnectionError):
+            limiter.call(function)
+        assert len(calls) == 3
+        assert limiter.in_flight == 0
+
+    def test_non_retryable_error_propagates_and_frees_the_slot(self):
+        limiter = build_limiter(max_concurrency=1)
+        calls = []
+
+        def function():
+            calls.append(1)
+            raise bad_request_error()
+
+        with pytest.raises(BadRequestError):
+            limiter.call(function)
+        assert len(calls) == 1
+        assert limiter.in_flight == 0
+        assert limiter.concurrency_limit == 1
+        assert limiter.call(lambda: "ok") == "ok"
+
+    def test_interactive_is_served_before_bulk(self):
+        limiter = build_limiter(max_concurrency=1)
+        limiter.acquire()
+        order = []
+
+        def waiter(lane):
+            limiter.acquire(lane=lane)
+            order.append(lane)
+            limiter.release(1, "success")
+
+        bulk = threading.Thread(target=waiter, args=(BULK,))
+        bulk.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=waiter, args=(INTERACTIVE,))
+        interactive.start()
+        time.sleep(0.05)
+        limiter.release(1, "success")
+        for thread in (bulk, interactive):
+            thread.join(2)
+
+        assert order == [INTERACTIVE, BULK]
+
+    def test_lane_comes_from_the_context(self):
+        limiter = build_limiter(max_concurrency=2, interactive_share=0.5)
+        limiter.acquire(lane=INTERACTIVE)
+
+        # BULK não usa a vaga reservada; INTERACTIVE usa
+        assert limiter._try_acquire(1, BULK) is None
+        with rate_limit_lane(INTERACTIVE):
+            assert limiter.call(lambda: "ok") == "ok"
+
+    def test_requests_per_minute_budget_waits(self):
+        # 600 RPM com rajada de 0.1s: uma requisição imediata, as seguintes a cada 0.1s
+        limiter = build_limiter(requests_per_minute=600, burst_seconds=0.1)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.call(lambda: "ok")
+        assert time.monotonic() - start >= 0.18
+
+    def test_tokens_per_minute_budget_waits(self):
+        # 6000 TPM = 100 tokens/s, capacidade de 100 tokens
+        limiter = build_limiter(tokens_per_minute=6000, burst_seconds=1)
+        limiter.call(lambda: "ok", tokens=100)
+
+        wait = limiter._try_acquire(20, BULK)
+        assert 0.15 < wait <= 0.2
+        start = time.monotonic()
+        limiter.call(lambda: "ok", tokens=20)
+        assert time.monotonic() - start >= 0.15
+
+    def test_used_tokens_reconcile_the_budget(self):
+        class Usage:
+            total_tokens = 90
+
+        class Response:
+            usage = Usage()
+
+        limiter = build_limiter(tokens_per_minute=6000, burst_seconds=1)
+        limiter.call(lambda: Response(), tokens=10)
+        assert limiter.tokens.level == pytest.approx(10, abs=1)
+
+    def test_cancelled_call_frees_the_slot(self):
+        limiter = build_limiter(max_concurrency=2)
+
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def scenario():
+            for _ in range(2):
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(limiter.call_async(slow), 0.02)
+            assert limiter.in_flight == 0
+            assert await limiter.call_async(lambda: asyncio.sleep(0, result="ok"), lane=BULK) == "ok"
+
+        asyncio.run(scenario())
+
+    def test_interrupted_sync_call_frees_the_slot(self):
+        limiter = build_limiter(max_concurrency=1)
+
+        def interrupted():
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            limiter.call(interrupted)
+        assert limiter.in_flight == 0
+
+    def test_async_retry_after_429(self):
+        limiter = build_limiter()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            if len(calls) < 3:
+                raise rate_limit_error({"retry-after": "0"})
+            return "ok"
+
+        assert asyncio.run(limiter.call_async(function)) == "ok"
+        assert len(calls) == 3
+        assert limiter.in_flight == 0
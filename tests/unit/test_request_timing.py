@@ -0,0 +1,106 @@
+import asyncio
+import time
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from src.infrastructure.request_timing import (
+    RequestTimings,
+    ServerTimingMiddleware,
+    TimedRoute,
+    current_timings,
+    span,
+    _profiling_lock
+)
+from src.infrastructure.metrics import observe_stage
+
+
+def build_app(**middleware_options) -> FastAPI:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/work")
+    async def work():
+        with span("usecase"):
+            with observe_stage("search", "sql"):
+                await asyncio.to_thread(time.sleep, 0.02)
+            with observe_stage("search", "sql"):
+                pass
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ServerTimingMiddleware, **middleware_options)
+    return app
+
+
+def parse_server_timing(header: str) -> dict:
+    entries = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+class TestRequestTimings:
+    """Test cases for the per-request span recorder"""
+
+    def test_span_is_a_noop_outside_a_request(self):
+        assert current_timings() is None
+        with span("anything"):
+            pass
+
+    def test_server_timing_format(self):
+        timings = RequestTimings()
+        timings.add("search.sql", 0.0123)
+        timings.add("openai.embeddings", 0.1)
+        timings.add("openai.embeddings", 0.05)
+
+        assert timings.server_timing(0.2) == (
+            'search.sql;dur=12.3, openai.embeddings;dur=150.0;desc="2x", total;dur=200.0'
+        )
+
+
+class TestServerTimingMiddleware:
+    """Test cases for the Server-Timing middleware and the request profiler"""
+
+    def test_spans_from_route_usecase_and_service(self):
+        response = TestClient(build_app(enabled=True)).get("/work")
+
+        entries = parse_server_timing(response.headers["server-timing"])
+        assert list(entries) == ["search.sql", "usecase", "route", "total"]
+        assert entries["search.sql"]["desc"] == '"2x"'
+        # O span da thread de asyncio.to_thread chega na requisição
+        assert float(entries["search.sql"]["dur"]) >= 20
+        assert float(entries["total"]["dur"]) >= float(entries["route"]["dur"]) >= float(entries["usecase"]["dur"])
+        assert "x-profile-file" not in response.headers
+
+    def test_disabled(self):
+        response = TestClient(build_app(enabled=False)).get("/work")
+
+        assert "server-timing" not in response.headers
+
+    def test_profile_written_only_with_the_token(self, tmp_path):
+        client = TestClient(build_app(enabled=True, profiling_token="secret", profiling_interval_ms=1,
+                                      profiling_output_dir=str(tmp_path)))
+
+        assert "x-profile-file" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+        response = client.get("/work", headers={"X-Profile": "secret"})
+
+        path = response.headers["x-profile-file"]
+        assert path.startswith(str(tmp_path)) and path.endswith("GET_work.collapsed")
+        lines = open(path, encoding="utf-8").read().splitlines()
+        assert int(response.headers["x-profile-samples"]) == sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+        # A thread de asyncio.to_thread que executa o sleep (sem span próprio) aparece nas pilhas
+        assert any("_WorkItem.run" in line for line in lines)
+        assert not _profiling_lock.locked()
+
+    def test_profile_busy_when_another_request_is_profiled(self, tmp_path):
+        client = TestClient(build_app(enabled=True, profiling_token="secret", profiling_output_dir=str(tmp_path)))
+
+        assert _profiling_lock.acquire(blocking=False)
+        try:
+            response = client.get("/work", headers={"X-Profile": "secret"})
+        finally:
+            _profiling_lock.release()
+
+        assert response.headers["x-profile"] == "busy"
+        assert "x-profile-file" not in response.headers
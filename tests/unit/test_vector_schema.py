@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import MagicMock
+
+from src.infrastructure.vector_schema import (
+    HNSW_INDEX_NAME,
+    binary_index_sql,
+    build_migration,
+    column_sql_type,
+    hnsw_index_sql,
+    is_indexable,
+    migrate_vector_column,
+    parse_column_type,
+    text_search_column_sql,
+    text_search_index_sql
+)
+
+
+class TestVectorSchema:
+    """Test cases for vector storage configuration and migration"""
+
+    def test_column_sql_type(self):
+        assert column_sql_type("halfvec", 3072) == "halfvec(3072)"
+        assert column_sql_type("vector", 1536) == "vector(1536)"
+        with pytest.raises(ValueError, match="VECTOR_STORAGE must be one of"):
+            column_sql_type("bit", 1024)
+        with pytest.raises(ValueError, match="EMBEDDING_DIMENSIONS must be between"):
+            column_sql_type("vector", 4096)
+
+    def test_indexable_limits(self):
+        assert not is_indexable("vector", 3072)
+        assert is_indexable("vector", 1536)
+        assert is_indexable("halfvec", 3072)
+
+    def test_hnsw_index_sql(self):
+        sql = hnsw_index_sql("halfvec", 3072, m=24, ef_construction=100)
+        assert f"CREATE INDEX IF NOT EXISTS {HNSW_INDEX_NAME}" in sql
+        assert "USING hnsw (vector halfvec_cosine_ops)" in sql
+        assert "WITH (m = 24, ef_construction = 100)" in sql
+        with pytest.raises(ValueError, match="cannot index vector above 2000"):
+            hnsw_index_sql("vector", 3072)
+
+    def test_parse_column_type(self):
+        assert parse_column_type("vector(3072)") == ("vector", 3072)
+        assert parse_column_type("halfvec(1024)") == ("halfvec", 1024)
+        assert parse_column_type("double precision[]") is None
+
+    def test_migration_to_halfvec_keeps_dimensions(self):
+        statements = build_migration("vector", 3072, "halfvec", 3072)
+        assert statements[0] == "DROP INDEX IF EXISTS idx_correlation_vector"
+        assert "ALTER COLUMN vector TYPE halfvec(3072) USING (vector)::halfvec(3072)" in statements[3]
+        assert "halfvec_cosine_ops" in statements[-1]
+
+    def test_migration_reducing_dimensions_truncates_and_normalizes(self):
+        statements = build_migration("vector", 3072, "vector", 1536)
+        assert "USING (l2_normalize(subvector(vector, 1, 1536)))::vector(1536)" in statements[3]
+        assert "vector_cosine_ops" in statements[-1]
+
+    def test_migration_same_type_only_builds_index(self):
+        statements = build_migration("halfvec", 3072, "halfvec", 3072)
+        assert len(statements) == 2
+        assert not any("ALTER TABLE" in statement for statement in statements)
+
+    def test_migration_with_binary_index(self):
+        statements = build_migration("halfvec", 3072, "halfvec", 3072, binary_index=True)
+        assert statements[-1] == binary_index_sql(3072)
+        assert "USING hnsw ((binary_quantize(vector)::bit(3072)) bit_hamming_ops)" in statements[-1]
+
+    def test_migration_with_text_search(self):
+        statements = build_migration("halfvec", 3072, "halfvec", 3072, text_search=True)
+        assert statements[-2:] == [text_search_column_sql(), text_search_index_sql()]
+        assert ("ADD COLUMN IF NOT EXISTS data_tsv tsvector GENERATED ALWAYS AS "
+                "(to_tsvector('portuguese'::regconfig, coalesce(data, ''))) STORED") in statements[-2]
+        assert "USING gin (data_tsv)" in statements[-1]
+
+    def test_text_search_config_is_validated(self):
+        assert "'simple'::regconfig" in text_search_column_sql("simple")
+        with pytest.raises(ValueError, match="TEXT_SEARCH_CONFIG"):
+            text_search_column_sql("simple'; DROP TABLE db_origin_text; --")
+
+    def test_migration_cannot_grow_dimensions(self):
+        with pytest.raises(ValueError, match="re-ingest"):
+            build_migration("vector", 1024, "vector", 1536)
+
+    def test_migrate_dry_run_does_not_execute(self):
+        engine = MagicMock()
+        connection = engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = ("vector(3072)",)
+
+        statements = migrate_vector_column(engine, "halfvec", 3072, dry_run=True)
+
+        assert any("halfvec(3072)" in statement for statement in statements)
+        assert connection.execute.call_count == 1
+
+    def test_migrate_executes_statements(self):
+        engine = MagicMock()
+        connection = engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = ("vector(3072)",)
+
+        statements = migrate_vector_column(engine, "halfvec", 1024)
+
+        assert connection.execute.call_count == 1 + len(statements)
@@ -0,0 +1,86 @@
+import pytest
+
+from src.infrastructure.vector_store import NumpyVectorStore, VectorStore, normalize_filters
+
+
+def _row(origin_text_id, vector, correlation_type="Similaridade semântica", text_content="variant", embedding_id=None):
+    row = {
+        "id_text_origin": origin_text_id,
+        "correlation_type": correlation_type,
+        "text_content": text_content,
+        "embedding": vector
+    }
+    if embedding_id is not None:
+        row["embedding_id"] = embedding_id
+    return row
+
+
+@pytest.fixture
+def store():
+    store = NumpyVectorStore(3, initial_capacity=2)
+    origin_ids = store.add_origin_texts(["first", "second"])
+    store.upsert([
+        _row(origin_ids[0], [1.0, 0.0, 0.0], text_content="a"),
+        _row(origin_ids[0], [1.0, 1.0, 0.0], "Contexto Compartilhado", "b"),
+        _row(origin_ids[1], [0.0, 1.0, 0.0], text_content="c"),
+        _row(origin_ids[1], [0.0, 0.0, 1.0], "Contexto Compartilhado", "d")
+    ])
+    return store
+
+
+class TestNumpyVectorStore:
+    """Test cases for the in-memory NumPy vector store"""
+
+    def test_implements_protocol(self, store):
+        assert isinstance(store, VectorStore)
+
+    def test_search_orders_by_cosine_distance(self, store):
+        results = store.search([2.0, 0.1, 0.0], 2)
+
+        assert [result["text_content"] for result in results] == ["a", "b"]
+        assert results[0] == {
+            "distance": pytest.approx(1 - 2.0 / (2.0 ** 2 + 0.1 ** 2) ** 0.5, abs=1e-6),
+            "text_content": "a",
+            "correlation_type": "Similaridade semântica",
+            "embedding_id": 1,
+            "origin_text_id": 1
+        }
+        assert store.get_origin_texts([1, 2, 3]) == {1: "first", 2: "second"}
+
+    def test_search_with_filters(self, store):
+        by_type = store.search([1.0, 0.0, 0.0], 5, {"correlation_type": "Contexto Compartilhado"})
+        by_both = store.search([1.0, 0.0, 0.0], 5, {"correlation_type": ["Contexto Compartilhado"], "origin_text_id": [2]})
+
+        assert [result["text_content"] for result in by_type] == ["b", "d"]
+        assert [result["text_content"] for result in by_both] == ["d"]
+        assert store.search([1.0, 0.0, 0.0], 5, {"correlation_type": ["Desconhecido"]}) == []
+
+    def test_upsert_replaces_rows_with_embedding_id(self, store):
+        assert store.upsert([_row(2, [1.0, 0.0, 0.0], text_content="c2", embedding_id=3)]) == [3]
+
+        assert len(store) == 4
+        assert store.search([1.0, 0.0, 0.0], 1, {"origin_text_id": [2]})[0]["text_content"] == "c2"
+        assert store.upsert([_row(1, [0.0, 1.0, 0.0])]) == [5]
+
+    def test_upsert_rejects_wrong_dimensions(self, store):
+        with pytest.raises(ValueError, match="Expected vectors with 3 dimensions"):
+            store.upsert([_row(1, [1.0, 0.0])])
+
+    def test_delete_by_origin(self, store):
+        assert store.delete_by_origin([1]) == 2
+
+        assert len(store) == 2
+        assert [result["origin_text_id"] for result in store.search([1.0, 1.0, 1.0], 5)] == [2, 2]
+        assert store.get_origin_texts([1]) == {}
+        assert store.upsert([_row(2, [1.0, 0.0, 0.0], text_content="c3", embedding_id=3)]) == [3]
+        assert len(store) == 2
+
+
+def test_normalize_filters():
+    assert normalize_filters(None) is None
+    assert normalize_filters({"origin_text_id": None}) is None
+    assert normalize_filters({"origin_text_id": 3}) == {"origin_text_id": (3,)}
+    with pytest.raises(ValueError, match="Unknown filters: color"):
+        normalize_filters({"color": "red"})
+    with pytest.raises(ValueError, match="Filter correlation_type cannot be empty"):
+        normalize_filters({"correlation_type": []})